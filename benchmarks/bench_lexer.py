@@ -0,0 +1,110 @@
+"""Lexer throughput benchmark.
+
+Generates a large source file made of many copies of a function that
+covers every token kind and reports how many tokens per second
+`dumbc.tokenize` and `dumbc.tokenize_to_buffer` produce, and how much
+memory holding all of the tokens takes.
+
+Usage:
+    python benchmarks/bench_lexer.py [--size MB] [--repeat N]
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from dumbc import tokenize
+from dumbc import tokenize_to_buffer
+
+
+FUNCTION = '''\
+# Function number %(n)d.
+#[inline]
+func f%(n)d(a: i32, b: f32, name: str): i32 {
+    var acc = 0
+    var scale: f32 = 1.5e-3 * b + .25
+    while acc < a && !(acc >= 1000 || false) {
+        acc += (a << 2) >> 1 ^ ~acc & 255 | 7 %% 3
+        acc -= a / 2 - a * 3
+        if acc == 42 {
+            print('answer\\n')
+            break
+        } else if acc != 17 {
+            continue
+        }
+    }
+    return acc as i32 <= 10 as i32
+}
+
+'''
+
+
+def generate_source(size):
+    """Generate a source of approximately `size` bytes."""
+    chunks = []
+    length = 0
+    n = 0
+    while length < size:
+        chunk = FUNCTION % {'n': n}
+        chunks.append(chunk)
+        length += len(chunk)
+        n += 1
+    return ''.join(chunks)
+
+
+def lex_stream(text):
+    return list(tokenize(text))
+
+
+def lex_buffer(text):
+    return tokenize_to_buffer(text)
+
+
+def bench(lex, text, repeat):
+    """Return a number of tokens and the best time out of `repeat` runs."""
+    best = None
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = len(lex(text))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return count, best
+
+
+def memory(lex, text):
+    """Return a number of bytes allocated to hold the tokens."""
+    tracemalloc.start()
+    tokens = lex(text)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tokens
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--size',
+                        type=float,
+                        default=4,
+                        help='size of the generated source in megabytes')
+    parser.add_argument('--repeat',
+                        type=int,
+                        default=3,
+                        help='number of runs, the best one is reported')
+    args = parser.parse_args()
+
+    text = generate_source(int(args.size * 1024 * 1024))
+    print('%d bytes of source' % len(text))
+    for name, lex in (('tokenize', lex_stream),
+                      ('tokenize_to_buffer', lex_buffer)):
+        count, elapsed = bench(lex, text, args.repeat)
+        size = memory(lex, text)
+        print('%-18s %d tokens in %.3f s: %.0f tokens/sec, %.2f MB/sec, '
+              '%.1f bytes/token' %
+              (name, count, elapsed, count / elapsed,
+               len(text) / elapsed / (1024 * 1024), size / count))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,8 @@
 from .ast import *
 from .visitor import *
+from .arena import *
 
 
 __all__ = (ast.__all__ +
-           visitor.__all__)
+           visitor.__all__ +
+           arena.__all__)
@@ -0,0 +1,632 @@
+__all__ = ('Arena', 'NodeView', 'NodeList')
+
+import array
+import collections
+
+from collections.abc import MutableSequence
+
+from dumbc.ast import ast
+
+
+# Layout of a node in an arena.
+#
+# value: Name of the scalar field(a name or a literal value).
+# op: Name of the operator field.
+# ty: Name of the type field.
+# children: Names of the fields holding nodes; names ending with '*'
+#     hold lists of nodes.
+# optional: Names of the rarely set fields, defaulting to None.
+_Layout = collections.namedtuple('_Layout', ('value',
+                                             'op',
+                                             'ty',
+                                             'children',
+                                             'optional'))
+
+
+def _layout(value=None, op=None, ty=None, children=(), optional=()):
+    return _Layout(value, op, ty, children, optional)
+
+
+_LAYOUTS = collections.OrderedDict([
+    (ast.BinaryOp, _layout(op='op', ty='ty', children=('left', 'right'))),
+    (ast.Assignment, _layout(op='op', ty='ty',
+                             children=('lvalue', 'rvalue'))),
+    (ast.UnaryOp, _layout(op='op', ty='ty', children=('value',))),
+    (ast.Cast, _layout(ty='dst_ty', children=('value',),
+                       optional=('src_ty',))),
+    (ast.IntegerConstant, _layout(value='value', ty='ty')),
+    (ast.FloatConstant, _layout(value='value', ty='ty')),
+    (ast.BooleanConstant, _layout(value='value')),
+    (ast.StringConstant, _layout(value='value')),
+    (ast.Identifier, _layout(value='name', optional=('slot',))),
+    (ast.FuncCall, _layout(value='name', children=('args*',),
+                           optional=('slot',))),
+    (ast.Block, _layout(children=('stmts*',))),
+    (ast.If, _layout(children=('cond', 'then', 'otherwise'))),
+    (ast.While, _layout(children=('cond', 'body'))),
+    (ast.Break, _layout()),
+    (ast.Continue, _layout()),
+    (ast.Return, _layout(children=('value',))),
+    (ast.Var, _layout(value='name', ty='ty', children=('initial_value',),
+                      optional=('slot', 'assigned'))),
+    (ast.Expression, _layout(children=('expr',))),
+    (ast.Attribute, _layout(value='name', children=('args*',))),
+    (ast.Argument, _layout(value='name', ty='ty',
+                           optional=('slot', 'assigned'))),
+    (ast.FunctionProto, _layout(value='name', ty='ret_ty',
+                                children=('args*', 'attrs*'))),
+    (ast.Function, _layout(children=('proto', 'body'),
+                           optional=('num_slots', 'pure'))),
+    (ast.TranslationUnit, _layout(children=('decls*',)))
+])
+
+_NODE_CLASSES = tuple(_LAYOUTS)
+_KIND_IDS = {cls: i for i, cls in enumerate(_NODE_CLASSES)}
+_OPERATORS = tuple(ast.Operator)
+_OPERATOR_IDS = {op: i + 1 for i, op in enumerate(_OPERATORS)}
+
+# Marks a missing child or list of children, and a missing location.
+_NONE = -1
+_NO_OFFSET = 0xffffffff
+
+
+class Arena:
+    """Flat array-backed storage of an AST.
+
+    Nodes are addressed by integer ids. A kind, an operator, a type,
+    a scalar value and a location of every node are kept in parallel
+    arrays. Children of a node are stored in a record in `children`,
+    which starts at `first_child[id]`: a child field takes one entry
+    (an id or -1), a list field takes an entry with a number of items
+    (or -1) followed by ids of the items. When children of a node are
+    replaced, a record of the same length is overwritten in place,
+    otherwise the old record is put on a free list of records of its
+    length and reused by a later record of that length. Fields which
+    are not covered by a layout of the node are kept in a sparse dict.
+
+    Views(see `view`) are instances of classes named after the node
+    classes, so visitors work on an arena without changes.
+
+    Examples:
+
+        >>> from dumbc import tokenize, Parser
+        >>> from dumbc.utils.diagnostics import DiagnosticsEngine
+        >>> code = 'func main(): i32 { return 1 + 2 }'
+        >>> parser = Parser(tokenize(code), DiagnosticsEngine('', code))
+        >>> arena = Arena()
+        >>> root = arena.add(parser.parse_translation_unit())
+        >>> func = arena.view(root).decls[0]
+        >>> func
+        <Function 'main' at 1:1>
+        >>> func.body.stmts[0].value.op
+        <Operator.ADD: 0>
+        >>> arena.to_tree(root).decls[0].proto.ret_ty
+        Type(name='i32')
+    """
+
+    def __init__(self, lines=None):
+        self.kinds = array.array('B')
+        self.ops = array.array('B')
+        self.types = array.array('H')
+        self.values = array.array('I')
+        self.offsets = array.array('I')
+        self.extents = array.array('I')
+        self.first_child = array.array('I')
+        self.children = array.array('i')
+        self.type_table = [None]
+        self.constants = [None]
+        self.extras = {}
+        self.free_children = {}
+        self.lines = lines
+        self._type_ids = {None: 0}
+        self._constant_ids = {}
+        self._views = {}
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_views']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._views = {}
+
+    def _type_id(self, ty):
+        type_id = self._type_ids.get(ty)
+        if type_id is None:
+            type_id = len(self.type_table)
+            self.type_table.append(ty)
+            self._type_ids[ty] = type_id
+        return type_id
+
+    def _constant_id(self, value):
+        if value is None:
+            return 0
+        # 1, 1.0 and True are equal, so a type is a part of the key.
+        # So are 0.0 and -0.0, which must not share an id, floats are
+        # keyed by their representation.
+        key = (type(value), repr(value) if type(value) is float else value)
+        constant_id = self._constant_ids.get(key)
+        if constant_id is None:
+            constant_id = len(self.constants)
+            self.constants.append(value)
+            self._constant_ids[key] = constant_id
+        return constant_id
+
+    def _set_loc(self, node_id, loc):
+        extras = self.extras.get(node_id)
+        if extras is not None:
+            extras.pop('loc', None)
+        if loc is None:
+            self.offsets[node_id] = _NO_OFFSET
+            self.extents[node_id] = 0
+            return
+        if self.lines is None:
+            self.lines = loc.lines
+        self.offsets[node_id] = loc.offset
+        self.extents[node_id] = loc.extent
+        if loc.lines is not self.lines:
+            self.extras.setdefault(node_id, {})['loc'] = loc
+
+    def _loc(self, node_id):
+        extras = self.extras.get(node_id)
+        if extras is not None and 'loc' in extras:
+            return extras['loc']
+        offset = self.offsets[node_id]
+        if offset == _NO_OFFSET:
+            return None
+        return ast.Location(offset, self.extents[node_id], self.lines)
+
+    def _store_children(self, cls, fields, pending, first=None):
+        # Write a children record at `first`, or append it if it's
+        # None; `fields` holds a node, None or a list of nodes for each
+        # child field. Positions of entries yet to be filled are
+        # collected in `pending`.
+        entries = []
+        for (_, is_list), value in zip(_CHILD_FIELDS[cls], fields):
+            if is_list:
+                if value is None:
+                    entries.append(_NONE)
+                    continue
+                entries.append(len(value))
+                items = value
+            else:
+                items = (value,)
+            for item in items:
+                if item is not None:
+                    pending.append((item, len(entries)))
+                entries.append(_NONE)
+        children = self.children
+        if first is None:
+            first = len(children)
+            children.extend(entries)
+        else:
+            children[first:first + len(entries)] = array.array('i', entries)
+        for i, (item, position) in enumerate(pending):
+            pending[i] = (item, first + position)
+        return first
+
+    def _add_node(self, node, pending):
+        cls = _VIEW_TO_NODE_CLASS.get(type(node), type(node))
+        layout = _LAYOUTS[cls]
+        node_id = len(self.kinds)
+
+        self.kinds.append(_KIND_IDS[cls])
+        op = getattr(node, layout.op) if layout.op else None
+        self.ops.append(_OPERATOR_IDS[op] if op is not None else 0)
+        ty = getattr(node, layout.ty) if layout.ty else None
+        self.types.append(self._type_id(ty))
+        value = getattr(node, layout.value) if layout.value else None
+        self.values.append(self._constant_id(value))
+        self.offsets.append(_NO_OFFSET)
+        self.extents.append(0)
+        self._set_loc(node_id, node.loc)
+
+        fields = [getattr(node, name) for name, _ in _CHILD_FIELDS[cls]]
+        self.first_child.append(self._store_children(cls, fields, pending))
+
+        if isinstance(node, NodeView):
+            attrs = node._arena.extras.get(node._id, {})
+        else:
+            attrs = vars(node)
+        known = _FIELDS[cls]
+        if not attrs.keys() <= known:
+            extras = {key: value for key, value in attrs.items()
+                      if key not in known and value is not None}
+            if extras:
+                self.extras.setdefault(node_id, {}).update(extras)
+        return node_id
+
+    def add(self, node):
+        """Add a tree to the arena.
+
+        Nodes of the tree are copied to the arena, unless they are
+        views of this arena already.
+
+        Args:
+            node (Node): Root of the tree.
+
+        Returns:
+            int: Id of the root in the arena.
+        """
+        root_id = None
+        stack = [(node, None)]
+        while stack:
+            node, position = stack.pop()
+            pending = []
+            if isinstance(node, NodeView) and node._arena is self:
+                node_id = node._id
+            else:
+                node_id = self._add_node(node, pending)
+            if position is None:
+                root_id = node_id
+            else:
+                self.children[position] = node_id
+            stack.extend(reversed(pending))
+        return root_id
+
+    @classmethod
+    def from_tree(cls, node):
+        """Create an arena holding a tree.
+
+        Returns:
+            tuple: The arena and an id of the root.
+        """
+        arena = cls()
+        return arena, arena.add(node)
+
+    def kind(self, node_id):
+        """Return a class of a node."""
+        return _NODE_CLASSES[self.kinds[node_id]]
+
+    def view(self, node_id):
+        """Return a view of a node.
+
+        Views are cached, so a node has a single view.
+        """
+        view = self._views.get(node_id)
+        if view is None:
+            view_cls = _VIEW_CLASSES[self.kinds[node_id]]
+            view = view_cls(self, node_id)
+            self._views[node_id] = view
+        return view
+
+    def child_fields(self, node_id):
+        """Return ids of nodes stored in child fields of a node.
+
+        Args:
+            node_id (int): Id of the node.
+
+        Returns:
+            list: An id or None for each child field, a list of ids
+                or None for each list field, in order of the layout.
+        """
+        children = self.children
+        position = self.first_child[node_id]
+        fields = []
+        for _, is_list in _CHILD_FIELDS[_NODE_CLASSES[self.kinds[node_id]]]:
+            entry = children[position]
+            position += 1
+            if entry == _NONE:
+                fields.append(None)
+            elif is_list:
+                fields.append(children[position:position + entry].tolist())
+                position += entry
+            else:
+                fields.append(entry)
+        return fields
+
+    def _set_children(self, node_id, index, value):
+        cls = _NODE_CLASSES[self.kinds[node_id]]
+        # Stored ids are kept as they are, new nodes are added below.
+        fields = [_wrap_ids(ids) for ids in self.child_fields(node_id)]
+        size = _record_size(fields)
+        old_first = self.first_child[node_id]
+        fields[index] = value
+        new_size = _record_size(fields)
+        if new_size == size:
+            first = old_first
+        else:
+            self.free_children.setdefault(size, []).append(old_first)
+            free = self.free_children.get(new_size)
+            first = free.pop() if free else None
+        pending = []
+        self.first_child[node_id] = self._store_children(cls, fields,
+                                                         pending, first)
+        for item, position in pending:
+            if isinstance(item, _Id):
+                self.children[position] = item
+            else:
+                self.children[position] = self.add(item)
+
+    def _set_list_item(self, node_id, index, i, node):
+        # Replace an item of a list field in place.
+        children = self.children
+        position = self.first_child[node_id]
+        for field, (_, is_list) in enumerate(
+                _CHILD_FIELDS[_NODE_CLASSES[self.kinds[node_id]]]):
+            entry = children[position]
+            if field == index:
+                break
+            position += 1
+            if is_list and entry != _NONE:
+                position += entry
+        if not -entry <= i < entry:
+            raise IndexError('list assignment index out of range')
+        if i < 0:
+            i += entry
+        if isinstance(node, NodeView) and node._arena is self:
+            node_id = node._id
+        else:
+            node_id = self.add(node)
+        children[position + 1 + i] = node_id
+
+    def to_tree(self, node_id):
+        """Build a tree of plain nodes from the arena.
+
+        Args:
+            node_id (int): Id of the root.
+
+        Returns:
+            Node: Root of the tree.
+        """
+        order = []
+        child_fields = {}
+        stack = [node_id]
+        while stack:
+            current = stack.pop()
+            order.append(current)
+            fields = child_fields[current] = self.child_fields(current)
+            for ids in fields:
+                if ids is None:
+                    continue
+                if isinstance(ids, list):
+                    stack.extend(ids)
+                else:
+                    stack.append(ids)
+
+        nodes = {}
+        for current in reversed(order):
+            cls = _NODE_CLASSES[self.kinds[current]]
+            layout = _LAYOUTS[cls]
+            node = cls.__new__(cls)
+            attrs = vars(node)
+            attrs['loc'] = self._loc(current)
+            for field in layout.optional:
+                attrs[field] = None
+            if layout.value:
+                attrs[layout.value] = self.constants[self.values[current]]
+            if layout.op:
+                op = self.ops[current]
+                attrs[layout.op] = _OPERATORS[op - 1] if op else None
+            if layout.ty:
+                attrs[layout.ty] = self.type_table[self.types[current]]
+            for (name, _), ids in zip(_CHILD_FIELDS[cls],
+                                      child_fields[current]):
+                if ids is None:
+                    attrs[name] = None
+                elif isinstance(ids, list):
+                    attrs[name] = [nodes[i] for i in ids]
+                else:
+                    attrs[name] = nodes[ids]
+            extras = self.extras.get(current)
+            if extras:
+                attrs.update(extras)
+                attrs['loc'] = self._loc(current)
+            nodes[current] = node
+        return nodes[node_id]
+
+
+class _Id(int):
+    """Id of a node which is already stored in an arena."""
+
+
+def _record_size(fields):
+    # Number of entries of a children record.
+    return sum(len(value) + 1 if isinstance(value, list) else 1
+               for value in fields)
+
+
+def _wrap_ids(ids):
+    if ids is None:
+        return None
+    if isinstance(ids, list):
+        return [_Id(node_id) for node_id in ids]
+    return _Id(ids)
+
+
+class NodeView:
+    """Base class of views of nodes stored in an arena.
+
+    Fields of a node are read from and written to the arena. Fields
+    which are not covered by a layout of the node are kept in a sparse
+    dict of the arena.
+    """
+
+    def __init__(self, arena, node_id):
+        object.__setattr__(self, '_arena', arena)
+        object.__setattr__(self, '_id', node_id)
+
+    @property
+    def loc(self):
+        return self._arena._loc(self._id)
+
+    @loc.setter
+    def loc(self, loc):
+        self._arena._set_loc(self._id, loc)
+
+    def __getattr__(self, name):
+        extras = self._arena.extras.get(self._id)
+        if extras is not None and name in extras:
+            return extras[name]
+        if name in _OPTIONAL_FIELDS[type(self)]:
+            return None
+        raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        if hasattr(type(self), name):
+            object.__setattr__(self, name, value)
+        else:
+            self._arena.extras.setdefault(self._id, {})[name] = value
+
+    def __reduce__(self):
+        return (_view, (self._arena, self._id))
+
+
+def _view(arena, node_id):
+    return arena.view(node_id)
+
+
+class NodeList(MutableSequence):
+    """List of nodes stored in a list field of a node in an arena."""
+
+    def __init__(self, arena, node_id, index):
+        self._arena = arena
+        self._id = node_id
+        self._index = index
+
+    def _ids(self):
+        return self._arena.child_fields(self._id)[self._index]
+
+    def __len__(self):
+        return len(self._ids())
+
+    def __getitem__(self, i):
+        ids = self._ids()
+        if isinstance(i, slice):
+            return [self._arena.view(node_id) for node_id in ids[i]]
+        return self._arena.view(ids[i])
+
+    def _update(self, update):
+        items = _wrap_ids(self._ids())
+        update(items)
+        self._arena._set_children(self._id, self._index, items)
+
+    def __setitem__(self, i, value):
+        if isinstance(i, slice):
+            def update(items):
+                items[i] = value
+            self._update(update)
+            return
+        self._arena._set_list_item(self._id, self._index, i, value)
+
+    def __delitem__(self, i):
+        def update(items):
+            del items[i]
+        self._update(update)
+
+    def insert(self, i, value):
+        self._update(lambda items: items.insert(i, value))
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+def _value_property(name):
+    def get(self):
+        arena = self._arena
+        return arena.constants[arena.values[self._id]]
+
+    def set(self, value):
+        arena = self._arena
+        arena.values[self._id] = arena._constant_id(value)
+
+    return property(get, set)
+
+
+def _op_property(name):
+    def get(self):
+        op = self._arena.ops[self._id]
+        return _OPERATORS[op - 1] if op else None
+
+    def set(self, op):
+        arena = self._arena
+        arena.ops[self._id] = _OPERATOR_IDS[op] if op is not None else 0
+
+    return property(get, set)
+
+
+def _type_property(name):
+    def get(self):
+        arena = self._arena
+        return arena.type_table[arena.types[self._id]]
+
+    def set(self, ty):
+        arena = self._arena
+        arena.types[self._id] = arena._type_id(ty)
+
+    return property(get, set)
+
+
+def _child_property(index):
+    def get(self):
+        child_id = self._arena.child_fields(self._id)[index]
+        return None if child_id is None else self._arena.view(child_id)
+
+    def set(self, node):
+        self._arena._set_children(self._id, index, node)
+
+    return property(get, set)
+
+
+def _list_property(index):
+    def get(self):
+        if self._arena.child_fields(self._id)[index] is None:
+            return None
+        return NodeList(self._arena, self._id, index)
+
+    def set(self, nodes):
+        if nodes is not None:
+            nodes = list(nodes)
+        self._arena._set_children(self._id, index, nodes)
+
+    return property(get, set)
+
+
+def _make_view_class(cls, layout):
+    namespace = {'__module__': __name__, '__doc__': cls.__doc__}
+    if layout.value:
+        namespace[layout.value] = _value_property(layout.value)
+    if layout.op:
+        namespace[layout.op] = _op_property(layout.op)
+    if layout.ty:
+        namespace[layout.ty] = _type_property(layout.ty)
+    for index, field in enumerate(layout.children):
+        if field[-1] == '*':
+            namespace[field[:-1]] = _list_property(index)
+        else:
+            namespace[field] = _child_property(index)
+    # NOTE: a view has the same name as the node class, since visitors
+    # dispatch on a name of the class.
+    return type(cls.__name__, (NodeView, cls), namespace)
+
+
+_VIEW_CLASSES = tuple(_make_view_class(cls, layout)
+                      for cls, layout in _LAYOUTS.items())
+_VIEW_TO_NODE_CLASS = dict(zip(_VIEW_CLASSES, _NODE_CLASSES))
+_CHILD_FIELDS = {
+    cls: tuple((field.rstrip('*'), field[-1] == '*')
+               for field in layout.children)
+    for cls, layout in _LAYOUTS.items()
+}
+_FIELDS = {
+    cls: ({'loc', layout.value, layout.op, layout.ty} |
+          {name for name, _ in _CHILD_FIELDS[cls]})
+    for cls, layout in _LAYOUTS.items()
+}
+_OPTIONAL_FIELDS = {
+    view_cls: _LAYOUTS[cls].optional
+    for view_cls, cls in _VIEW_TO_NODE_CLASS.items()
+}
@@ -1,4 +1,5 @@
-__all__ = ('Location',
+__all__ = ('LineIndex',
+           'Location',
            'Type',
            'BuiltinTypes',
            'Node',
@@ -30,16 +31,122 @@ __all__ = ('Location',
            'Function',
            'TranslationUnit')
 
+import array
+import bisect
 import collections
 
 from enum import Enum
 
 
-Location = collections.namedtuple('Location', ('line', 'column', 'extent'))
+class LineIndex:
+    """Offsets at which lines of a text start.
+
+    An index is shared by all locations in a text, so that
+    a line and a column are resolved only when they are needed.
+
+    Attributes:
+        starts (array): Offset of the first character of each line.
+
+    Examples:
+
+        >>> lines = LineIndex.from_text('ab\\ncd')
+        >>> lines.resolve(4)
+        (2, 2)
+        >>> len(lines)
+        2
+    """
+
+    __slots__ = ('starts',)
+
+    def __init__(self, starts=None):
+        if starts is None:
+            starts = array.array('I', [0])
+        self.starts = starts
+
+    @classmethod
+    def from_text(cls, text):
+        starts = array.array('I', [0])
+        pos = text.find('\n')
+        while pos != -1:
+            starts.append(pos + 1)
+            pos = text.find('\n', pos + 1)
+        return cls(starts)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def resolve(self, offset):
+        """Return a line and a column(both 1-based) of an offset."""
+        line = bisect.bisect_right(self.starts, offset)
+        return line, offset - self.starts[line - 1] + 1
+
+    def line_text(self, text, line):
+        """Return a text of a line without a line terminator."""
+        start = self.starts[line - 1]
+        if line < len(self.starts):
+            return text[start:self.starts[line] - 1]
+        return text[start:]
+
+
+class Location:
+    """Position of a piece of a source text.
+
+    Attributes:
+        offset (int): Offset of the first character.
+        extent (int): Length of the piece.
+        lines (LineIndex): Index of the text the location belongs to.
+            If it's None the text is assumed to have a single line.
+    """
+
+    __slots__ = ('offset', 'extent', 'lines')
+
+    def __init__(self, offset, extent=0, lines=None):
+        self.offset = offset
+        self.extent = extent
+        self.lines = lines
+
+    def _resolve(self):
+        if self.lines is None:
+            return 1, self.offset + 1
+        return self.lines.resolve(self.offset)
+
+    @property
+    def line(self):
+        return self._resolve()[0]
+
+    @property
+    def column(self):
+        return self._resolve()[1]
+
+    def __eq__(self, other):
+        if not isinstance(other, Location):
+            return NotImplemented
+        return (self.offset == other.offset and
+                self.extent == other.extent and
+                self.lines is other.lines)
+
+    def __hash__(self):
+        return hash((self.offset, self.extent))
+
+    def __repr__(self):
+        line, column = self._resolve()
+        return 'Location(line=%d, column=%d, extent=%d)' % (line, column,
+                                                            self.extent)
+
+
 Type = collections.namedtuple('Type', ('name',))
 
 
-INITIAL_LOC = Location(1, 1, 0)
+INITIAL_LOC = Location(0)
+
+
+class _Fields:
+
+    def __init__(self, node):
+        self.node = node
+
+    def __getitem__(self, name):
+        return getattr(self.node, name)
 
 
 def _make_repr(node, fields_fmt=None):
@@ -47,16 +154,18 @@ def _make_repr(node, fields_fmt=None):
     loc = node.loc
     fields = None
 
-    if not loc:
-        loc = Location('?', '?', 0)
+    if loc:
+        line, col = loc.line, loc.column
+    else:
+        line, col = '?', '?'
 
     if not fields_fmt:
         fmt = '<{cls} at {line}:{col}>'
     else:
-        fields = fields_fmt.format(**vars(node))
+        fields = fields_fmt.format_map(_Fields(node))
         fmt = '<{cls} {fields} at {line}:{col}>'
 
-    return fmt.format(cls=cls, fields=fields, line=loc.line, col=loc.column)
+    return fmt.format(cls=cls, fields=fields, line=line, col=col)
 
 
 class BuiltinTypes: # pragma: no cover
@@ -72,13 +181,31 @@ class BuiltinTypes: # pragma: no cover
     STR = Type('str')
     VOID = Type('void')
 
-    FLOATS = (F32, F64)
-    INTEGERS = (I8, U8, I32, U32, I64, U64)
-    NUMERICAL = INTEGERS + FLOATS
-    SIGNED_INTS = (I8, I32, I64)
-    UNSIGNED_INTS = (U8, U32, U64)
+    ALL = (I8, U8, I32, U32, I64, U64, F32, F64, BOOL, STR, VOID)
+
+    FLOATS = frozenset((F32, F64))
+    INTEGERS = frozenset((I8, U8, I32, U32, I64, U64))
+    NUMERICAL = INTEGERS | FLOATS
+    SIGNED_INTS = frozenset((I8, I32, I64))
+    UNSIGNED_INTS = frozenset((U8, U32, U64))
 
-    VAR_TYPES = NUMERICAL + (BOOL, STR)
+    VAR_TYPES = NUMERICAL | {BOOL, STR}
+
+    @staticmethod
+    def intern(name):
+        """Return a type with a given name.
+
+        Builtin types are shared, so equal types are usually the same
+        object.
+
+        Examples:
+            >>> BuiltinTypes.intern('i32') is BuiltinTypes.I32
+            True
+            >>> BuiltinTypes.intern('mytype')
+            Type(name='mytype')
+        """
+        ty = _BUILTIN_TYPES_BY_NAME.get(name)
+        return ty if ty is not None else Type(name)
 
 
 class Operator(Enum): # pragma: no cover
@@ -109,32 +236,45 @@ class Operator(Enum): # pragma: no cover
 
     @staticmethod
     def arithmetic(op):
-        return op.value in range(0, 100)
+        return op in _ARITHMETIC_OPS
 
     @staticmethod
     def relational(op):
-        return op.value in range(100, 200)
+        return op in _RELATIONAL_OPS
 
     @staticmethod
     def binary(op):
-        return op.value in range(0, 200)
+        return op in _BINARY_OPS
 
     @staticmethod
     def unary(op):
-        return op.value in range(200, 300)
+        return op in _UNARY_OPS
 
     @staticmethod
     def logical(op):
-        return op.name in ('LOGICAL_OR', 'LOGICAL_AND',
-                           'EQ', 'NE')
+        return op in _LOGICAL_OPS
 
     @staticmethod
     def bitwise(op):
-        return op.name in ('OR', 'AND', 'XOR')
+        return op in _BITWISE_OPS
 
     @staticmethod
     def shift(op):
-        return op.name in ('SHL', 'SHR')
+        return op in _SHIFT_OPS
+
+
+_BUILTIN_TYPES_BY_NAME = {ty.name: ty for ty in BuiltinTypes.ALL}
+
+# Classes of operators; values of operators in a class are in
+# the same range.
+_ARITHMETIC_OPS = frozenset(op for op in Operator if op.value < 100)
+_RELATIONAL_OPS = frozenset(op for op in Operator if 100 <= op.value < 200)
+_BINARY_OPS = _ARITHMETIC_OPS | _RELATIONAL_OPS
+_UNARY_OPS = frozenset(op for op in Operator if 200 <= op.value < 300)
+_LOGICAL_OPS = frozenset((Operator.LOGICAL_OR, Operator.LOGICAL_AND,
+                          Operator.EQ, Operator.NE))
+_BITWISE_OPS = frozenset((Operator.OR, Operator.AND, Operator.XOR))
+_SHIFT_OPS = frozenset((Operator.SHL, Operator.SHR))
 
 
 class Node: # pragma: no cover
@@ -240,11 +380,13 @@ class IntegerConstant(Expr): # pragma: no cover
 
     Attributes:
         value (int): Value of the literal.
+        ty (Type, optional): Type of the literal, 'i32' if it's None.
     """
 
-    def __init__(self, value, *, loc=None):
+    def __init__(self, value, *, ty=None, loc=None):
         super(IntegerConstant, self).__init__(loc)
         self.value = value
+        self.ty = ty
 
     def __repr__(self):
         return _make_repr(self, '{value!r}')
@@ -255,11 +397,13 @@ class FloatConstant(Expr): # pragma: no cover
 
     Attributes:
         value (float): Value of the literal.
+        ty (Type, optional): Type of the literal, 'f32' if it's None.
     """
 
-    def __init__(self, value, *, loc=None):
+    def __init__(self, value, *, ty=None, loc=None):
         super(FloatConstant, self).__init__(loc)
         self.value = value
+        self.ty = ty
 
     def __repr__(self):
         return _make_repr(self, '{value:.2}')
@@ -302,11 +446,14 @@ class Identifier(Expr): # pragma: no cover
 
     Attributes:
         name (str): Identifier.
+        slot (int, optional): Slot of the variable in the enclosing
+            function, set by name resolution.
     """
 
     def __init__(self, name, *, loc=None):
         super(Identifier, self).__init__(loc)
         self.name = name
+        self.slot = None
 
     def __repr__(self):
         return _make_repr(self, '{name!r}')
@@ -318,12 +465,15 @@ class FuncCall(Expr): # pragma: no cover
     Attributes:
         name (str): Name of the function.
         args (list): List of all passed arguments.
+        slot (int, optional): Index of the function in declarations
+            of the translation unit, set by name resolution.
     """
 
     def __init__(self, name, args, *, loc=None):
         super(FuncCall, self).__init__(loc)
         self.name = name
         self.args = args
+        self.slot = None
 
     def __repr__(self):
         return _make_repr(self, '{name!r}')
@@ -347,7 +497,8 @@ class If(Stmt): # pragma: no cover
     Attributes:
         cond (Node): Boolean condition.
         then (Block): Consequent.
-        otherwise(Block, optional): Alternative.
+        otherwise(Block or If, optional): Alternative, an if statement
+            continues an else-if chain.
     """
 
     def __init__(self, cond, then, otherwise=None, *, loc=None):
@@ -407,6 +558,10 @@ class Var(Stmt): # pragma: no cover
         name (str): Name of the variable.
         ty (Type, optional): Type of the variable.
         initial_value (Node): Initial value of the variable.
+        slot (int, optional): Slot of the variable in the enclosing
+            function, set by name resolution.
+        assigned (bool, optional): Whether the variable is assigned
+            after its declaration, set by name resolution.
     """
 
     def __init__(self, name, initial_value, ty=None, *, loc=None):
@@ -414,6 +569,8 @@ class Var(Stmt): # pragma: no cover
         self.name = name
         self.ty = ty
         self.initial_value = initial_value
+        self.slot = None
+        self.assigned = None
 
     def __repr__(self):
         if self.ty is not None:
@@ -459,12 +616,18 @@ class Argument(Decl): # pragma: no cover
     Attributes:
         name (str): Name of the argument.
         ty (Type): Type of the argument.
+        slot (int, optional): Slot of the argument in the function,
+            set by name resolution.
+        assigned (bool, optional): Whether the argument is assigned,
+            set by name resolution.
     """
 
     def __init__(self, name, ty, *, loc=None):
         super(Argument, self).__init__(loc)
         self.name = name
         self.ty = ty
+        self.slot = None
+        self.assigned = None
 
     def __repr__(self):
         return _make_repr(self, '{name!r} as {ty.name!r}')
@@ -501,12 +664,18 @@ class Function(Decl): # pragma: no cover
         proto (FunctionProto): Prototype of the function.
         body (Block, optional): Body of the function. If the function
             is exported from an external library the field is set to None.
+        num_slots (int, optional): Number of slots of arguments and
+            variables, set by name resolution.
+        pure (bool, optional): Whether the function has a body and
+            calls only pure functions, set by the call graph pass.
     """
 
     def __init__(self, proto, body=None, *, loc=None):
         super(Function, self).__init__(loc)
         self.proto = proto
         self.body = body
+        self.num_slots = None
+        self.pure = None
 
     def __repr__(self):
         return _make_repr(self, '{proto.name!r}')
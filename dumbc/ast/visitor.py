@@ -6,16 +6,123 @@ __all__ = ('Visitor',
 
 from abc import ABCMeta
 from abc import abstractmethod
+from types import GeneratorType
+
+
+def _resolve(visitor_cls, node_cls):
+    """Find a visit method of a visitor class for a node class.
+
+    The method is looked up by names of the node class and its bases,
+    so subclasses of node classes are visited as their bases.
+
+    Raises:
+        AttributeError: Visitor has no method for the node class.
+    """
+    for cls in node_cls.__mro__:
+        method = getattr(visitor_cls, 'visit_' + cls.__name__, None)
+        if method is not None:
+            return method
+    raise AttributeError('%r object has no attribute %r' % (
+        visitor_cls.__name__, 'visit_' + node_cls.__name__))
 
 
 class Visitor(metaclass=ABCMeta):
-    """Base visitor class."""
+    """Base visitor class.
+
+    A visit method either returns its result, or is a generator which
+    yields child nodes and receives results of their visits:
+
+        def visit_BinaryOp(self, node):
+            left = yield node.left
+            right = yield node.right
+            return left + right
+
+    Generator methods are driven with an explicit work stack, so depth
+    of a tree isn't limited by the Python recursion limit. Methods are
+    resolved once per visitor class and node class.
+    """
+
+    def _dispatch_table(self):
+        cls = type(self)
+        table = cls.__dict__.get('_visit_dispatch')
+        if table is None:
+            table = {}
+            cls._visit_dispatch = table
+        for name in self.__dict__:
+            if name.startswith('visit_'):
+                # Methods are overridden on the instance (e.g. patched
+                # by a test), so the shared table can't be used.
+                return _InstanceTable(self)
+        return table
 
     def visit(self, node):
-        method_name = 'visit_' + type(node).__name__
-        method = getattr(self, method_name)
-        result = method(node)
-        return result
+        table = self._dispatch_table()
+        node_cls = type(node)
+        method = table.get(node_cls)
+        if method is None:
+            method = table[node_cls] = _resolve(type(self), node_cls)
+        result = method(self, node)
+        if type(result) is not GeneratorType:
+            return result
+        return self._run(result, table)
+
+    def _run(self, gen, table):
+        stack = []
+        value = None
+        error = None
+        while True:
+            try:
+                if error is None:
+                    node = gen.send(value)
+                else:
+                    # A generator may handle the error and return.
+                    node = gen.throw(error)
+                    error = None
+            except StopIteration as e:
+                if not stack:
+                    return e.value
+                gen = stack.pop()
+                value = e.value
+                error = None
+                continue
+            except BaseException as e:
+                if not stack:
+                    raise
+                gen = stack.pop()
+                error = e
+                continue
+            try:
+                node_cls = type(node)
+                method = table.get(node_cls)
+                if method is None:
+                    method = table[node_cls] = _resolve(type(self), node_cls)
+                value = method(self, node)
+            except BaseException as e:
+                error = e
+                continue
+            if type(value) is GeneratorType:
+                stack.append(gen)
+                gen = value
+                value = None
+
+
+class _InstanceTable(dict):
+    """Dispatch table honouring methods set on a visitor instance."""
+
+    def __init__(self, visitor):
+        self.visitor = visitor
+
+    def __missing__(self, node_cls):
+        # Visit methods are called with the visitor as the first
+        # argument, so instance attributes are wrapped to drop it.
+        for cls in node_cls.__mro__:
+            method = getattr(self.visitor, 'visit_' + cls.__name__, None)
+            if method is not None:
+                return lambda visitor, node: method(node)
+        return _resolve(type(self.visitor), node_cls)
+
+    def get(self, node_cls):
+        return self[node_cls]
 
 
 class ExprVisitor(Visitor): # pragma: no cover
@@ -3,22 +3,104 @@ __all__ = ('Codegen',)
 from llvmlite import ir
 
 from dumbc.codegen.decl_codegen import DeclarationCodegen
-from dumbc.utils.symbol_table import SymbolTable
+from dumbc.codegen.utils import sizeof_llvm_ty
 
 
-class Context: # pragma: nocover
+_I8_PTR = ir.IntType(8).as_pointer()
+_LIFETIME_FUNC_TY = ir.FunctionType(ir.VoidType(), [ir.IntType(64), _I8_PTR])
 
-    def __init__(self, module_name):
+
+class Context:
+    """Code generation context.
+
+    Attributes:
+        slots (list): Stack slots of arguments and variables of current
+            function, indexed by slots assigned by name resolution.
+        functions (list): LLVM functions indexed by positions of their
+            declarations in the translation unit.
+        strings (dict): Global constants of string literals by their
+            values, so equal literals share a constant.
+        use_ssa (bool): Whether variables are kept in SSA values
+            instead of stack slots.
+        ssa (SSABuilder): Builder of SSA values of variables of current
+            function, None if variables are kept in stack slots.
+    """
+
+    def __init__(self, module_name, use_ssa=False):
         self.module = ir.Module(name=module_name)
         self.builder = None
-        self.symbol_table = SymbolTable()
-        self.function_table = SymbolTable()
+        self.slots = []
+        self.functions = []
+        self.strings = {}
+        self.use_ssa = use_ssa
+        self.ssa = None
+
+    def alloca(self, ty, name=''):
+        """Allocate a stack slot in the entry block of current function.
+
+        All allocas are grouped in the entry block, so the stack frame
+        has a constant size and mem2reg is able to promote them to
+        registers. The entry block contains nothing but allocas and
+        a branch to the body of the function.
+
+        Args:
+            ty (ir.Type): Type of the slot.
+            name (str, optional): Name of the slot.
+
+        Returns:
+            ir.AllocaInstr: Pointer to the slot.
+        """
+        entry = self.builder.function.entry_basic_block
+        builder = ir.IRBuilder(entry)
+        builder.position_before(entry.terminator)
+        return builder.alloca(ty, name=name)
+
+    def branch(self, target):
+        """Branch to a block from the current one."""
+        if self.ssa is not None:
+            self.ssa.add_edge(self.builder.block, target)
+        return self.builder.branch(target)
+
+    def cbranch(self, cond, truebr, falsebr):
+        """Branch to one of two blocks from the current one."""
+        if self.ssa is not None:
+            self.ssa.add_edge(self.builder.block, truebr)
+            self.ssa.add_edge(self.builder.block, falsebr)
+        return self.builder.cbranch(cond, truebr, falsebr)
+
+    def seal(self, block):
+        """Mark a block whose predecessors have all been emitted."""
+        if self.ssa is not None:
+            self.ssa.seal(block)
+
+    def _lifetime_marker(self, intrinsic, ptr):
+        func = self.module.declare_intrinsic(intrinsic, [_I8_PTR],
+                                             fnty=_LIFETIME_FUNC_TY)
+        size = ir.Constant(ir.IntType(64),
+                           sizeof_llvm_ty(ptr.type.pointee))
+        ptr = self.builder.bitcast(ptr, _I8_PTR)
+        self.builder.call(func, [size, ptr])
+
+    def lifetime_start(self, ptr):
+        """Mark the beginning of a stack slot lifetime."""
+        self._lifetime_marker('llvm.lifetime.start', ptr)
+
+    def lifetime_end(self, ptr):
+        """Mark the end of a stack slot lifetime."""
+        self._lifetime_marker('llvm.lifetime.end', ptr)
 
 
 class Codegen: # pragma: nocover
+    """LLVM code generator.
+
+    Args:
+        module_name (str): Name of the generated module.
+        use_ssa (bool, optional): Whether to build SSA values of variables
+            directly instead of keeping them in stack slots.
+    """
 
-    def __init__(self, module_name):
-        self.ctx = Context(module_name)
+    def __init__(self, module_name, use_ssa=False):
+        self.ctx = Context(module_name, use_ssa)
         self.codegenerator = DeclarationCodegen(self.ctx)
 
     def generate(self, ast):
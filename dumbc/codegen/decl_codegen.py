@@ -3,6 +3,7 @@ from llvmlite import ir
 import dumbc.ast.ast as ast
 
 from dumbc.ast.visitor import DeclVisitor
+from dumbc.codegen.ssa import SSABuilder
 from dumbc.codegen.stmt_codegen import StatementCodegen
 from dumbc.codegen.utils import convert_to_llvm_ty
 
@@ -17,22 +18,41 @@ class DeclarationCodegen(DeclVisitor): # pragma: nocover
         if node.body is None:
             return
         proto = node.proto
-        func = self.ctx.function_table.get(proto.name)
-        with self.ctx.symbol_table.scope():
-            entry = func.append_basic_block(name='entry')
-            builder = ir.IRBuilder(entry)
-            arg_names = map(lambda arg: arg.name, proto.args)
-            for name, value in zip(arg_names, func.args):
-                arg = builder.alloca(value.type, name=name)
-                builder.store(value, arg, align=4)
-                self.ctx.symbol_table.set(name, arg)
-            self.ctx.builder = builder
-            self.stmt_codegen.visit(node.body)
-            if builder.block.terminator is None:
+        func = self.ctx.module.get_global(proto.name)
+        ctx = self.ctx
+        ctx.slots = [None] * node.num_slots
+        ctx.ssa = SSABuilder(node.num_slots) if ctx.use_ssa else None
+        entry = func.append_basic_block(name='entry')
+        body = func.append_basic_block(name='body')
+        ctx.builder = ir.IRBuilder(entry)
+        ctx.branch(body)
+        ctx.seal(body)
+        builder = ir.IRBuilder(body)
+        ctx.builder = builder
+        for arg, value in zip(proto.args, func.args):
+            if ctx.ssa is not None:
+                value.name = arg.name
+                ctx.ssa.declare(arg.slot, value.type, arg.name)
+                ctx.ssa.write(arg.slot, body, value)
+                continue
+            ptr = ctx.alloca(value.type, name=arg.name)
+            builder.store(value, ptr)
+            ctx.slots[arg.slot] = ptr
+        self.stmt_codegen.visit(node.body)
+        if builder.block.terminator is None:
+            # The end of a function returning a value is unreachable
+            # after dead code elimination.
+            if proto.ret_ty == ast.BuiltinTypes.VOID:
                 builder.ret_void()
+            else:
+                builder.unreachable()
+        if ctx.ssa is not None:
+            ctx.ssa.finish(func)
+            ctx.ssa = None
 
     def _fill_function_table(self, node):
-        for decl in node.decls:
+        self.ctx.functions = [None] * len(node.decls)
+        for i, decl in enumerate(node.decls):
             if not isinstance(decl, ast.Function):
                 continue
             proto = decl.proto
@@ -41,10 +61,9 @@ class DeclarationCodegen(DeclVisitor): # pragma: nocover
                             proto.args))
             func_ty = ir.FunctionType(ret_ty, args)
             func = ir.Function(self.ctx.module, func_ty, name=proto.name)
-            self.ctx.function_table.set(proto.name, func)
+            self.ctx.functions[i] = func
 
     def visit_TranslationUnit(self, node):
-        with self.ctx.function_table.scope():
-            self._fill_function_table(node)
-            for decl in node.decls:
-                self.visit(decl)
+        self._fill_function_table(node)
+        for decl in node.decls:
+            self.visit(decl)
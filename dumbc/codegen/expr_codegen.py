@@ -55,6 +55,43 @@ _FP_BINOP_METHODS = {
 }
 
 
+_BOOL_TY = ir.IntType(1)
+_TRUE = ir.Constant(_BOOL_TY, 1)
+_FALSE = ir.Constant(_BOOL_TY, 0)
+
+# Maximum number of nodes in an operand of logical operator which
+# is evaluated unconditionally.
+_SELECT_MAX_COST = 3
+
+
+def _cost_if_pure(node): # pragma: nocover
+    """Estimate cost of an expression without side effects.
+
+    Returns:
+        int: Number of nodes in the expression, or None if the expression
+            may have side effects(or trap, like an integer division).
+    """
+    if isinstance(node, (ast.IntegerConstant, ast.FloatConstant,
+                         ast.BooleanConstant, ast.Identifier)):
+        return 1
+    elif isinstance(node, ast.Cast):
+        cost = _cost_if_pure(node.value)
+    elif isinstance(node, ast.UnaryOp):
+        cost = _cost_if_pure(node.value)
+    elif isinstance(node, ast.BinaryOp):
+        if (node.op in (Operator.DIV, Operator.MOD) and
+                node.ty in BuiltinTypes.INTEGERS):
+            return None
+        left_cost = _cost_if_pure(node.left)
+        right_cost = _cost_if_pure(node.right)
+        if left_cost is None or right_cost is None:
+            return None
+        cost = left_cost + right_cost
+    else:
+        return None
+    return None if cost is None else cost + 1
+
+
 def _make_global_constant(module, value, name): # pragma: nocover
     name = module.get_unique_name(name)
     const = ir.GlobalVariable(module, value.type, name=name)
@@ -71,8 +108,8 @@ class ExpressionCodegen(ExprVisitor): # pragma: nocover
 
     def _apply_binop(self, node, binop_methods, cmp_func):
         builder = self.ctx.builder
-        left = self.visit(node.left)
-        right = self.visit(node.right)
+        left = yield node.left
+        right = yield node.right
         if Operator.arithmetic(node.op):
             method_name = binop_methods[node.op]
             binop = getattr(builder, method_name)
@@ -81,39 +118,71 @@ class ExpressionCodegen(ExprVisitor): # pragma: nocover
         return binop(_CMP_OP[node.op], left, right, name='res')
 
     def visit_BinaryOp_sint(self, node):
-        return self._apply_binop(node, _SI_BINOP_METHODS, 'icmp_signed')
+        return (yield from self._apply_binop(node, _SI_BINOP_METHODS,
+                                             'icmp_signed'))
 
     def visit_BinaryOp_uint(self, node):
-        return self._apply_binop(node, _UI_BINOP_METHODS, 'icmp_unsigned')
+        return (yield from self._apply_binop(node, _UI_BINOP_METHODS,
+                                             'icmp_unsigned'))
 
     def visit_BinaryOp_float(self, node):
-        return self._apply_binop(node, _FP_BINOP_METHODS, 'fcmp_ordered')
+        return (yield from self._apply_binop(node, _FP_BINOP_METHODS,
+                                             'fcmp_ordered'))
 
     def visit_BinaryOp_bool(self, node):
+        if node.op not in (Operator.LOGICAL_OR, Operator.LOGICAL_AND):
+            raise RuntimeError('unknown boolean binop %r' % node.op)
         builder = self.ctx.builder
-        left = self.visit(node.left)
-        right = self.visit(node.right)
-        if node.op == Operator.LOGICAL_OR:
-            return builder.or_(left, right)
-        elif node.op == Operator.LOGICAL_AND:
-            return builder.and_(left, right)
-        raise RuntimeError('unknown boolean binop %r' % node.op)
+        is_or = node.op == Operator.LOGICAL_OR
+        left = yield node.left
+
+        # Right operand is cheap to compute, so don't bother with branches.
+        cost = _cost_if_pure(node.right)
+        if cost is not None and cost <= _SELECT_MAX_COST:
+            right = yield node.right
+            if is_or:
+                return builder.select(left, _TRUE, right, name='res')
+            return builder.select(left, right, _FALSE, name='res')
+
+        # Evaluate right operand only if left one doesn't determine
+        # the result.
+        prefix = 'or' if is_or else 'and'
+        left_bb = builder.block
+        rhs_bb = builder.append_basic_block(name=prefix + '.rhs')
+        exit_bb = builder.append_basic_block(name=prefix + '.exit')
+        if is_or:
+            self.ctx.cbranch(left, exit_bb, rhs_bb)
+        else:
+            self.ctx.cbranch(left, rhs_bb, exit_bb)
+
+        self.ctx.seal(rhs_bb)
+        builder.position_at_end(rhs_bb)
+        right = yield node.right
+        rhs_bb = builder.block
+        self.ctx.branch(exit_bb)
+
+        self.ctx.seal(exit_bb)
+        builder.position_at_end(exit_bb)
+        result = builder.phi(_BOOL_TY, name='res')
+        result.add_incoming(_TRUE if is_or else _FALSE, left_bb)
+        result.add_incoming(right, rhs_bb)
+        return result
 
     def visit_BinaryOp(self, node):
         ty = node.ty
         if ty in BuiltinTypes.SIGNED_INTS:
-            return self.visit_BinaryOp_sint(node)
+            return (yield from self.visit_BinaryOp_sint(node))
         elif ty in BuiltinTypes.UNSIGNED_INTS:
-            return self.visit_BinaryOp_uint(node)
+            return (yield from self.visit_BinaryOp_uint(node))
         elif ty in BuiltinTypes.FLOATS:
-            return self.visit_BinaryOp_float(node)
+            return (yield from self.visit_BinaryOp_float(node))
         elif ty == BuiltinTypes.BOOL:
-            return self.visit_BinaryOp_bool(node)
+            return (yield from self.visit_BinaryOp_bool(node))
         raise RuntimeError('bad operands %r' % ty)
 
     def visit_UnaryOp(self, node):
         builder = self.ctx.builder
-        value = self.visit(node.value)
+        value = yield node.value
         op = node.op
         if op == Operator.NOT:
             return builder.not_(value, name='res')
@@ -129,14 +198,15 @@ class ExpressionCodegen(ExprVisitor): # pragma: nocover
 
     def visit_Assignment(self, node):
         ctx = self.ctx
+        # Augmented assignments are lowered to plain ones.
         if node.op is not None:
-            tmp = ast.BinaryOp(node.op, node.lvalue, node.rvalue,
-                               ty=node.ty, loc=node.loc)
-            right = self.visit_BinaryOp(tmp)
-        else:
-            right = self.visit(node.rvalue)
-        ptr = ctx.symbol_table.get(node.lvalue.name)
-        result = ctx.builder.store(right, ptr, align=4)
+            raise RuntimeError('unlowered assignment %r' % node.op)
+        right = yield node.rvalue
+        slot = node.lvalue.slot
+        if ctx.ssa is not None:
+            ctx.ssa.write(slot, ctx.builder.block, right)
+            return right
+        result = ctx.builder.store(right, ctx.slots[slot])
         return result
 
     def _cast_int_to_float(self, value, from_ty, to_ty):
@@ -182,7 +252,7 @@ class ExpressionCodegen(ExprVisitor): # pragma: nocover
         return builder.fpext(value, ty, name='ext')
 
     def visit_Cast(self, node):
-        value = self.visit(node.value)
+        value = yield node.value
         from_ty, to_ty = node.src_ty, node.dst_ty
         integers = BuiltinTypes.INTEGERS
         floats = BuiltinTypes.FLOATS
@@ -197,12 +267,12 @@ class ExpressionCodegen(ExprVisitor): # pragma: nocover
         raise RuntimeError('cannot cast %r to %r' % (from_ty, to_ty))
 
     def visit_IntegerConstant(self, node):
-        ty = convert_to_llvm_ty(BuiltinTypes.I32)
+        ty = convert_to_llvm_ty(node.ty or BuiltinTypes.I32)
         result = ir.Constant(ty, node.value)
         return result
 
     def visit_FloatConstant(self, node):
-        ty = convert_to_llvm_ty(BuiltinTypes.F32)
+        ty = convert_to_llvm_ty(node.ty or BuiltinTypes.F32)
         result = ir.Constant(ty, node.value)
         return result
 
@@ -213,22 +283,34 @@ class ExpressionCodegen(ExprVisitor): # pragma: nocover
 
     def visit_StringConstant(self, node):
         ctx = self.ctx
-        buf = bytearray((node.value + '\00').encode('ascii'))
-        value = ir.Constant(ir.ArrayType(ir.IntType(8), len(buf)), buf)
-        const = _make_global_constant(ctx.module, value, 'str')
+        const = ctx.strings.get(node.value)
+        if const is None:
+            buf = bytearray((node.value + '\00').encode('utf-8'))
+            value = ir.Constant(ir.ArrayType(ir.IntType(8), len(buf)), buf)
+            const = _make_global_constant(ctx.module, value, 'str')
+            ctx.strings[node.value] = const
         ty = convert_to_llvm_ty(BuiltinTypes.STR)
         result = ctx.builder.bitcast(const, ty, name='res')
         return result
 
     def visit_Identifier(self, node):
         ctx = self.ctx
-        ptr = ctx.symbol_table.get(node.name)
-        result = ctx.builder.load(ptr, name='res', align=4)
+        if ctx.ssa is not None:
+            block = ctx.builder.block
+            result = ctx.ssa.read(node.slot, block)
+            # Phi nodes might have been put at the start of the block.
+            ctx.builder.position_at_end(block)
+            return result
+        ptr = ctx.slots[node.slot]
+        result = ctx.builder.load(ptr, name='res')
         return result
 
     def visit_FuncCall(self, node):
         ctx = self.ctx
-        fn = ctx.function_table.get(node.name)
-        args = list(map(self.visit, node.args))
+        fn = ctx.functions[node.slot]
+        args = []
+        for arg in node.args:
+            value = yield arg
+            args.append(value)
         result = ctx.builder.call(fn, args, name='res')
         return result
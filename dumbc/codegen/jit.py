@@ -0,0 +1,92 @@
+import ctypes
+import sys
+
+from llvmlite import binding as llvm
+
+import dumbc
+
+from dumbc.codegen.utils import create_target_machine
+from dumbc.codegen.utils import iter_ir_chunks
+from dumbc.codegen.utils import link_ir_chunks
+from dumbc.codegen.utils import optimize_module
+from dumbc.utils.cache import make_key
+
+
+@ctypes.CFUNCTYPE(None, ctypes.c_char_p)
+def _print(message): # pragma: nocover
+    sys.stdout.write(message.decode('utf-8'))
+
+
+# Host implementations of the standard library functions.
+_HOST_SYMBOLS = {
+    'print': _print
+}
+
+
+def _bind_host_symbols(): # pragma: nocover
+    for name, func in _HOST_SYMBOLS.items():
+        llvm.add_symbol(name, ctypes.cast(func, ctypes.c_void_p).value)
+
+
+def run_jit(module, opt_level=0, size_level=0, cache=None, key=None,
+            verify=False): # pragma: nocover
+    """Compile a module in memory and call its main function.
+
+    Args:
+        module (Module or callable): Module with an LLVM IR, or
+            a function returning it. The function is called only if
+            compiled code isn't found in the cache.
+        opt_level (int, optional): Speed optimization level(0-3).
+        size_level (int, optional): Size optimization level(0-2).
+        cache (ObjectCache, optional): Where to look up and store
+            compiled code. If the module has been compiled before,
+            code generation is skipped entirely.
+        key (str, optional): Cache key of the module. If it's None,
+            the key is made from the IR of the module.
+        verify (bool, optional): Whether to verify the LLVM IR.
+
+    Returns:
+        int: Value returned by the main function.
+    """
+    machine = create_target_machine(opt_level=opt_level, jit=True)
+    _bind_host_symbols()
+
+    chunks = None
+    obj = None
+    if cache is not None:
+        if key is None:
+            if callable(module):
+                module = module()
+            chunks = list(iter_ir_chunks(module))
+            key = make_key(dumbc.VERSION, machine.triple,
+                           opt_level, size_level, *chunks)
+        obj = cache.get(key)
+
+    if obj is None:
+        if callable(module):
+            module = module()
+        if chunks is None:
+            chunks = iter_ir_chunks(module)
+        mod = link_ir_chunks(chunks, verify)
+        optimize_module(mod, opt_level, size_level)
+    else:
+        # All symbols come from the cached object, so there is no need
+        # to parse the module.
+        mod = llvm.parse_assembly('')
+
+    engine = llvm.create_mcjit_compiler(mod, machine)
+    if cache is not None:
+        def notify(_, buf):
+            cache.put(key, buf)
+
+        def getbuffer(_):
+            return obj
+
+        engine.set_object_cache(notify, getbuffer)
+    engine.finalize_object()
+
+    main = ctypes.CFUNCTYPE(ctypes.c_int32)(
+        engine.get_function_address('main'))
+    result = main()
+    sys.stdout.flush()
+    return result
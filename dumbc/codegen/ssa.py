@@ -0,0 +1,133 @@
+__all__ = ('SSABuilder',)
+
+from llvmlite import ir
+
+
+class SSABuilder: # pragma: nocover
+    """Builder of SSA values of variables of a function.
+
+    Implements the algorithm from "Simple and Efficient Construction
+    of Static Single Assignment Form" by Braun et al. Variables are
+    never stored in memory: a definition of a variable is recorded for
+    the block it happens in, and a read looks the definition up in the
+    block or in its predecessors, inserting a phi node where they
+    disagree. Phi nodes which turn out to merge a single value are
+    removed.
+
+    A block is sealed once all its predecessors are known. Reads in an
+    unsealed block(a loop header) get incomplete phi nodes, which are
+    completed when the block is sealed.
+
+    Attributes:
+        types (list): LLVM types of variables, indexed by slots.
+        names (list): Names of variables, indexed by slots.
+    """
+
+    def __init__(self, num_slots):
+        self.types = [None] * num_slots
+        self.names = [None] * num_slots
+        # Definitions of each variable by block.
+        self.defs = [{} for _ in range(num_slots)]
+        self.preds = {}
+        self.sealed = set()
+        self.incomplete = {}
+        # Phi nodes using each phi node, phi nodes getting their
+        # operands, and removed phi nodes with values replacing them.
+        self.users = {}
+        self.filling = set()
+        self.replaced = {}
+
+    def declare(self, slot, ty, name):
+        self.types[slot] = ty
+        self.names[slot] = name
+
+    def add_edge(self, src, dst):
+        """Record a control flow edge between blocks."""
+        self.preds.setdefault(dst, []).append(src)
+
+    def write(self, slot, block, value):
+        self.defs[slot][block] = value
+
+    def read(self, slot, block):
+        value = self.defs[slot].get(block)
+        if value is not None:
+            return self._resolve(value)
+        return self._read_recursive(slot, block)
+
+    def _resolve(self, value):
+        while id(value) in self.replaced:
+            value = self.replaced[id(value)][1]
+        return value
+
+    def _new_phi(self, slot, block):
+        builder = ir.IRBuilder(block)
+        builder.position_at_start(block)
+        return builder.phi(self.types[slot], name=self.names[slot])
+
+    def _read_recursive(self, slot, block):
+        preds = self.preds.get(block, ())
+        if block not in self.sealed:
+            value = self._new_phi(slot, block)
+            self.incomplete.setdefault(block, []).append((slot, value))
+        elif len(preds) == 1:
+            value = self.read(slot, preds[0])
+        else:
+            # The phi node breaks cycles of reads through loops.
+            phi = self._new_phi(slot, block)
+            self.write(slot, block, phi)
+            value = self._add_operands(slot, phi)
+        self.write(slot, block, value)
+        return value
+
+    def _add_operands(self, slot, phi):
+        self.filling.add(id(phi))
+        for pred in self.preds.get(phi.parent, ()):
+            value = self.read(slot, pred)
+            phi.add_incoming(value, pred)
+            if isinstance(value, ir.PhiInstr):
+                self.users.setdefault(id(value), []).append(phi)
+        self.filling.remove(id(phi))
+        return self._remove_trivial(phi)
+
+    def _remove_trivial(self, phi):
+        same = None
+        for value, _ in phi.incomings:
+            value = self._resolve(value)
+            if value is same or value is phi:
+                continue
+            if same is not None:
+                return phi
+            same = value
+        if same is None:
+            # The phi node is unreachable or in the entry of a loop
+            # with no definition.
+            same = ir.Constant(phi.type, ir.Undefined)
+        phi.parent.instructions.remove(phi)
+        # The phi node is kept alive, so that its id isn't reused.
+        self.replaced[id(phi)] = (phi, same)
+        for user in self.users.pop(id(phi), ()):
+            if (user is not phi and id(user) not in self.replaced and
+                    id(user) not in self.filling):
+                self._remove_trivial(user)
+        return self._resolve(same)
+
+    def seal(self, block):
+        """Mark a block whose predecessors are all known."""
+        for slot, phi in self.incomplete.pop(block, ()):
+            self._add_operands(slot, phi)
+        self.sealed.add(block)
+
+    def finish(self, function):
+        """Replace uses of removed phi nodes in a function."""
+        if not self.replaced:
+            return
+        replaced = self.replaced
+        for block in function.blocks:
+            for instr in block.instructions:
+                if isinstance(instr, ir.PhiInstr):
+                    values = [value for value, _ in instr.incomings]
+                else:
+                    values = instr.operands
+                for value in values:
+                    if id(value) in replaced:
+                        instr.replace_usage(value, self._resolve(value))
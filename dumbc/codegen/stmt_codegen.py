@@ -1,6 +1,8 @@
 from llvmlite import ir
 from collections import deque
 
+import dumbc.ast.ast as ast
+
 from dumbc.ast.visitor import StmtVisitor
 from dumbc.codegen.expr_codegen import ExpressionCodegen
 from dumbc.codegen.utils import convert_to_llvm_ty
@@ -13,36 +15,55 @@ class StatementCodegen(StmtVisitor): # pragma: nocover
         self.ctx = ctx
         self.expr_codegen = ExpressionCodegen(ctx)
         self.loop_stack = SymbolTable()
+        self.block_vars = deque()
 
     def visit_If(self, node):
-        builder = self.ctx.builder
-
-        then_bb = builder.append_basic_block(name='if.then')
-        else_bb = builder.append_basic_block(name='if.else')
+        ctx = self.ctx
+        builder = ctx.builder
         exit_bb = builder.append_basic_block(name='if.exit')
 
-        # Generate conditional branch
-        cond = self.expr_codegen.visit(node.cond)
-        br = builder.cbranch(cond, then_bb, else_bb)
+        # Links of an else-if chain share the exit block.
+        while True:
+            then_bb = builder.append_basic_block(name='if.then')
+            if node.otherwise is None:
+                else_bb = exit_bb
+            else:
+                else_bb = builder.append_basic_block(name='if.else')
+
+            # Generate conditional branch
+            cond = self.expr_codegen.visit(node.cond)
+            ctx.cbranch(cond, then_bb, else_bb)
+            ctx.seal(then_bb)
+
+            # Generate then block
+            builder.position_at_end(then_bb)
+            yield node.then
+            if builder.block.terminator is None:
+                ctx.branch(exit_bb)
 
-        # Generate then block
-        builder.position_at_end(then_bb)
-        self.visit(node.then)
-        if builder.block.terminator is None:
-            builder.branch(exit_bb)
+            builder.position_at_end(else_bb)
+            if else_bb is exit_bb:
+                break
+            ctx.seal(else_bb)
+            if not isinstance(node.otherwise, ast.If):
+                break
+            node = node.otherwise
 
         # Generate else block
-        builder.position_at_end(else_bb)
         if node.otherwise is not None:
-            self.visit(node.otherwise)
-        if builder.block.terminator is None:
-            builder.branch(exit_bb)
+            yield node.otherwise
+            if builder.block.terminator is None:
+                ctx.branch(exit_bb)
 
         # Block after if statement
+        exit_bb.parent.basic_blocks.remove(exit_bb)
+        exit_bb.parent.basic_blocks.append(exit_bb)
+        ctx.seal(exit_bb)
         builder.position_at_end(exit_bb)
 
     def visit_While(self, node):
-        builder = self.ctx.builder
+        ctx = self.ctx
+        builder = ctx.builder
 
         with self.loop_stack.scope():
             cond_bb = builder.append_basic_block('while.cond')
@@ -53,34 +74,45 @@ class StatementCodegen(StmtVisitor): # pragma: nocover
             self.loop_stack.set('exit_bb', exit_bb)
 
             # Generate condition
-            builder.branch(cond_bb)
+            ctx.branch(cond_bb)
             builder.position_at_end(cond_bb)
             cond = self.expr_codegen.visit(node.cond)
-            br = builder.cbranch(cond, body_bb, exit_bb)
+            ctx.cbranch(cond, body_bb, exit_bb)
+            ctx.seal(body_bb)
 
             # Generate body of the loop
             builder.position_at_end(body_bb)
-            self.visit(node.body)
+            yield node.body
             if builder.block.terminator is None:
-                builder.branch(cond_bb)
+                ctx.branch(cond_bb)
+
+            # All branches to the condition and the exit are known
+            # after the body.
+            ctx.seal(cond_bb)
+            ctx.seal(exit_bb)
 
             # Block after loop
             builder.position_at_end(exit_bb)
 
     def visit_Break(self, node):
-        builder = self.ctx.builder
         exit_bb = self.loop_stack.get('exit_bb')
-        builder.branch(exit_bb)
+        self.ctx.branch(exit_bb)
 
     def visit_Continue(self, node):
-        builder = self.ctx.builder
         entry_bb = self.loop_stack.get('entry_bb')
-        builder.branch(entry_bb)
+        self.ctx.branch(entry_bb)
 
     def visit_Block(self, node):
-        with self.ctx.symbol_table.scope():
-            for stmt in node.stmts:
-                self.visit(stmt)
+        self.block_vars.append([])
+        for stmt in node.stmts:
+            yield stmt
+        ptrs = self.block_vars.pop()
+        # Variables declared in the block go out of scope here. If
+        # the block has been left by return/break/continue, there is
+        # nowhere to put the markers.
+        if self.ctx.builder.block.terminator is None:
+            for ptr in reversed(ptrs):
+                self.ctx.lifetime_end(ptr)
 
     def visit_Return(self, node):
         builder = self.ctx.builder
@@ -91,12 +123,20 @@ class StatementCodegen(StmtVisitor): # pragma: nocover
         builder.ret(value)
 
     def visit_Var(self, node):
-        builder = self.ctx.builder
+        ctx = self.ctx
+        builder = ctx.builder
         ty = convert_to_llvm_ty(node.ty)
         initial_value = self.expr_codegen.visit(node.initial_value)
-        ptr = builder.alloca(ty, name=node.name)
+        if ctx.ssa is not None:
+            ctx.ssa.declare(node.slot, ty, node.name)
+            ctx.ssa.write(node.slot, builder.block, initial_value)
+            return
+        ptr = self.ctx.alloca(ty, name=node.name)
+        self.ctx.lifetime_start(ptr)
         builder.store(initial_value, ptr)
-        self.ctx.symbol_table.set(node.name, ptr)
+        self.ctx.slots[node.slot] = ptr
+        if self.block_vars:
+            self.block_vars[-1].append(ptr)
 
     def visit_Expression(self, node):
         self.expr_codegen.visit(node.expr)
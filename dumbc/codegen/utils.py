@@ -1,3 +1,5 @@
+import functools
+import re
 import subprocess
 import itertools
 
@@ -15,7 +17,7 @@ _BUILTIN_TY_TO_LLVM_TY = {
     BuiltinTypes.I32: ir.IntType(32),
     BuiltinTypes.U32: ir.IntType(32),
     BuiltinTypes.I64: ir.IntType(64),
-    BuiltinTypes.I64: ir.IntType(64),
+    BuiltinTypes.U64: ir.IntType(64),
     BuiltinTypes.F32: ir.FloatType(),
     BuiltinTypes.F64: ir.DoubleType(),
     BuiltinTypes.BOOL: ir.IntType(1),
@@ -23,6 +25,22 @@ _BUILTIN_TY_TO_LLVM_TY = {
     BuiltinTypes.VOID: ir.VoidType()
 }
 
+# Inlining thresholds clang uses for a given (opt_level, size_level).
+_INLINE_THRESHOLD = {
+    (1, 0): 0,
+    (2, 0): 225,
+    (3, 0): 275,
+    (2, 1): 75
+}
+
+# Chunks of IR text are at least this long(in characters), so parsing
+# of small modules doesn't dominate.
+_CHUNK_SIZE = 64 * 1024
+
+# Reference to a global value in IR text.
+_GLOBAL_REF = re.compile(r'@"((?:[^"\\]|\\.)*)"|'
+                         r'@([-a-zA-Z$._][-a-zA-Z$._0-9]*)')
+
 
 def convert_to_llvm_ty(ty): # pragma: nocover
     """Convert internal type class to LLVM representation.
@@ -36,13 +54,200 @@ def convert_to_llvm_ty(ty): # pragma: nocover
     return _BUILTIN_TY_TO_LLVM_TY[ty]
 
 
-def emit_object_file(module, output_file, triple=None): # pragma: nocover
-    """Emit object file from a module.
+def parse_opt_level(level):
+    """Convert an optimization level to (opt_level, size_level) pair.
+
+    Args:
+        level (str or int): One of 0, 1, 2, 3 or 's'.
+
+    Returns:
+        tuple: Speed and size optimization levels.
+
+    Examples:
+        >>> parse_opt_level('2')
+        (2, 0)
+        >>> parse_opt_level('s')
+        (2, 1)
+    """
+    level = str(level)
+    if level == 's':
+        return 2, 1
+    if level not in ('0', '1', '2', '3'):
+        raise ValueError('unknown optimization level %r' % level)
+    return int(level), 0
+
+
+def optimize_module(mod, opt_level=0, size_level=0): # pragma: nocover
+    """Run LLVM optimization passes over a module.
+
+    Args:
+        mod (ModuleRef): Parsed LLVM module.
+        opt_level (int, optional): Speed optimization level(0-3).
+        size_level (int, optional): Size optimization level(0-2).
+    """
+    if opt_level == 0 and size_level == 0:
+        return
+    with llvm.create_pass_manager_builder() as pmb:
+        pmb.opt_level = opt_level
+        pmb.size_level = size_level
+        pmb.inlining_threshold = _INLINE_THRESHOLD[(opt_level, size_level)]
+        pmb.loop_vectorize = opt_level >= 2 and size_level == 0
+        pmb.slp_vectorize = opt_level >= 2 and size_level == 0
+
+        fpm = llvm.create_function_pass_manager(mod)
+        pmb.populate(fpm)
+        mpm = llvm.create_module_pass_manager()
+        pmb.populate(mpm)
+
+    fpm.initialize()
+    for func in mod.functions:
+        fpm.run(func)
+    fpm.finalize()
+    mpm.run(mod)
+
+
+def _referenced_globals(text):
+    for match in _GLOBAL_REF.finditer(text):
+        name = match.group(1)
+        yield name if name is not None else match.group(2)
+
+
+def _declare(value):
+    if isinstance(value, ir.Function):
+        ftype = value.ftype
+        args = ', '.join(map(str, ftype.args))
+        return 'declare %s %s(%s)\n' % (ftype.return_type,
+                                         value.get_reference(), args)
+    # Global variables are defined in every chunk using them, copies
+    # of internal ones are renamed by the linker.
+    return str(value) + '\n'
+
+
+def iter_ir_chunks(module, chunk_size=_CHUNK_SIZE): # pragma: nocover
+    """Write LLVM IR of a module in self-contained chunks.
+
+    IR of functions is written one by one and grouped into chunks. A chunk
+    declares functions and defines global variables used by the functions
+    defined in it, so it can be parsed on its own. Global variables
+    must have internal linkage.
 
     Args:
         module (Module): Module with an LLVM IR.
-        output_file (str): Where to put emitted object file.
+        chunk_size (int, optional): Minimum length of a chunk, except
+            the last one.
+
+    Yields:
+        str: IR text of a chunk.
+    """
+    header = '; ModuleID = "%s"\ntarget triple = "%s"\n' \
+             'target datalayout = "%s"\n' % (module.name, module.triple,
+                                             module.data_layout)
+    functions = [value for value in module.globals.values()
+                 if isinstance(value, ir.Function) and value.blocks]
+    if not functions:
+        yield header
+        return
+    start = 0
+    while start < len(functions):
+        texts = []
+        size = 0
+        end = start
+        while end < len(functions) and size < chunk_size:
+            text = str(functions[end])
+            texts.append(text)
+            size += len(text)
+            end += 1
+        defined = {func.name for func in functions[start:end]}
+        lines = [header]
+        seen = set()
+        for text in texts:
+            for name in _referenced_globals(text):
+                if name in defined or name in seen:
+                    continue
+                seen.add(name)
+                value = module.globals.get(name)
+                if value is not None:
+                    lines.append(_declare(value))
+        lines.extend(texts)
+        yield ''.join(lines)
+        start = end
+
+
+def link_ir_chunks(chunks, verify=False): # pragma: nocover
+    """Parse chunks of IR text and link them into a single module.
+
+    Modules are linked pairwise like bits of a binary counter, so every
+    function is moved O(log n) times instead of linking each chunk into
+    an ever growing module.
+
+    Args:
+        chunks (iterable): IR texts written by `iter_ir_chunks`.
+        verify (bool, optional): Whether to verify the linked module.
+
+    Returns:
+        ModuleRef: Linked module.
+    """
+    # Modules with numbers of linked chunks, the numbers are decreasing
+    # powers of two.
+    stack = []
+    for text in chunks:
+        mod = llvm.parse_assembly(text)
+        count = 1
+        while stack and stack[-1][1] == count:
+            dest, _ = stack.pop()
+            dest.link_in(mod)
+            mod = dest
+            count *= 2
+        stack.append((mod, count))
+    mod, _ = stack.pop()
+    while stack:
+        dest, _ = stack.pop()
+        dest.link_in(mod)
+        mod = dest
+    if verify:
+        mod.verify()
+    return mod
+
+
+def sizeof_llvm_ty(ty): # pragma: nocover
+    """Get size of an LLVM type in bytes.
+
+    Args:
+        ty (ir.Type): Scalar LLVM type.
+
+    Returns:
+        int: Size of the type.
+    """
+    if isinstance(ty, ir.IntType):
+        return (ty.width + 7) // 8
+    elif isinstance(ty, ir.FloatType):
+        return 4
+    elif isinstance(ty, ir.DoubleType):
+        return 8
+    elif isinstance(ty, ir.PointerType):
+        return 8
+    raise RuntimeError('unknown size of type %r' % ty)
+
+
+def default_triple(): # pragma: nocover
+    """Get target triple of the host machine."""
+    return llvm.get_default_triple()
+
+
+def create_target_machine(triple=None, opt_level=0,
+                          jit=False): # pragma: nocover
+    """Initialize LLVM and create a target machine.
+
+    An execution engine takes ownership of its target machine, so every
+    engine needs a machine of its own.
+
+    Args:
         triple (str, optional): Platform triple.
+        opt_level (int, optional): Codegen optimization level(0-3).
+        jit (bool, optional): Whether the machine is used by JIT.
+
+    Returns:
+        TargetMachine: Target machine.
     """
     llvm.initialize()
     llvm.initialize_native_asmprinter()
@@ -51,9 +256,40 @@ def emit_object_file(module, output_file, triple=None): # pragma: nocover
         target = llvm.Target.from_default_triple()
     else:
         target = llvm.Target.from_triple(triple)
-    machine = target.create_target_machine()
-    mod = llvm.parse_assembly(str(module))
-    mod.verify()
+    return target.create_target_machine(opt=opt_level, jit=jit)
+
+
+@functools.lru_cache(maxsize=None)
+def get_target_machine(triple=None, opt_level=0): # pragma: nocover
+    """Get a target machine emitting object files.
+
+    Target machines are created once and reused afterwards.
+
+    Args:
+        triple (str, optional): Platform triple.
+        opt_level (int, optional): Codegen optimization level(0-3).
+
+    Returns:
+        TargetMachine: Target machine.
+    """
+    return create_target_machine(triple, opt_level)
+
+
+def emit_object_file(module, output_file, triple=None, opt_level=0,
+                     size_level=0, verify=False): # pragma: nocover
+    """Emit object file from a module.
+
+    Args:
+        module (Module): Module with an LLVM IR.
+        output_file (str): Where to put emitted object file.
+        triple (str, optional): Platform triple.
+        opt_level (int, optional): Speed optimization level(0-3).
+        size_level (int, optional): Size optimization level(0-2).
+        verify (bool, optional): Whether to verify the LLVM IR.
+    """
+    machine = get_target_machine(triple, opt_level)
+    mod = link_ir_chunks(iter_ir_chunks(module), verify)
+    optimize_module(mod, opt_level, size_level)
     with open(output_file, 'wb') as f:
         f.write(machine.emit_object(mod))
 
@@ -67,6 +303,9 @@ def link_object_files(output, object_files, libs=None, lib_paths=None): # pragma
         libs (list, optional): Library names to link.
         lib_paths (list, optional): Library search paths.
 
+    Returns:
+        subprocess.CompletedProcess: Finished linker process.
+
     NOTE: clang is used to link object files.
     """
     linker_args = []
@@ -77,4 +316,4 @@ def link_object_files(output, object_files, libs=None, lib_paths=None): # pragma
     args = itertools.chain(('clang', '-o', output),
                            object_files,
                            linker_args)
-    subprocess.run(args)
+    return subprocess.run(args)
@@ -2,6 +2,7 @@ __all__ = ('SourceFile',
            'Compiler')
 
 import argparse
+import multiprocessing
 import os
 import sys
 
@@ -9,18 +10,30 @@ import dumbc
 import dumbc.ast.ast as ast
 
 from dumbc.parser import Parser
-from dumbc.parser import tokenize
+from dumbc.parser import tokenize_to_buffer
 from dumbc.stdlib.injector import inject_stdlib
 from dumbc.transform import transform_ast
-from dumbc.codegen import Codegen
-from dumbc.codegen.utils import emit_object_file
-from dumbc.codegen.utils import link_object_files
 from dumbc.utils.diagnostics import DiagnosticsEngine
+from dumbc.utils.cache import ObjectCache
+from dumbc.utils.cache import default_cache_dir
+from dumbc.utils.cache import library_stamp
+from dumbc.utils.cache import make_key
+from dumbc.utils.partition import partition_functions
+from dumbc.server import build_on_server
+from dumbc.server import default_socket_path
+from dumbc.server import serve
 from dumbc.errors import Error
 
+# NOTE: LLVM backend(dumbc.codegen) is imported lazily. `dumbc build --server`
+# only forwards the request to the compile server and importing llvmlite
+# would take most of its run time.
+
 
 _STDLIBS = ['stddumb']
 
+# Default maximum size of the build cache(in bytes).
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024
+
 
 class SourceFile:
     """Object that encapsulates filename and content of a source file.
@@ -63,58 +76,281 @@ class Compiler:
         dump_ir (bool, optional): Whether to print out LLVM IR.
         clean (bool, optional): If it is `True` then all object files will be
             deleted after compilation is done.
+        opt_level (str, optional): Optimization level(0, 1, 2, 3 or s).
+        cache_dir (str, optional): Where to keep compiled code between
+            runs. If it's None, nothing is cached.
+        cache_size (int, optional): Maximum size of the cache in bytes.
+        time_passes (bool, optional): Whether to print out time spent
+            by each pass.
+        report_unused (bool, optional): Whether to report functions
+            removed as unreachable from `main`.
+        use_ssa (bool, optional): Whether to emit variables as SSA values
+            instead of stack slots.
+        use_mir (bool, optional): Whether to generate code through the
+            mid-level IR. At optimization levels above 0 it's optimized
+            before LLVM IR is emitted, and at level 1 its passes are run
+            instead of the LLVM pipeline.
+        verify_ir (bool, optional): Whether to verify generated LLVM IR.
+        jobs (int, optional): Number of processes generating code. With
+            more than one, functions are split into partitions compiled
+            to separate object files, 0 means a process per CPU.
     """
 
-    def __init__(self, source, output, stdlib=None, dump_ir=False, clean=True):
+    def __init__(self, source, output=None, stdlib=None, dump_ir=False,
+                 clean=True, opt_level='0', cache_dir=None,
+                 cache_size=DEFAULT_CACHE_SIZE, time_passes=False,
+                 report_unused=False, use_ssa=False, use_mir=False,
+                 verify_ir=False, jobs=1):
         self.source = source
         self.output = output
         self.stdlib = stdlib
         self.dump_ir = dump_ir
         self.clean = clean
+        from dumbc.codegen.utils import parse_opt_level
+        self.opt_level, self.size_level = parse_opt_level(opt_level)
+        self.cache_dir = cache_dir
+        self.cache_size = cache_size
+        self.time_passes = time_passes
+        self.report_unused = report_unused
+        self.use_ssa = use_ssa
+        self.use_mir = use_mir
+        self.verify_ir = verify_ir
+        self.jobs = jobs or os.cpu_count() or 1
         self.diag = DiagnosticsEngine(source.filename, source.text)
 
-    def _build_module(self):
+    def _build_ast(self):
         try:
-            tokens = tokenize(self.source.text)
+            tokens = tokenize_to_buffer(self.source.text)
             parser = Parser(tokens, self.diag)
             ast = parser.parse_translation_unit()
 
             inject_stdlib(ast)
-            ast = transform_ast(ast)
-
-            codegen = Codegen(module_name=self.source.filename)
-            module = codegen.generate(ast)
+            timings = {} if self.time_passes else None
+            unused = [] if self.report_unused else None
+            ast = transform_ast(ast, timings, unused)
+            if timings is not None:
+                _print_timings(timings)
+            if unused is not None:
+                self._report_unused(unused)
         except Error as e:
             self.diag.error(e.message, loc=e.loc)
             sys.exit(-1)
-        return module
+        return ast
+
+    def _generate(self, ast):
+        if self.use_mir:
+            return self._generate_through_mir(ast)
+        from dumbc.codegen import Codegen
+        codegen = Codegen(module_name=self.source.filename,
+                          use_ssa=self.use_ssa)
+        return codegen.generate(ast)
+
+    def _build_module(self):
+        return self._generate(self._build_ast())
+
+    def _generate_through_mir(self, ast):
+        from dumbc.mir import build_module
+        from dumbc.mir import optimize_module
+        from dumbc.mir.emit import emit_module
+        module = build_module(ast)
+        if self.opt_level > 0 or self.size_level > 0:
+            optimize_module(module)
+        return emit_module(module, self.source.filename)
+
+    def _llvm_levels(self):
+        """Return optimization levels of the LLVM pipeline."""
+        if self.use_mir and (self.opt_level, self.size_level) == (1, 0):
+            # Passes over the mid-level IR are all that's done at -O1.
+            return 0, 0
+        return self.opt_level, self.size_level
+
+    def _report_unused(self, funcs):
+        for func in funcs:
+            msg = 'unused function %r removed' % func.proto.name
+            self.diag.info(msg, loc=func.loc)
+
+    def _open_cache(self, name):
+        if self.cache_dir is None:
+            return None
+        return ObjectCache(os.path.join(self.cache_dir, name),
+                           max_size=self.cache_size)
+
+    def _object_key(self):
+        from dumbc.codegen.utils import default_triple
+        # The key covers everything an object file depends on, so on
+        # a cache hit the whole front-end and codegen are skipped.
+        return make_key(dumbc.VERSION, default_triple(),
+                        self.opt_level, self.size_level, self.use_ssa,
+                        self.use_mir, self.source.text)
+
+    def _emit_object_file(self, object_file, cache):
+        from dumbc.codegen.utils import emit_object_file
+        key = self._object_key()
+        obj = cache.get(key) if cache is not None else None
+        if obj is not None:
+            with open(object_file, 'wb') as f:
+                f.write(obj)
+            return
 
-    def run(self):
         module = self._build_module()
+        opt_level, size_level = self._llvm_levels()
+        emit_object_file(module, object_file,
+                         opt_level=opt_level,
+                         size_level=size_level,
+                         verify=self.verify_ir)
+        if cache is not None:
+            with open(object_file, 'rb') as f:
+                cache.put(key, f.read())
+
+    def _emit_partition(self, unit, partition, object_file):
+        from dumbc.codegen.utils import emit_object_file
+        # Functions of other partitions are left as declarations.
+        keep = set(partition)
+        for i, decl in enumerate(unit.decls):
+            if i not in keep and isinstance(decl, ast.Function):
+                decl.body = None
+        module = self._generate(unit)
+        opt_level, size_level = self._llvm_levels()
+        emit_object_file(module, object_file,
+                         opt_level=opt_level,
+                         size_level=size_level,
+                         verify=self.verify_ir)
+
+    def _emit_object_files(self, cache):
+        """Emit object files of the program.
+
+        With more than one job, partitions of functions are compiled
+        by a pool of forked processes, which inherit the transformed
+        tree instead of receiving it pickled. Objects are returned in
+        order of partitions, so symbols are linked in the same order
+        whatever the number of processes is. Objects of partitions
+        aren't cached.
+
+        Returns:
+            list: Paths to the object files.
+        """
+        object_file = self.output + '.o'
+        if self.jobs == 1:
+            self._emit_object_file(object_file, cache)
+            return [object_file]
+
+        unit = self._build_ast()
+        partitions = partition_functions(unit, self.jobs)
+        if len(partitions) == 1:
+            self._emit_partition(unit, partitions[0], object_file)
+            return [object_file]
+
+        global _parallel_build
+        object_files = ['%s.%d.o' % (self.output, i)
+                        for i in range(len(partitions))]
+        _parallel_build = (self, unit, partitions, object_files)
+        try:
+            ctx = multiprocessing.get_context('fork')
+            with ctx.Pool(len(partitions)) as pool:
+                pool.map(_emit_partition, range(len(partitions)))
+        finally:
+            _parallel_build = None
+        return object_files
 
+    def run(self):
+        from dumbc.codegen.utils import link_object_files
         if self.dump_ir:
+            module = self._build_module()
             print(module)
             return
 
-        object_file = self.output + '.o'
-        emit_object_file(module, object_file)
-
+        cache = self._open_cache('build')
         linker_args = {
             'output': self.output,
-            'object_files': [object_file],
             'libs': _STDLIBS
         }
         if self.stdlib is not None:
             linker_args['lib_paths'] = [self.stdlib]
-        link_object_files(**linker_args)
+
+        exe_key = None
+        if cache is not None:
+            # An executable is cached only if the libraries it's linked
+            # against are found, so rebuilding them invalidates it.
+            libs = [library_stamp(lib, linker_args.get('lib_paths'))
+                    for lib in _STDLIBS]
+            if None not in libs:
+                exe_key = make_key(self._object_key(), libs)
+        if exe_key is not None:
+            exe = cache.get(exe_key)
+            if exe is not None:
+                with open(self.output, 'wb') as f:
+                    f.write(exe)
+                os.chmod(self.output, 0o755)
+                return
+
+        object_files = self._emit_object_files(cache)
+
+        linked = link_object_files(object_files=object_files, **linker_args)
+
+        if exe_key is not None and linked.returncode == 0:
+            with open(self.output, 'rb') as f:
+                cache.put(exe_key, f.read())
 
         if self.clean:
-            os.remove(object_file)
+            for object_file in object_files:
+                os.remove(object_file)
+
+        if linked.returncode != 0:
+            sys.exit(linked.returncode)
+
+    def execute(self):
+        """Compile the source file in memory and run it.
+
+        Returns:
+            int: Exit code of the program.
+        """
+        from dumbc.codegen.jit import run_jit
+        cache = self._open_cache('jit')
+        # Like object files, compiled code is looked up by the source,
+        # so on a cache hit the front-end and codegen are skipped.
+        key = self._object_key() if cache is not None else None
+        opt_level, size_level = self._llvm_levels()
+        return run_jit(self._build_module,
+                       opt_level=opt_level,
+                       size_level=size_level,
+                       cache=cache,
+                       key=key,
+                       verify=self.verify_ir)
+
+
+# Compiler, transformed tree, partitions and object files of the build
+# run by a pool of forked processes.
+_parallel_build = None
+
+
+def _emit_partition(index): # pragma: nocover
+    compiler, unit, partitions, object_files = _parallel_build
+    compiler._emit_partition(unit, partitions[index], object_files[index])
+
+
+def _read_source(filename):
+    # Unreadable input is reported as a diagnostic, like errors in it.
+    try:
+        return SourceFile.from_filename(filename)
+    except OSError as e:
+        DiagnosticsEngine(filename, '').error(e.strerror or str(e))
+        sys.exit(-1)
+
+
+def _print_timings(timings):
+    total = sum(timings.values())
+    print('===--- Pass execution timing report ---===')
+    print('  Total execution time: %.4f seconds' % total)
+    print()
+    print('  %-10s  %-7s  %s' % ('Wall time', 'Percent', 'Name'))
+    for name, seconds in sorted(timings.items(), key=lambda t: -t[1]):
+        percent = 100 * seconds / total if total else 0
+        print('  %10.4f  %6.1f%%  %s' % (seconds, percent, name))
 
 
 def parse_args():
     parser = argparse.ArgumentParser()
-    subparsers = parser.add_subparsers()
+    subparsers = parser.add_subparsers(dest='command')
 
     build_cmd = subparsers.add_parser('build')
     build_cmd.add_argument('file',
@@ -127,6 +363,67 @@ def parse_args():
                            help="If set it'll delete intermediate object files")
     build_cmd.add_argument('--stdlib',
                            help='Path to the std lib')
+    build_cmd.add_argument('-O', dest='opt_level', default='0',
+                           choices=('0', '1', '2', '3', 's'),
+                           help='Optimization level')
+    build_cmd.add_argument('--cache-dir', default=default_cache_dir(),
+                           help='Where to cache object files and executables '
+                                '(default: %(default)s)')
+    build_cmd.add_argument('--no-cache', action='store_const', const=None,
+                           dest='cache_dir',
+                           help="Don't use the build cache(also if "
+                                "$DUMBC_NO_CACHE is set)")
+    build_cmd.add_argument('--cache-size', type=int,
+                           default=DEFAULT_CACHE_SIZE,
+                           help='Maximum size of the cache in bytes')
+    build_cmd.add_argument('--time-passes', action='store_true',
+                           help='Show time spent by each pass')
+    build_cmd.add_argument('--report-unused', action='store_true',
+                           help='Report functions removed as unused')
+    build_cmd.add_argument('--ssa', action='store_true', dest='use_ssa',
+                           help='Emit variables as SSA values')
+    build_cmd.add_argument('--mir', action='store_true', dest='use_mir',
+                           help='Generate code through the mid-level IR')
+    build_cmd.add_argument('--verify-ir', action='store_true',
+                           help='Verify generated LLVM IR')
+    build_cmd.add_argument('-j', '--jobs', type=int, default=1,
+                           help='Number of processes generating code '
+                                '(0 is a process per CPU)')
+    build_cmd.add_argument('--server', action='store_true',
+                           help='Build on the compile server if it is running')
+    build_cmd.add_argument('--socket', default=default_socket_path(),
+                           help='Path to the compile server socket')
+
+    run_cmd = subparsers.add_parser('run')
+    run_cmd.add_argument('file',
+                         help='Input file')
+    run_cmd.add_argument('-O', dest='opt_level', default='0',
+                         choices=('0', '1', '2', '3', 's'),
+                         help='Optimization level')
+    run_cmd.add_argument('--cache-dir', default=default_cache_dir(),
+                         help='Where to cache compiled code '
+                              '(default: %(default)s)')
+    run_cmd.add_argument('--no-cache', action='store_const', const=None,
+                         dest='cache_dir',
+                         help="Don't cache compiled code(also if "
+                              "$DUMBC_NO_CACHE is set)")
+    run_cmd.add_argument('--cache-size', type=int,
+                         default=DEFAULT_CACHE_SIZE,
+                         help='Maximum size of the cache in bytes')
+    run_cmd.add_argument('--time-passes', action='store_true',
+                         help='Show time spent by each pass')
+    run_cmd.add_argument('--report-unused', action='store_true',
+                         help='Report functions removed as unused')
+    run_cmd.add_argument('--ssa', action='store_true', dest='use_ssa',
+                         help='Emit variables as SSA values')
+    run_cmd.add_argument('--mir', action='store_true', dest='use_mir',
+                         help='Generate code through the mid-level IR')
+    run_cmd.add_argument('--verify-ir', action='store_true',
+                         help='Verify generated LLVM IR')
+
+    serve_cmd = subparsers.add_parser('serve')
+    serve_cmd.add_argument('--socket', default=default_socket_path(),
+                           help='Path to the compile server socket')
 
     parser.add_argument('--version', action='version', version=dumbc.VERSION)
 
@@ -141,12 +438,56 @@ def _basename(path):
 
 def main():
     args = parse_args()
-    source = SourceFile.from_filename(args['file'])
+    if args['command'] == 'serve':
+        serve(args['socket'])
+        return
+    if args['command'] == 'build' and args['server']:
+        request = {
+            'file': args['file'],
+            'output': _basename(args['file']),
+            'stdlib': args['stdlib'],
+            'dump_ir': args['dump_ir'],
+            'clean': args['clean'],
+            'opt_level': args['opt_level'],
+            'cache_dir': args['cache_dir'],
+            'cache_size': args['cache_size'],
+            'time_passes': args['time_passes'],
+            'report_unused': args['report_unused'],
+            'use_ssa': args['use_ssa'],
+            'use_mir': args['use_mir'],
+            'verify_ir': args['verify_ir'],
+            'jobs': args['jobs']
+        }
+        status = build_on_server(request, args['socket'])
+        # Fall back to in-process compilation if the server isn't running.
+        if status is not None:
+            sys.exit(status)
+    source = _read_source(args['file'])
+    if args['command'] == 'run':
+        compiler = Compiler(source=source,
+                            opt_level=args['opt_level'],
+                            cache_dir=args['cache_dir'],
+                            cache_size=args['cache_size'],
+                            time_passes=args['time_passes'],
+                            report_unused=args['report_unused'],
+                            use_ssa=args['use_ssa'],
+                            use_mir=args['use_mir'],
+                            verify_ir=args['verify_ir'])
+        sys.exit(compiler.execute())
     compiler = Compiler(source=source,
                         output=_basename(args['file']),
                         stdlib=args['stdlib'],
                         dump_ir=args['dump_ir'],
-                        clean=args['clean'])
+                        clean=args['clean'],
+                        opt_level=args['opt_level'],
+                        cache_dir=args['cache_dir'],
+                        cache_size=args['cache_size'],
+                        time_passes=args['time_passes'],
+                        report_unused=args['report_unused'],
+                        use_ssa=args['use_ssa'],
+                        use_mir=args['use_mir'],
+                        verify_ir=args['verify_ir'],
+                        jobs=args['jobs'])
     compiler.run()
 
 
@@ -0,0 +1,10 @@
+from dumbc.mir.mir import *
+from dumbc.mir.build import *
+from dumbc.mir.optimize import *
+
+# NOTE: dumbc.mir.emit imports llvmlite, so it isn't imported here.
+
+
+__all__ = (mir.__all__ +
+           build.__all__ +
+           optimize.__all__)
@@ -0,0 +1,169 @@
+__all__ = ('reverse_postorder',
+           'dominators',
+           'dominator_tree',
+           'dominates',
+           'dominance_frontiers',
+           'Loop',
+           'find_loops')
+
+
+def reverse_postorder(func):
+    """Return blocks reachable from the entry in reverse postorder.
+
+    Every block comes after its dominators.
+    """
+    order = []
+    visited = {func.entry}
+    stack = [(func.entry, iter(func.entry.successors()))]
+    while stack:
+        block, succs = stack[-1]
+        for succ in succs:
+            if succ not in visited:
+                visited.add(succ)
+                stack.append((succ, iter(succ.successors())))
+                break
+        else:
+            stack.pop()
+            order.append(block)
+    order.reverse()
+    return order
+
+
+def dominators(func):
+    """Compute immediate dominators of reachable blocks.
+
+    Implements "A Simple, Fast Dominance Algorithm" by Cooper, Harvey
+    and Kennedy.
+
+    Returns:
+        dict: Immediate dominator of every reachable block, None for
+            the entry block.
+    """
+    order = reverse_postorder(func)
+    index = {block: i for i, block in enumerate(order)}
+    preds = func.predecessors()
+    entry = func.entry
+    idom = {entry: entry}
+
+    def intersect(a, b):
+        while a is not b:
+            while index[a] > index[b]:
+                a = idom[a]
+            while index[b] > index[a]:
+                b = idom[b]
+        return a
+
+    changed = True
+    while changed:
+        changed = False
+        for block in order[1:]:
+            new_idom = None
+            for pred in preds[block]:
+                if pred not in idom:
+                    continue
+                if new_idom is None:
+                    new_idom = pred
+                else:
+                    new_idom = intersect(pred, new_idom)
+            if idom.get(block) is not new_idom:
+                idom[block] = new_idom
+                changed = True
+    idom[entry] = None
+    return idom
+
+
+def dominator_tree(idom):
+    """Return children of every block in a dominator tree."""
+    children = {block: [] for block in idom}
+    for block, parent in idom.items():
+        if parent is not None:
+            children[parent].append(block)
+    return children
+
+
+def dominates(idom, a, b):
+    """Check whether a block dominates another one."""
+    while b is not None:
+        if b is a:
+            return True
+        b = idom[b]
+    return False
+
+
+def dominance_frontiers(func, idom):
+    """Compute dominance frontiers of reachable blocks.
+
+    Returns:
+        dict: Set of blocks in the dominance frontier of every block.
+    """
+    preds = func.predecessors()
+    frontiers = {block: set() for block in idom}
+    for block in idom:
+        block_preds = [pred for pred in preds[block] if pred in idom]
+        if len(block_preds) < 2:
+            continue
+        for pred in block_preds:
+            runner = pred
+            while runner is not idom[block]:
+                frontiers[runner].add(block)
+                runner = idom[runner]
+    return frontiers
+
+
+class Loop:
+    """Natural loop.
+
+    Attributes:
+        header (Block): Block every iteration starts in.
+        blocks (set): Blocks of the loop, including blocks of nested
+            loops.
+        parent (Loop): Innermost loop containing the loop, or None.
+        depth (int): Number of loops containing the loop, plus one.
+    """
+
+    def __init__(self, header):
+        self.header = header
+        self.blocks = {header}
+        self.parent = None
+        self.depth = 1
+
+    def __repr__(self):
+        return '<Loop %s>' % self.header.name
+
+
+def find_loops(func, idom):
+    """Find natural loops of a function.
+
+    A loop is formed by back edges, edges to a block dominating their
+    source. Back edges to the same header form a single loop.
+
+    Returns:
+        list: Loops, every loop after the loops containing it.
+    """
+    preds = func.predecessors()
+    loops = {}
+    for block in idom:
+        for succ in block.successors():
+            if not dominates(idom, succ, block):
+                continue
+            loop = loops.get(succ)
+            if loop is None:
+                loop = loops[succ] = Loop(succ)
+            # Blocks reaching the source of the back edge without
+            # passing through the header.
+            stack = [block]
+            while stack:
+                node = stack.pop()
+                if node in loop.blocks:
+                    continue
+                loop.blocks.add(node)
+                stack.extend(pred for pred in preds[node] if pred in idom)
+    result = sorted(loops.values(), key=lambda loop: -len(loop.blocks))
+    for i, loop in enumerate(result):
+        # The smallest enclosing loop comes last.
+        for outer in result[:i]:
+            if loop.header in outer.blocks and outer is not loop:
+                loop.parent = outer
+        if loop.parent is not None:
+            loop.depth = loop.parent.depth + 1
+    return result
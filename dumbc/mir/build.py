@@ -0,0 +1,240 @@
+__all__ = ('build_module',)
+
+import dumbc.ast.ast as ast
+
+from dumbc.ast.ast import BuiltinTypes
+from dumbc.ast.ast import Operator
+from dumbc.ast.visitor import ExprVisitor
+from dumbc.ast.visitor import StmtVisitor
+from dumbc.mir import mir
+from dumbc.mir.dce import remove_unreachable_blocks
+from dumbc.mir.ssa import promote_variables
+from dumbc.transform.const_eval import constant_value
+
+
+class FunctionBuilder(ExprVisitor, StmtVisitor):
+    """Builder of a function of the mid-level IR from its AST.
+
+    Variables are accessed with `get` and `set` instructions, which
+    are promoted to SSA values once the function is built.
+
+    Args:
+        decls (list): Declarations of the translation unit.
+        func (Function): Function to be filled.
+        num_slots (int): Number of slots of arguments and variables.
+    """
+
+    def __init__(self, decls, func, num_slots):
+        self.decls = decls
+        self.func = func
+        self.block = None
+        self.slot_types = [None] * num_slots
+        # Condition and exit blocks of enclosing loops.
+        self.loops = []
+
+    def _start(self, block):
+        self.func.blocks.append(block)
+        self.block = block
+
+    def _emit(self, opcode, ty, operands, attr=None):
+        if self.block.terminator is not None:
+            # Code after return, break or continue is unreachable.
+            self._start(self.func.new_block('dead'))
+        instr = self.func.new_instr(opcode, ty, operands, attr)
+        instr.block = self.block
+        self.block.instrs.append(instr)
+        return instr
+
+    def _jump(self, target):
+        if self.block.terminator is None:
+            self._emit(mir.JUMP, None, [], (target,))
+
+    def _new_slot(self, ty):
+        self.slot_types.append(ty)
+        return len(self.slot_types) - 1
+
+    def build(self, decl):
+        func = self.func
+        self._start(func.new_block('entry'))
+        for arg, value in zip(decl.proto.args, func.args):
+            self.slot_types[arg.slot] = value.ty
+            self._emit(mir.SET, None, [value], arg.slot)
+        self.visit(decl.body)
+        if self.block.terminator is None:
+            # The end of a function returning a value is unreachable
+            # after dead code elimination.
+            if func.ret_ty == BuiltinTypes.VOID:
+                self._emit(mir.RET, None, [])
+            else:
+                self._emit(mir.UNREACHABLE, None, [])
+
+    def _logical(self, node):
+        # The result is kept in a temporary variable set in both
+        # branches.
+        is_or = node.op == Operator.LOGICAL_OR
+        slot = self._new_slot(BuiltinTypes.BOOL)
+        left = yield node.left
+        self._emit(mir.SET, None, [left], slot)
+        rhs = self.func.new_block('rhs')
+        exit = self.func.new_block('exit')
+        targets = (exit, rhs) if is_or else (rhs, exit)
+        self._emit(mir.BR, None, [left], targets)
+        self._start(rhs)
+        right = yield node.right
+        self._emit(mir.SET, None, [right], slot)
+        self._jump(exit)
+        self._start(exit)
+        return self._emit(mir.GET, BuiltinTypes.BOOL, [], slot)
+
+    def visit_BinaryOp(self, node):
+        if node.op in (Operator.LOGICAL_AND, Operator.LOGICAL_OR):
+            return (yield from self._logical(node))
+        left = yield node.left
+        right = yield node.right
+        ty = BuiltinTypes.BOOL if Operator.relational(node.op) else node.ty
+        return self._emit(mir.BINOP, ty, [left, right], node.op)
+
+    def visit_Assignment(self, node):
+        # Augmented assignments are lowered to plain ones.
+        if node.op is not None:
+            raise RuntimeError('unlowered assignment %r' % node.op)
+        value = yield node.rvalue
+        self._emit(mir.SET, None, [value], node.lvalue.slot)
+        return value
+
+    def visit_UnaryOp(self, node):
+        value = yield node.value
+        if node.op == Operator.UNARY_PLUS:
+            return value
+        return self._emit(mir.UNOP, node.ty, [value], node.op)
+
+    def visit_Cast(self, node):
+        value = yield node.value
+        return self._emit(mir.CAST, node.dst_ty, [value], node.src_ty)
+
+    def _constant(self, node, default_ty):
+        value = constant_value(node)
+        if value is None:
+            # Values out of range are left to be reported by LLVM.
+            return mir.Const(node.value, node.ty or default_ty)
+        return mir.Const(*value)
+
+    def visit_IntegerConstant(self, node):
+        return self._constant(node, BuiltinTypes.I32)
+
+    def visit_FloatConstant(self, node):
+        return self._constant(node, BuiltinTypes.F32)
+
+    def visit_BooleanConstant(self, node):
+        return mir.Const(bool(node.value), BuiltinTypes.BOOL)
+
+    def visit_StringConstant(self, node):
+        return mir.Const(node.value, BuiltinTypes.STR)
+
+    def visit_Identifier(self, node):
+        return self._emit(mir.GET, self.slot_types[node.slot], [], node.slot)
+
+    def visit_FuncCall(self, node):
+        args = []
+        for arg in node.args:
+            value = yield arg
+            args.append(value)
+        ret_ty = self.decls[node.slot].proto.ret_ty
+        return self._emit(mir.CALL, ret_ty, args, node.slot)
+
+    def visit_If(self, node):
+        func = self.func
+        exit = func.new_block('if.exit')
+
+        # Links of an else-if chain share the exit block.
+        while True:
+            then = func.new_block('if.then')
+            if node.otherwise is None:
+                otherwise = exit
+            else:
+                otherwise = func.new_block('if.else')
+            cond = yield node.cond
+            self._emit(mir.BR, None, [cond], (then, otherwise))
+            self._start(then)
+            yield node.then
+            self._jump(exit)
+            if otherwise is exit:
+                break
+            self._start(otherwise)
+            if not isinstance(node.otherwise, ast.If):
+                yield node.otherwise
+                self._jump(exit)
+                break
+            node = node.otherwise
+        self._start(exit)
+
+    def visit_While(self, node):
+        func = self.func
+        cond_block = func.new_block('while.cond')
+        body = func.new_block('while.body')
+        exit = func.new_block('while.exit')
+        self._jump(cond_block)
+        self._start(cond_block)
+        cond = yield node.cond
+        self._emit(mir.BR, None, [cond], (body, exit))
+        self._start(body)
+        self.loops.append((cond_block, exit))
+        yield node.body
+        self.loops.pop()
+        self._jump(cond_block)
+        self._start(exit)
+
+    def visit_Break(self, node):
+        self._emit(mir.JUMP, None, [], (self.loops[-1][1],))
+
+    def visit_Continue(self, node):
+        self._emit(mir.JUMP, None, [], (self.loops[-1][0],))
+
+    def visit_Block(self, node):
+        for stmt in node.stmts:
+            yield stmt
+
+    def visit_Return(self, node):
+        operands = []
+        if node.value is not None:
+            value = yield node.value
+            operands.append(value)
+        self._emit(mir.RET, None, operands)
+
+    def visit_Var(self, node):
+        value = yield node.initial_value
+        self.slot_types[node.slot] = node.ty
+        self._emit(mir.SET, None, [value], node.slot)
+
+    def visit_Expression(self, node):
+        yield node.expr
+
+
+def build_module(unit):
+    """Build a module of the mid-level IR from a typed translation unit.
+
+    Variables of functions are promoted to SSA values.
+
+    Args:
+        unit (TranslationUnit): Transformed translation unit.
+
+    Returns:
+        Module: Built module.
+    """
+    functions = []
+    for decl in unit.decls:
+        if not isinstance(decl, ast.Function):
+            functions.append(None)
+            continue
+        proto = decl.proto
+        args = [mir.Arg(i, arg.name, arg.ty)
+                for i, arg in enumerate(proto.args)]
+        func = mir.Function(proto.name, args, proto.ret_ty,
+                            pure=bool(decl.pure))
+        functions.append(func)
+        if decl.body is None:
+            continue
+        FunctionBuilder(unit.decls, func, decl.num_slots).build(decl)
+        remove_unreachable_blocks(func)
+        promote_variables(func)
+    return mir.Module(functions)
@@ -0,0 +1,130 @@
+__all__ = ('remove_unreachable_blocks',
+           'remove_dead_instrs',
+           'simplify_cfg')
+
+from dumbc.mir import mir
+from dumbc.mir.analysis import reverse_postorder
+
+
+def _prune_phis(func):
+    # Keep a single incoming value of a phi node per predecessor.
+    preds = func.predecessors()
+    for block in func.blocks:
+        block_preds = set(preds[block])
+        for phi in block.phis():
+            operands = []
+            incoming = []
+            for value, pred in zip(phi.operands, phi.attr):
+                if pred in block_preds and pred not in incoming:
+                    operands.append(value)
+                    incoming.append(pred)
+            phi.operands = operands
+            phi.attr = incoming
+
+
+def remove_unreachable_blocks(func):
+    """Remove blocks unreachable from the entry of a function.
+
+    Incoming values of phi nodes from blocks which are no longer their
+    predecessors are removed too.
+    """
+    reachable = set(reverse_postorder(func))
+    if len(reachable) != len(func.blocks):
+        func.blocks = [block for block in func.blocks if block in reachable]
+    _prune_phis(func)
+
+
+def remove_dead_instrs(func):
+    """Remove instructions whose results are never used.
+
+    Instructions with side effects (calls, terminators and variable
+    stores) and instructions they use are live, everything else is
+    removed, including cycles of phi nodes using each other.
+    """
+    live = set()
+    work = []
+    for instr in func.instrs():
+        if instr.is_terminator or instr.opcode in (mir.CALL, mir.SET):
+            live.add(instr)
+            work.append(instr)
+    while work:
+        instr = work.pop()
+        for value in instr.operands:
+            if isinstance(value, mir.Instr) and value not in live:
+                live.add(value)
+                work.append(value)
+    for block in func.blocks:
+        block.instrs = [instr for instr in block.instrs if instr in live]
+
+
+def _remove_trivial_phis(func):
+    # A phi node merging a single value(besides itself) is replaced
+    # with the value.
+    values = {}
+    changed = True
+    while changed:
+        changed = False
+        for block in func.blocks:
+            for phi in block.phis():
+                if phi in values:
+                    continue
+                same = None
+                for value in phi.operands:
+                    while value in values:
+                        value = values[value]
+                    if value is phi or value is same:
+                        continue
+                    if same is not None:
+                        break
+                    same = value
+                else:
+                    values[phi] = same if same is not None \
+                        else mir.Undef(phi.ty)
+                    changed = True
+    func.replace_uses(values)
+    func.remove_instrs(values)
+
+
+def simplify_cfg(func):
+    """Simplify the control flow graph of a function.
+
+    Conditional branches to a single block become jumps, unreachable
+    blocks are removed, and a block is merged into its predecessor if
+    it's the only successor of the predecessor.
+    """
+    for block in func.blocks:
+        terminator = block.terminator
+        if (terminator.opcode == mir.BR and
+                terminator.attr[0] is terminator.attr[1]):
+            terminator.opcode = mir.JUMP
+            terminator.operands = []
+            terminator.attr = (terminator.attr[0],)
+    remove_unreachable_blocks(func)
+    _remove_trivial_phis(func)
+
+    preds = func.predecessors()
+    removed = set()
+    for block in func.blocks:
+        if block in removed:
+            continue
+        while True:
+            terminator = block.terminator
+            if terminator.opcode != mir.JUMP:
+                break
+            succ = terminator.attr[0]
+            if (succ is block or succ is func.entry or
+                    preds[succ] != [block]):
+                break
+            # Phi nodes with a single predecessor have been removed.
+            block.instrs.pop()
+            for instr in succ.instrs:
+                instr.block = block
+            block.instrs.extend(succ.instrs)
+            removed.add(succ)
+            for next_block in succ.successors():
+                preds[next_block] = [block if pred is succ else pred
+                                     for pred in preds[next_block]]
+                for phi in next_block.phis():
+                    phi.attr = [block if pred is succ else pred
+                                for pred in phi.attr]
+    func.blocks = [block for block in func.blocks if block not in removed]
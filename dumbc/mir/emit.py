@@ -0,0 +1,180 @@
+__all__ = ('emit_module',)
+
+from llvmlite import ir
+
+from dumbc.ast.ast import BuiltinTypes
+from dumbc.ast.ast import Operator
+from dumbc.codegen.expr_codegen import _CMP_OP
+from dumbc.codegen.expr_codegen import _FP_BINOP_METHODS
+from dumbc.codegen.expr_codegen import _SI_BINOP_METHODS
+from dumbc.codegen.expr_codegen import _UI_BINOP_METHODS
+from dumbc.codegen.utils import NBITS
+from dumbc.codegen.utils import convert_to_llvm_ty
+from dumbc.mir import mir
+from dumbc.mir.analysis import reverse_postorder
+
+
+class _FunctionEmitter: # pragma: nocover
+
+    def __init__(self, module, functions, strings):
+        self.module = module
+        self.functions = functions
+        self.strings = strings
+        self.builder = None
+        self.args = None
+        self.values = {}
+
+    def _string(self, text):
+        const = self.strings.get(text)
+        if const is None:
+            buf = bytearray((text + '\00').encode('utf-8'))
+            value = ir.Constant(ir.ArrayType(ir.IntType(8), len(buf)), buf)
+            name = self.module.get_unique_name('str')
+            const = ir.GlobalVariable(self.module, value.type, name=name)
+            const.global_constant = True
+            const.initializer = value
+            const.linkage = 'internal'
+            self.strings[text] = const
+        return const.bitcast(convert_to_llvm_ty(BuiltinTypes.STR))
+
+    def value(self, value):
+        if isinstance(value, mir.Instr):
+            return self.values[value]
+        elif isinstance(value, mir.Arg):
+            return self.args[value.index]
+        ty = convert_to_llvm_ty(value.ty)
+        if isinstance(value, mir.Undef):
+            return ir.Constant(ty, ir.Undefined)
+        if value.ty == BuiltinTypes.STR:
+            return self._string(value.value)
+        if value.ty == BuiltinTypes.BOOL:
+            return ir.Constant(ty, int(value.value))
+        return ir.Constant(ty, value.value)
+
+    def emit(self, func, llvm_func):
+        self.args = llvm_func.args
+        for arg, value in zip(func.args, llvm_func.args):
+            value.name = arg.name
+        order = reverse_postorder(func)
+        blocks = {block: llvm_func.append_basic_block(name=block.name)
+                  for block in order}
+        self.builder = ir.IRBuilder()
+        phis = []
+        # Blocks come after their dominators, so operands other than
+        # incoming values of phi nodes are emitted before their uses.
+        for block in order:
+            self.builder.position_at_end(blocks[block])
+            for instr in block.instrs:
+                if instr.opcode == mir.PHI:
+                    ty = convert_to_llvm_ty(instr.ty)
+                    self.values[instr] = self.builder.phi(ty)
+                    phis.append(instr)
+                    continue
+                method = getattr(self, 'emit_' + instr.opcode)
+                self.values[instr] = method(instr, blocks)
+        for phi in phis:
+            llvm_phi = self.values[phi]
+            for value, pred in zip(phi.operands, phi.attr):
+                llvm_phi.add_incoming(self.value(value), blocks[pred])
+
+    def emit_binop(self, instr, blocks):
+        builder = self.builder
+        left, right = map(self.value, instr.operands)
+        ty = instr.operands[0].ty
+        op = instr.attr
+        if Operator.relational(op):
+            if ty in BuiltinTypes.FLOATS:
+                return builder.fcmp_ordered(_CMP_OP[op], left, right)
+            elif ty in BuiltinTypes.SIGNED_INTS:
+                return builder.icmp_signed(_CMP_OP[op], left, right)
+            return builder.icmp_unsigned(_CMP_OP[op], left, right)
+        if ty in BuiltinTypes.FLOATS:
+            method = _FP_BINOP_METHODS[op]
+        elif ty in BuiltinTypes.SIGNED_INTS:
+            method = _SI_BINOP_METHODS[op]
+        else:
+            method = _UI_BINOP_METHODS[op]
+        return getattr(builder, method)(left, right)
+
+    def emit_unop(self, instr, blocks):
+        value = self.value(instr.operands[0])
+        if instr.attr in (Operator.NOT, Operator.LOGICAL_NOT):
+            return self.builder.not_(value)
+        if instr.ty in BuiltinTypes.INTEGERS:
+            return self.builder.neg(value)
+        return self.builder.fsub(ir.Constant(value.type, 0), value)
+
+    def emit_cast(self, instr, blocks):
+        builder = self.builder
+        value = self.value(instr.operands[0])
+        from_ty, to_ty = instr.attr, instr.ty
+        ty = convert_to_llvm_ty(to_ty)
+        integers = BuiltinTypes.INTEGERS
+        if from_ty in integers and to_ty in integers:
+            if NBITS[from_ty] == NBITS[to_ty]:
+                return value
+            elif NBITS[from_ty] > NBITS[to_ty]:
+                return builder.trunc(value, ty)
+            elif from_ty in BuiltinTypes.SIGNED_INTS:
+                return builder.sext(value, ty)
+            return builder.zext(value, ty)
+        elif from_ty in integers:
+            if from_ty in BuiltinTypes.SIGNED_INTS:
+                return builder.sitofp(value, ty)
+            return builder.uitofp(value, ty)
+        elif to_ty in integers:
+            if to_ty in BuiltinTypes.SIGNED_INTS:
+                return builder.fptosi(value, ty)
+            return builder.fptoui(value, ty)
+        if NBITS[from_ty] == NBITS[to_ty]:
+            return value
+        elif NBITS[from_ty] > NBITS[to_ty]:
+            return builder.fptrunc(value, ty)
+        return builder.fpext(value, ty)
+
+    def emit_call(self, instr, blocks):
+        args = [self.value(value) for value in instr.operands]
+        return self.builder.call(self.functions[instr.attr], args)
+
+    def emit_jump(self, instr, blocks):
+        return self.builder.branch(blocks[instr.attr[0]])
+
+    def emit_br(self, instr, blocks):
+        cond = self.value(instr.operands[0])
+        return self.builder.cbranch(cond, blocks[instr.attr[0]],
+                                    blocks[instr.attr[1]])
+
+    def emit_ret(self, instr, blocks):
+        if not instr.operands:
+            return self.builder.ret_void()
+        return self.builder.ret(self.value(instr.operands[0]))
+
+    def emit_unreachable(self, instr, blocks):
+        return self.builder.unreachable()
+
+
+def emit_module(module, name): # pragma: nocover
+    """Emit LLVM IR of a module of the mid-level IR.
+
+    Args:
+        module (Module): Module with variables promoted to SSA values.
+        name (str): Name of the LLVM module.
+
+    Returns:
+        ir.Module: Emitted module.
+    """
+    llvm_module = ir.Module(name=name)
+    functions = []
+    for func in module.functions:
+        if func is None:
+            functions.append(None)
+            continue
+        args = [convert_to_llvm_ty(arg.ty) for arg in func.args]
+        func_ty = ir.FunctionType(convert_to_llvm_ty(func.ret_ty), args)
+        functions.append(ir.Function(llvm_module, func_ty, name=func.name))
+    strings = {}
+    for func, llvm_func in zip(module.functions, functions):
+        if func is not None and func.blocks:
+            emitter = _FunctionEmitter(llvm_module, functions, strings)
+            emitter.emit(func, llvm_func)
+    return llvm_module
@@ -0,0 +1,86 @@
+__all__ = ('number_values',)
+
+from dumbc.ast.ast import BuiltinTypes
+from dumbc.ast.ast import Operator
+from dumbc.mir import mir
+from dumbc.mir.analysis import dominator_tree
+from dumbc.mir.analysis import dominators
+
+
+_COMMUTATIVE_OPS = frozenset((Operator.ADD, Operator.MUL, Operator.AND,
+                              Operator.OR, Operator.XOR, Operator.EQ,
+                              Operator.NE))
+
+
+def _operand_key(value):
+    if isinstance(value, mir.Const):
+        return value.key()
+    return id(value)
+
+
+def _key(instr, functions):
+    """Return a key equal for instructions computing the same value.
+
+    Returns:
+        tuple: The key, or None if the instruction can't be replaced
+            with another one.
+    """
+    opcode = instr.opcode
+    if opcode == mir.CALL:
+        # Calls of pure functions with the same arguments return
+        # the same value.
+        callee = functions[instr.attr]
+        if not callee.pure or instr.ty == BuiltinTypes.VOID:
+            return None
+    elif opcode not in (mir.BINOP, mir.UNOP, mir.CAST):
+        return None
+    operands = [_operand_key(value) for value in instr.operands]
+    if opcode == mir.BINOP and instr.attr in _COMMUTATIVE_OPS:
+        operands.sort(key=repr)
+    return (opcode, instr.attr, instr.ty, tuple(operands))
+
+
+def number_values(func, functions):
+    """Global value numbering.
+
+    An instruction computing the same value as an instruction
+    dominating it is removed, and its uses are replaced with the
+    dominating instruction. Blocks are visited in preorder of the
+    dominator tree with a table of values available in the block.
+
+    Args:
+        func (Function): Function to be optimized.
+        functions (list): Functions of the module, indexed like
+            declarations of the translation unit.
+    """
+    idom = dominators(func)
+    children = dominator_tree(idom)
+    available = {}
+    values = {}
+    work = [(func.entry, None)]
+    while work:
+        block, added = work.pop()
+        if added is not None:
+            for key in added:
+                del available[key]
+            continue
+        added = []
+        for instr in block.instrs:
+            operands = instr.operands
+            for i, value in enumerate(operands):
+                if value in values:
+                    operands[i] = values[value]
+            key = _key(instr, functions)
+            if key is None:
+                continue
+            existing = available.get(key)
+            if existing is not None:
+                values[instr] = existing
+            else:
+                available[key] = instr
+                added.append(key)
+        work.append((block, added))
+        work.extend((child, None) for child in children[block])
+    # Operands of phi nodes may come from blocks visited later.
+    func.replace_uses(values)
+    func.remove_instrs(values)
@@ -0,0 +1,70 @@
+__all__ = ('hoist_invariants',)
+
+from dumbc.ast.ast import BuiltinTypes
+from dumbc.ast.ast import Operator
+from dumbc.mir import mir
+from dumbc.mir.analysis import dominators
+from dumbc.mir.analysis import find_loops
+from dumbc.mir.analysis import reverse_postorder
+
+
+def _can_speculate(instr):
+    # Whether an instruction may be executed even if the loop isn't.
+    # Integer division by zero is undefined behaviour, other
+    # operations at worst have poison results.
+    if instr.opcode in (mir.UNOP, mir.CAST):
+        return True
+    if instr.opcode != mir.BINOP:
+        return False
+    return (instr.attr not in (Operator.DIV, Operator.MOD) or
+            instr.operands[0].ty in BuiltinTypes.FLOATS)
+
+
+def _preheader(loop, preds):
+    # The only block entering the loop, if the loop is its only
+    # successor.
+    outside = [pred for pred in preds[loop.header]
+               if pred not in loop.blocks]
+    if len(outside) != 1:
+        return None
+    block = outside[0]
+    if block.successors() != [loop.header]:
+        return None
+    return block
+
+
+def hoist_invariants(func):
+    """Loop-invariant code motion.
+
+    Operations whose operands are defined outside of a loop are moved
+    to the block entering the loop, so they are computed once instead
+    of once per iteration. Inner loops are processed first, so
+    invariants of several nested loops are moved out of all of them.
+    """
+    idom = dominators(func)
+    loops = find_loops(func, idom)
+    if not loops:
+        return
+    preds = func.predecessors()
+    order = reverse_postorder(func)
+    for loop in reversed(loops):
+        preheader = _preheader(loop, preds)
+        if preheader is None:
+            continue
+        hoisted = []
+        for block in order:
+            if block not in loop.blocks:
+                continue
+            instrs = []
+            for instr in block.instrs:
+                if _can_speculate(instr) and not any(
+                        isinstance(value, mir.Instr) and
+                        value.block in loop.blocks
+                        for value in instr.operands):
+                    instr.block = preheader
+                    hoisted.append(instr)
+                else:
+                    instrs.append(instr)
+            block.instrs = instrs
+        if hoisted:
+            preheader.instrs[-1:-1] = hoisted
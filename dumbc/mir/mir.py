@@ -0,0 +1,287 @@
+__all__ = ('Value',
+           'Const',
+           'Undef',
+           'Arg',
+           'Instr',
+           'Block',
+           'Function',
+           'Module')
+
+from dumbc.ast.ast import BuiltinTypes
+
+
+# Opcodes of instructions. Terminators end every block.
+BINOP = 'binop'
+UNOP = 'unop'
+CAST = 'cast'
+CALL = 'call'
+PHI = 'phi'
+GET = 'get'
+SET = 'set'
+JUMP = 'jump'
+BR = 'br'
+RET = 'ret'
+UNREACHABLE = 'unreachable'
+
+TERMINATORS = frozenset((JUMP, BR, RET, UNREACHABLE))
+
+
+class Value:
+    """Base class of values used as operands of instructions.
+
+    Attributes:
+        ty (Type): Type of the value.
+    """
+
+    def __init__(self, ty):
+        self.ty = ty
+
+
+class Const(Value):
+    """Constant value.
+
+    Attributes:
+        value: Python value: an int, a float, a bool or a str.
+    """
+
+    def __init__(self, value, ty):
+        super(Const, self).__init__(ty)
+        self.value = value
+
+    def key(self):
+        """Return a key equal for equal constants of the same type.
+
+        Floats are compared by representation, so 0.0 and -0.0 are
+        different constants.
+        """
+        return (self.ty, type(self.value), repr(self.value))
+
+    def __str__(self):
+        if self.ty == BuiltinTypes.STR:
+            return '%s %r' % (self.ty.name, self.value)
+        if self.ty == BuiltinTypes.BOOL:
+            return 'true' if self.value else 'false'
+        return '%s %r' % (self.ty.name, self.value)
+
+
+class Undef(Value):
+    """Value read from a variable which isn't initialized on a path."""
+
+    def __str__(self):
+        return '%s undef' % self.ty.name
+
+
+class Arg(Value):
+    """Argument of a function.
+
+    Attributes:
+        index (int): Position of the argument.
+        name (str): Name of the argument.
+    """
+
+    def __init__(self, index, name, ty):
+        super(Arg, self).__init__(ty)
+        self.index = index
+        self.name = name
+
+    def __str__(self):
+        return '%%%s' % self.name
+
+
+class Instr(Value):
+    """Instruction.
+
+    Attributes:
+        opcode (str): Kind of the instruction.
+        operands (list): Values used by the instruction.
+        attr: Operand of the instruction which isn't a value: an
+            operator of `binop` and `unop`, a source type of `cast`,
+            an index of a called function of `call`, a slot of `get`
+            and `set`, incoming blocks of `phi`(one per operand) and
+            target blocks of `jump` and `br`.
+        block (Block): Block containing the instruction.
+        id (int): Number of the instruction, unique within a function.
+    """
+
+    def __init__(self, opcode, ty, operands, attr=None):
+        super(Instr, self).__init__(ty)
+        self.opcode = opcode
+        self.operands = operands
+        self.attr = attr
+        self.block = None
+        self.id = None
+
+    @property
+    def is_terminator(self):
+        return self.opcode in TERMINATORS
+
+    def successors(self):
+        if self.opcode in (JUMP, BR):
+            return list(self.attr)
+        return []
+
+    def __str__(self):
+        return '%%%d' % self.id
+
+    def format(self):
+        """Return a text representation of the instruction."""
+        if self.opcode == PHI:
+            args = ', '.join('[%s, %s]' % (value, block.name)
+                             for value, block in zip(self.operands,
+                                                     self.attr))
+        elif self.opcode in (JUMP, BR):
+            args = ', '.join([str(value) for value in self.operands] +
+                             [block.name for block in self.attr])
+        else:
+            args = ', '.join(str(value) for value in self.operands)
+            attr = self.attr
+            if self.opcode == CAST:
+                attr = attr.name
+            elif hasattr(attr, 'name'):
+                # Operators are printed by their names.
+                attr = attr.name.lower()
+            if attr is not None:
+                args = '%s %s' % (attr, args) if args else str(attr)
+        text = '%s %s' % (self.opcode, args) if args else self.opcode
+        if self.ty is None or self.ty == BuiltinTypes.VOID:
+            return text
+        return '%%%d = %s %s' % (self.id, self.ty.name, text)
+
+
+class Block:
+    """Basic block.
+
+    Attributes:
+        name (str): Name of the block.
+        instrs (list): Instructions of the block, phi nodes first and
+            a terminator last.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.instrs = []
+
+    @property
+    def terminator(self):
+        if self.instrs and self.instrs[-1].is_terminator:
+            return self.instrs[-1]
+        return None
+
+    def successors(self):
+        terminator = self.terminator
+        return terminator.successors() if terminator is not None else []
+
+    def phis(self):
+        for instr in self.instrs:
+            if instr.opcode != PHI:
+                break
+            yield instr
+
+    def __repr__(self):
+        return '<Block %s>' % self.name
+
+
+class Function:
+    """Function of the mid-level IR.
+
+    Attributes:
+        name (str): Name of the function.
+        args (list): Arguments of the function.
+        ret_ty (Type): Type of the returned value.
+        blocks (list): Basic blocks, the entry block first. External
+            functions have no blocks.
+        pure (bool): Whether the function has no side effects.
+    """
+
+    def __init__(self, name, args, ret_ty, pure=False):
+        self.name = name
+        self.args = args
+        self.ret_ty = ret_ty
+        self.blocks = []
+        self.pure = pure
+        self.num_blocks = 0
+        self.num_instrs = 0
+
+    @property
+    def entry(self):
+        return self.blocks[0]
+
+    def new_block(self, name):
+        """Create a block with a unique name.
+
+        The block isn't added to the function.
+        """
+        block = Block('%s%d' % (name, self.num_blocks))
+        self.num_blocks += 1
+        return block
+
+    def new_instr(self, opcode, ty, operands, attr=None):
+        """Create a numbered instruction outside of any block."""
+        instr = Instr(opcode, ty, operands, attr)
+        instr.id = self.num_instrs
+        self.num_instrs += 1
+        return instr
+
+    def instrs(self):
+        for block in self.blocks:
+            yield from block.instrs
+
+    def replace_uses(self, values):
+        """Replace operands of instructions.
+
+        Args:
+            values (dict): New values by replaced instructions. A new
+                value may be replaced itself.
+        """
+        if not values:
+            return
+        for instr in self.instrs():
+            operands = instr.operands
+            for i, value in enumerate(operands):
+                while value in values:
+                    value = values[value]
+                operands[i] = value
+
+    def remove_instrs(self, instrs):
+        """Remove instructions from their blocks."""
+        if not instrs:
+            return
+        for block in self.blocks:
+            block.instrs = [instr for instr in block.instrs
+                            if instr not in instrs]
+
+    def predecessors(self):
+        """Return predecessors of every block."""
+        preds = {block: [] for block in self.blocks}
+        for block in self.blocks:
+            for succ in block.successors():
+                preds[succ].append(block)
+        return preds
+
+    def __str__(self):
+        args = ', '.join('%%%s: %s' % (arg.name, arg.ty.name)
+                         for arg in self.args)
+        header = 'func %s(%s): %s' % (self.name, args, self.ret_ty.name)
+        if not self.blocks:
+            return header
+        lines = [header + ' {']
+        for block in self.blocks:
+            lines.append('%s:' % block.name)
+            lines.extend('  ' + instr.format() for instr in block.instrs)
+        lines.append('}')
+        return '\n'.join(lines)
+
+
+class Module:
+    """Module of the mid-level IR.
+
+    Attributes:
+        functions (list): Functions, indexed like declarations of the
+            translation unit.
+    """
+
+    def __init__(self, functions):
+        self.functions = functions
+
+    def __str__(self):
+        return '\n\n'.join(map(str, self.functions))
@@ -0,0 +1,24 @@
+__all__ = ('optimize_module',)
+
+from dumbc.mir.dce import remove_dead_instrs
+from dumbc.mir.dce import simplify_cfg
+from dumbc.mir.gvn import number_values
+from dumbc.mir.licm import hoist_invariants
+from dumbc.mir.sccp import propagate_constants
+
+
+def optimize_module(module):
+    """Run optimization passes over functions of a module.
+
+    Args:
+        module (Module): Module with variables promoted to SSA values.
+    """
+    for func in module.functions:
+        if func is None or not func.blocks:
+            continue
+        propagate_constants(func)
+        simplify_cfg(func)
+        number_values(func, module.functions)
+        hoist_invariants(func)
+        remove_dead_instrs(func)
+        simplify_cfg(func)
@@ -0,0 +1,170 @@
+__all__ = ('propagate_constants',)
+
+from dumbc.ast.ast import BuiltinTypes
+from dumbc.ast.ast import Operator
+from dumbc.mir import mir
+from dumbc.mir.dce import remove_unreachable_blocks
+from dumbc.transform.const_eval import cast
+from dumbc.transform.const_eval import float_binop
+from dumbc.transform.const_eval import int_binop
+from dumbc.transform.const_eval import unaryop
+
+
+# Lattice value of instructions which have more than one value. Values
+# which haven't been computed yet are missing from the lattice.
+_OVERDEFINED = object()
+
+
+def _same(a, b):
+    if a is _OVERDEFINED or b is _OVERDEFINED:
+        return a is b
+    return a.key() == b.key()
+
+
+def _fold(instr, values):
+    opcode = instr.opcode
+    if opcode == mir.BINOP:
+        left, right = values
+        ty = instr.operands[0].ty
+        if ty in BuiltinTypes.INTEGERS:
+            return int_binop(instr.attr, ty, left, right)
+        elif ty in BuiltinTypes.FLOATS:
+            return float_binop(instr.attr, ty, left, right)
+        elif ty == BuiltinTypes.BOOL and instr.attr == Operator.EQ:
+            return left == right
+        elif ty == BuiltinTypes.BOOL and instr.attr == Operator.NE:
+            return left != right
+        return None
+    elif opcode == mir.UNOP:
+        return unaryop(instr.attr, instr.ty, values[0])
+    elif opcode == mir.CAST:
+        return cast(instr.attr, instr.ty, values[0])
+    return None
+
+
+class _Solver:
+
+    def __init__(self, func):
+        self.func = func
+        self.lattice = {}
+        self.blocks = set()
+        self.edges = set()
+        self.flow_work = [(None, func.entry)]
+        self.ssa_work = []
+        self.users = {}
+        for instr in func.instrs():
+            for value in instr.operands:
+                if isinstance(value, mir.Instr):
+                    self.users.setdefault(value, []).append(instr)
+
+    def value(self, value):
+        if isinstance(value, mir.Const):
+            return value
+        elif isinstance(value, mir.Instr):
+            return self.lattice.get(value)
+        return _OVERDEFINED
+
+    def _evaluate(self, instr):
+        if instr.opcode == mir.PHI:
+            result = None
+            for value, pred in zip(instr.operands, instr.attr):
+                if (pred, instr.block) not in self.edges:
+                    continue
+                value = self.value(value)
+                if value is None:
+                    continue
+                if result is None:
+                    result = value
+                elif not _same(result, value):
+                    return _OVERDEFINED
+            return result
+        if instr.opcode not in (mir.BINOP, mir.UNOP, mir.CAST):
+            return _OVERDEFINED
+        values = []
+        for value in instr.operands:
+            value = self.value(value)
+            if value is None or value is _OVERDEFINED:
+                return value
+            values.append(value.value)
+        result = _fold(instr, values)
+        if result is None:
+            return _OVERDEFINED
+        return mir.Const(result, instr.ty)
+
+    def _branch(self, instr):
+        block = instr.block
+        if instr.opcode == mir.JUMP:
+            self.flow_work.append((block, instr.attr[0]))
+        elif instr.opcode == mir.BR:
+            cond = self.value(instr.operands[0])
+            if cond is _OVERDEFINED:
+                self.flow_work.append((block, instr.attr[0]))
+                self.flow_work.append((block, instr.attr[1]))
+            elif cond is not None:
+                target = instr.attr[0] if cond.value else instr.attr[1]
+                self.flow_work.append((block, target))
+
+    def _visit(self, instr):
+        if instr.is_terminator:
+            self._branch(instr)
+            return
+        old = self.lattice.get(instr)
+        if old is _OVERDEFINED:
+            return
+        new = self._evaluate(instr)
+        if new is None or (old is not None and _same(old, new)):
+            return
+        self.lattice[instr] = new
+        self.ssa_work.extend(self.users.get(instr, ()))
+
+    def solve(self):
+        while self.flow_work or self.ssa_work:
+            while self.flow_work:
+                edge = self.flow_work.pop()
+                if edge in self.edges:
+                    continue
+                self.edges.add(edge)
+                block = edge[1]
+                if block in self.blocks:
+                    # Only phi nodes depend on the new edge.
+                    for phi in block.phis():
+                        self._visit(phi)
+                    continue
+                self.blocks.add(block)
+                for instr in block.instrs:
+                    self._visit(instr)
+            while self.ssa_work:
+                instr = self.ssa_work.pop()
+                if instr.block in self.blocks:
+                    self._visit(instr)
+
+
+def propagate_constants(func):
+    """Sparse conditional constant propagation.
+
+    Implements "Constant Propagation with Conditional Branches" by
+    Wegman and Zadeck. Values of instructions are computed with the
+    semantics of the language, assuming that only branches taken with
+    known conditions are executed. Instructions with constant values
+    are replaced with the constants, branches with constant conditions
+    become jumps and blocks which are never executed are removed.
+    """
+    solver = _Solver(func)
+    solver.solve()
+    values = {}
+    for instr, value in solver.lattice.items():
+        if value is not _OVERDEFINED:
+            values[instr] = value
+    func.replace_uses(values)
+    func.remove_instrs(values)
+    for block in func.blocks:
+        terminator = block.terminator
+        if terminator.opcode != mir.BR:
+            continue
+        cond = terminator.operands[0]
+        if isinstance(cond, mir.Const):
+            target = terminator.attr[0] if cond.value else terminator.attr[1]
+            terminator.opcode = mir.JUMP
+            terminator.operands = []
+            terminator.attr = (target,)
+    remove_unreachable_blocks(func)
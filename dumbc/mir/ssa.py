@@ -0,0 +1,95 @@
+__all__ = ('promote_variables',)
+
+from dumbc.mir import mir
+from dumbc.mir.analysis import dominance_frontiers
+from dumbc.mir.analysis import dominator_tree
+from dumbc.mir.analysis import dominators
+
+
+def promote_variables(func):
+    """Replace variables of a function with SSA values.
+
+    Implements the construction from "Efficiently Computing Static
+    Single Assignment Form and the Control Dependence Graph" by Cytron
+    et al. Phi nodes of a variable are put in the iterated dominance
+    frontier of blocks setting it, then `get` instructions are replaced
+    with the values reaching them along the dominator tree. Unused phi
+    nodes are left to dead code elimination.
+
+    All blocks of the function must be reachable.
+    """
+    idom = dominators(func)
+    frontiers = dominance_frontiers(func, idom)
+
+    types = {}
+    def_blocks = {}
+    for block in func.blocks:
+        for instr in block.instrs:
+            if instr.opcode == mir.SET:
+                types[instr.attr] = instr.operands[0].ty
+                def_blocks.setdefault(instr.attr, set()).add(block)
+            elif instr.opcode == mir.GET:
+                types[instr.attr] = instr.ty
+
+    # Slots of inserted phi nodes.
+    phi_slots = {}
+    for slot, blocks in def_blocks.items():
+        placed = set()
+        worklist = list(blocks)
+        while worklist:
+            block = worklist.pop()
+            for frontier in frontiers[block]:
+                if frontier in placed:
+                    continue
+                placed.add(frontier)
+                phi = func.new_instr(mir.PHI, types[slot], [], [])
+                phi.block = frontier
+                frontier.instrs.insert(0, phi)
+                phi_slots[phi] = slot
+                if frontier not in blocks:
+                    worklist.append(frontier)
+
+    children = dominator_tree(idom)
+    stacks = {slot: [] for slot in types}
+    values = {}
+
+    def current(slot):
+        stack = stacks[slot]
+        return stack[-1] if stack else mir.Undef(types[slot])
+
+    # Blocks are renamed in preorder of the dominator tree, definitions
+    # made in a block are popped when its subtree is done.
+    work = [(func.entry, None)]
+    while work:
+        block, pushed = work.pop()
+        if pushed is not None:
+            for slot in pushed:
+                stacks[slot].pop()
+            continue
+        pushed = []
+        instrs = []
+        for instr in block.instrs:
+            if instr.opcode == mir.GET:
+                values[instr] = current(instr.attr)
+                continue
+            operands = instr.operands
+            for i, value in enumerate(operands):
+                if value in values:
+                    operands[i] = values[value]
+            if instr.opcode == mir.SET:
+                stacks[instr.attr].append(operands[0])
+                pushed.append(instr.attr)
+                continue
+            if instr in phi_slots:
+                stacks[phi_slots[instr]].append(instr)
+                pushed.append(phi_slots[instr])
+            instrs.append(instr)
+        block.instrs = instrs
+        for succ in block.successors():
+            for phi in succ.phis():
+                slot = phi_slots.get(phi)
+                if slot is not None:
+                    phi.operands.append(current(slot))
+                    phi.attr.append(block)
+        work.append((block, pushed))
+        work.extend((child, None) for child in children[block])
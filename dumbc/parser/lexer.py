@@ -1,5 +1,6 @@
-__all__ = ('tokenize',)
+__all__ = ('tokenize', 'tokenize_to_buffer', 'TokenBuffer')
 
+import array
 import collections
 import re
 
@@ -25,61 +26,340 @@ KEYWORDS = {
     'var'
 }
 
-# (a token kind, regex to match the token kind)
-TOKENS = (
-    ('FLOAT', r'\d*\.\d+([eE][-+]?\d+)?'),
-    ('INTEGER', r'\d+'),
-    ('BOOL', r'true|false'),
-    ('STR', r'"([^"\\]*(\\.[^"\\]*)*)"|\'([^\'\\]*(\\.[^\'\\]*)*)\''),
-    ('IDENT', r'[a-zA-Z_][a-zA-Z_0-9]*'),
-
-    ('SHLEQ', r'<<='),
-    ('SHREQ', r'>>='),
-    ('SHL', r'<<'),
-    ('SHR', r'>>'),
-    ('LOGICAL_OR', r'\|\|'),
-    ('LOGICAL_AND', r'&&'),
-    ('LE', r'<='),
-    ('LT', r'<'),
-    ('GE', r'>='),
-    ('GT', r'>'),
-    ('EQ', r'=='),
-    ('NE', r'!='),
-    ('PLUSEQ', r'\+='),
-    ('PLUS', r'\+'),
-    ('MINUSEQ', r'\-='),
-    ('MINUS', r'\-'),
-    ('STAREQ', r'\*='),
-    ('STAR', r'\*'),
-    ('SLASHEQ', r'/='),
-    ('SLASH', r'/'),
-    ('PERCENTEQ', r'%='),
-    ('PERCENT', r'%'),
-    ('OREQ', r'\|='),
-    ('OR', r'\|'),
-    ('ANDEQ', r'&='),
-    ('AND', r'&'),
-    ('XOREQ', r'\^='),
-    ('XOR', r'\^'),
-    ('LOGICAL_NOT', r'!'),
-    ('ASSIGN', r'='),
-    ('NOT', r'~'),
-
-    ('ATTR_START', r'#\['),
-    ('LEFT_PAREN', r'\('),
-    ('RIGHT_PAREN', r'\)'),
-    ('LEFT_CURLY_BRACKET', r'{'),
-    ('RIGHT_CURLY_BRACKET', r'}'),
-    ('LEFT_SQ_BRACKET', r'\['),
-    ('RIGHT_SQ_BRACKET', r'\]'),
-    ('COLON', r':'),
-    ('SEMICOLON', r';'),
-    ('COMMA', r','),
-
-    ('COMMENT', r'#.*'),
-    ('NEWLINE', r'\n'),
-    ('WS', r'[ \t]+')
+# (a token kind, literal) for all operators and punctuation.
+PUNCTUATORS = (
+    ('SHLEQ', '<<='),
+    ('SHREQ', '>>='),
+    ('SHL', '<<'),
+    ('SHR', '>>'),
+    ('LOGICAL_OR', '||'),
+    ('LOGICAL_AND', '&&'),
+    ('LE', '<='),
+    ('LT', '<'),
+    ('GE', '>='),
+    ('GT', '>'),
+    ('EQ', '=='),
+    ('NE', '!='),
+    ('PLUSEQ', '+='),
+    ('PLUS', '+'),
+    ('MINUSEQ', '-='),
+    ('MINUS', '-'),
+    ('STAREQ', '*='),
+    ('STAR', '*'),
+    ('SLASHEQ', '/='),
+    ('SLASH', '/'),
+    ('PERCENTEQ', '%='),
+    ('PERCENT', '%'),
+    ('OREQ', '|='),
+    ('OR', '|'),
+    ('ANDEQ', '&='),
+    ('AND', '&'),
+    ('XOREQ', '^='),
+    ('XOR', '^'),
+    ('LOGICAL_NOT', '!'),
+    ('ASSIGN', '='),
+    ('NOT', '~'),
+
+    ('ATTR_START', '#['),
+    ('LEFT_PAREN', '('),
+    ('RIGHT_PAREN', ')'),
+    ('LEFT_CURLY_BRACKET', '{'),
+    ('RIGHT_CURLY_BRACKET', '}'),
+    ('LEFT_SQ_BRACKET', '['),
+    ('RIGHT_SQ_BRACKET', ']'),
+    ('COLON', ':'),
+    ('SEMICOLON', ';'),
+    ('COMMA', ',')
+)
+
+BOOLEANS = ('true', 'false')
+
+# Token kinds are stored as small integers in a token buffer; this is
+# a mapping of such integer to a name of a token kind.
+KIND_NAMES = (
+    ('EOF', 'INTEGER', 'FLOAT', 'BOOL', 'STR', 'IDENT') +
+    tuple(sorted(word.upper() for word in KEYWORDS)) +
+    tuple(kind for kind, _ in PUNCTUATORS)
 )
+KIND_IDS = {kind: i for i, kind in enumerate(KIND_NAMES)}
+
+_EOF = KIND_IDS['EOF']
+_INTEGER = KIND_IDS['INTEGER']
+_FLOAT = KIND_IDS['FLOAT']
+_BOOL = KIND_IDS['BOOL']
+_STR = KIND_IDS['STR']
+_IDENT = KIND_IDS['IDENT']
+
+
+# Character classes. The class of the first character of a lexeme
+# determines what kind of token is scanned.
+(_C_OTHER,
+ _C_DIGIT,
+ _C_DOT,
+ _C_ALPHA,
+ _C_QUOTE,
+ _C_HASH,
+ _C_PUNCT,
+ _C_NEWLINE,
+ _C_WS) = range(9)
+
+
+def _build_char_classes():
+    table = [_C_OTHER] * 128
+    for c in '0123456789':
+        table[ord(c)] = _C_DIGIT
+    for c in 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_':
+        table[ord(c)] = _C_ALPHA
+    for _, literal in PUNCTUATORS:
+        table[ord(literal[0])] = _C_PUNCT
+    table[ord('.')] = _C_DOT
+    table[ord('"')] = _C_QUOTE
+    table[ord('\'')] = _C_QUOTE
+    table[ord('#')] = _C_HASH
+    table[ord('\n')] = _C_NEWLINE
+    table[ord(' ')] = _C_WS
+    table[ord('\t')] = _C_WS
+    return table
+
+
+def _build_punctuator_dfa():
+    # Each state is a dict mapping a character to the next state. The
+    # DFA is run with maximal munch, e.g. '<<=' is scanned as SHLEQ.
+    transitions = [{}]
+    accepts = [None]
+    for kind, literal in PUNCTUATORS:
+        state = 0
+        for c in literal:
+            next_state = transitions[state].get(c)
+            if next_state is None:
+                next_state = len(transitions)
+                transitions[state][c] = next_state
+                transitions.append({})
+                accepts.append(None)
+            state = next_state
+        accepts[state] = KIND_IDS[kind]
+    return transitions, accepts
+
+
+def _keyword_hash(word, mul, size):
+    return (ord(word[0]) * mul + ord(word[-1]) + len(word)) % size
+
+
+def _build_keyword_table():
+    # Search for a collision free(perfect) hash function of keywords.
+    for size in range(len(KEYWORDS), 16 * len(KEYWORDS)):
+        for mul in range(1, 64):
+            table = [None] * size
+            for word in KEYWORDS:
+                slot = _keyword_hash(word, mul, size)
+                if table[slot] is not None:
+                    break
+                table[slot] = word
+            else:
+                kinds = [word and KIND_IDS[word.upper()] for word in table]
+                return mul, size, table, kinds
+    raise RuntimeError('no perfect hash for keywords') # pragma: no cover
+
+
+_CHAR_CLASS = _build_char_classes()
+_PUNCT_TRANSITIONS, _PUNCT_ACCEPTS = _build_punctuator_dfa()
+(_KEYWORD_MUL,
+ _KEYWORD_SIZE,
+ _KEYWORD_TABLE,
+ _KEYWORD_KINDS) = _build_keyword_table()
+
+# Runs of characters are consumed by anchored patterns, once a class of
+# the first character has been determined. Numbers may end with a type
+# suffix, e.g. '1u64' or '2.5f64'.
+_NUMBER_RE = re.compile(r'(\d*\.\d+(?:[eE][-+]?\d+)?)(?:f(?:32|64)(?!\w))?|'
+                        r'\d+(?:(?:[iu](?:8|32|64)|f(?:32|64))(?!\w))?')
+_IDENT_RE = re.compile(r'[a-zA-Z_][a-zA-Z_0-9]*')
+_STR_RE = {
+    '"': re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"'),
+    '\'': re.compile(r"'[^'\\]*(?:\\.[^'\\]*)*'")
+}
+_WS_RE = re.compile(r'[ \t]+')
+
+
+class TokenBuffer:
+    """Tokens of a source text stored as a struct of arrays.
+
+    A token is identified by its index; a kind, a start offset and a
+    length of the token are stored in arrays and its value is sliced
+    from the text on demand.
+
+    Attributes:
+        text (str): Source text.
+        kinds (array): Kinds of tokens, indices into `KIND_NAMES`.
+        starts (array): Offsets of the tokens in the text.
+        lengths (array): Lengths of the tokens.
+        lines (LineIndex): Offsets at which lines start, shared by
+            locations of the tokens.
+        error_offset (int): Offset of a symbol which could not be
+            tokenized, or None. Tokens after this offset are missing
+            and so is EOF.
+
+    Examples:
+
+        >>> buf = tokenize_to_buffer('var x = 1\\nx')
+        >>> len(buf)
+        6
+        >>> buf.kind(0), buf.value(1), buf.loc(4)
+        ('VAR', 'x', Location(line=2, column=1, extent=1))
+        >>> buf[5]
+        Token(kind='EOF', value=None, loc=Location(line=2, column=2, extent=0))
+    """
+
+    __slots__ = ('text', 'kinds', 'starts', 'lengths',
+                 'lines', 'error_offset')
+
+    def __init__(self, text):
+        self.text = text
+        self.kinds = array.array('B')
+        self.starts = array.array('I')
+        self.lengths = array.array('I')
+        self.lines = ast.LineIndex()
+        self.error_offset = None
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, index):
+        return Token(self.kind(index), self.value(index), self.loc(index))
+
+    def kind(self, index):
+        """Return a name of the kind of a token."""
+        return KIND_NAMES[self.kinds[index]]
+
+    def value(self, index):
+        """Return a text of a token(None for EOF)."""
+        if self.kinds[index] == _EOF:
+            return None
+        start = self.starts[index]
+        return self.text[start:start + self.lengths[index]]
+
+    def loc(self, index):
+        """Return a location of a token."""
+        return ast.Location(self.starts[index], self.lengths[index],
+                            self.lines)
+
+    def raise_error(self):
+        """Raise an error about a symbol which could not be tokenized."""
+        line, column = self.lines.resolve(self.error_offset)
+        raise DumbValueError('unexpected symbol at %d:%d' % (line, column))
+
+
+def tokenize_to_buffer(text):
+    """Tokenize input string into a token buffer.
+
+    The scanner looks up a class of the current character in a table
+    built at import time and scans a lexeme of the corresponding kind.
+    An error does not raise an exception, the position of the error is
+    recorded in the buffer instead.
+
+    Args:
+        text (str): String with a source code.
+
+    Returns:
+        TokenBuffer: Tokens of the text.
+    """
+    char_class = _CHAR_CLASS
+    transitions = _PUNCT_TRANSITIONS
+    accepts = _PUNCT_ACCEPTS
+    keyword_table = _KEYWORD_TABLE
+    keyword_kinds = _KEYWORD_KINDS
+    keyword_mul = _KEYWORD_MUL
+    keyword_size = _KEYWORD_SIZE
+
+    buf = TokenBuffer(text)
+    add_kind = buf.kinds.append
+    add_start = buf.starts.append
+    add_length = buf.lengths.append
+    add_line = buf.lines.starts.append
+
+    length = len(text)
+    pos = 0
+
+    while pos < length:
+        c = text[pos]
+        code = ord(c)
+        if code < 128:
+            cls = char_class[code]
+        elif c.isdecimal():
+            cls = _C_DIGIT
+        else:
+            break
+
+        if cls == _C_WS:
+            pos = _WS_RE.match(text, pos).end()
+            continue
+        elif cls == _C_NEWLINE:
+            pos += 1
+            add_line(pos)
+            continue
+        elif cls == _C_ALPHA:
+            # NOTE: booleans are matched by prefix, so 'trueish' is
+            # scanned as BOOL followed by IDENT.
+            if c == 't' and text.startswith('true', pos):
+                kind = _BOOL
+                end = pos + 4
+            elif c == 'f' and text.startswith('false', pos):
+                kind = _BOOL
+                end = pos + 5
+            else:
+                end = _IDENT_RE.match(text, pos).end()
+                slot = (code * keyword_mul + ord(text[end - 1]) +
+                        end - pos) % keyword_size
+                word = keyword_table[slot]
+                if word is not None and text.startswith(word, pos) and \
+                        len(word) == end - pos:
+                    kind = keyword_kinds[slot]
+                else:
+                    kind = _IDENT
+        elif cls == _C_PUNCT or cls == _C_HASH:
+            state = 0
+            kind = None
+            i = pos
+            while i < length:
+                state = transitions[state].get(text[i])
+                if state is None:
+                    break
+                i += 1
+                if accepts[state] is not None:
+                    kind = accepts[state]
+                    end = i
+            if kind is None:
+                # A lone '#' starts a comment.
+                end = text.find('\n', pos)
+                pos = length if end == -1 else end
+                continue
+        elif cls == _C_DIGIT or cls == _C_DOT:
+            m = _NUMBER_RE.match(text, pos)
+            if m is None:
+                break
+            kind = _INTEGER if m.lastindex is None else _FLOAT
+            end = m.end()
+        elif cls == _C_QUOTE:
+            m = _STR_RE[c].match(text, pos)
+            if m is None:
+                break
+            kind = _STR
+            end = m.end()
+        else:
+            break
+
+        add_kind(kind)
+        add_start(pos)
+        add_length(end - pos)
+        pos = end
+
+    if pos != length:
+        buf.error_offset = pos
+    else:
+        add_kind(_EOF)
+        add_start(pos)
+        add_length(0)
+    return buf
 
 
 def tokenize(text):
@@ -95,33 +375,13 @@ def tokenize(text):
     Raises:
         ValueError: Met some not "allowed" character.
     """
+    buf = tokenize_to_buffer(text)
+    lines = buf.lines
+    Location = ast.Location
 
-    tokens_regex = '|'.join('(?P<%s>%s)' % token for token in TOKENS)
-    pat = re.compile(tokens_regex)
-    scanner = pat.scanner(text)
-
-    line = 1
-    line_pos = -1
-    pos = 0
-
-    for m in iter(scanner.match, None):
-        kind = m.lastgroup
+    for kind, start, length in zip(buf.kinds, buf.starts, buf.lengths):
+        value = text[start:start + length] if kind != _EOF else None
+        yield Token(KIND_NAMES[kind], value, Location(start, length, lines))
 
-        if kind == 'NEWLINE':
-            line_pos = pos
-            line += 1
-        elif kind == 'WS' or kind == 'COMMENT':
-            pass
-        else:
-            value = m.group()
-            if kind == 'IDENT' and value in KEYWORDS:
-                kind = value.upper()
-            loc = ast.Location(line, pos - line_pos, len(value))
-            yield Token(kind, value, loc)
-        pos = m.end()
-
-    if pos != len(text):
-        raise DumbValueError('unexpected symbol at %d:%d' % (line, pos - line_pos))
-
-    loc = ast.Location(line, pos - line_pos, 0)
-    yield Token('EOF', None, loc)
+    if buf.error_offset is not None:
+        buf.raise_error()
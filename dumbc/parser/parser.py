@@ -3,6 +3,8 @@ __all__ = ('Parser',)
 from dumbc.errors import DumbSyntaxError
 from dumbc.errors import DumbEOFError
 from dumbc.ast import ast
+from dumbc.parser.lexer import KIND_NAMES
+from dumbc.parser.lexer import TokenBuffer
 
 
 # In order to find more information about tokens
@@ -93,11 +95,8 @@ EXPR_BEGIN_TOKENS = (
 )
 
 
-def _get_precedence(token):
-    try:
-        return OPERATOR_PRECEDENCE[token.kind]
-    except:
-        return -1
+def _get_precedence(kind):
+    return OPERATOR_PRECEDENCE.get(kind, -1)
 
 
 def _unescape_string(s):
@@ -107,6 +106,15 @@ def _unescape_string(s):
         .replace(r'\n', '\n'))
 
 
+def _split_type_suffix(s):
+    # Returns digits of a number literal and a type of its suffix(None
+    # if there is no suffix), e.g. '2.5f64' -> ('2.5', f64).
+    for i, c in enumerate(s):
+        if c in 'iuf':
+            return s[:i], ast.BuiltinTypes.intern(s[i:])
+    return s, None
+
+
 class Parser:
     """Parser.
 
@@ -114,11 +122,19 @@ class Parser:
     to some rule in a grammar of the language. Expressions
     are parsed by an operator-precedence parser.
 
+    Tokens are either read from a token buffer through an index
+    cursor or pulled from a stream of tokens.
+
     Attributes:
         token_stream (generator): A stream of tokens generated
-            by a lexer.
-        curr_token (Token): Current token. Call `advance()`
+            by a lexer, or None.
+        token_buffer (TokenBuffer): Tokens generated by a lexer,
+            or None.
+        curr_kind (str): Kind of the current token. Call `advance()`
             method to advance it.
+        curr_token (Token): Current token. With a token buffer it's
+            built on first access, so the parser itself reads
+            `curr_kind`, `curr_value` and `curr_loc` instead.
 
     Examples:
 
@@ -142,18 +158,72 @@ class Parser:
         <TranslationUnit at 1:1>
     """
 
-    def __init__(self, token_stream, diag):
-        self.token_stream = token_stream
-        self.curr_token = next(self.token_stream)
+    def __init__(self, tokens, diag):
+        if isinstance(tokens, TokenBuffer):
+            self.token_stream = None
+            self.token_buffer = tokens
+        else:
+            self.token_stream = tokens
+            self.token_buffer = None
+        self.pos = -1
+        self._token = None
+        self._next_token()
         self.diag = diag
 
+    @property
+    def curr_token(self):
+        if self._token is None:
+            self._token = self.token_buffer[self.pos]
+        return self._token
+
+    @property
+    def curr_value(self):
+        """Value of the current token, read without building a token."""
+        if self.token_buffer is None:
+            return self._token.value
+        return self.token_buffer.value(self.pos)
+
+    @property
+    def curr_loc(self):
+        """Location of the current token, read without building a token."""
+        if self.token_buffer is None:
+            return self._token.loc
+        return self.token_buffer.loc(self.pos)
+
+    def _next_token(self):
+        buf = self.token_buffer
+        if buf is None:
+            self._token = next(self.token_stream)
+            self.curr_kind = self._token.kind
+            return
+        self.pos += 1
+        if self.pos >= len(buf):
+            if buf.error_offset is not None:
+                buf.raise_error()
+            raise StopIteration
+        self._token = None
+        self.curr_kind = KIND_NAMES[buf.kinds[self.pos]]
+
+    def _skip(self, expect_kind=None):
+        if expect_kind and self.curr_kind != expect_kind:
+            msg = 'unexpected token(expected=%r, actual=%r)' % (
+                expect_kind,
+                self.curr_kind)
+            self.diag.error(self.curr_loc, msg)
+            raise DumbSyntaxError(msg)
+
+        try:
+            self._next_token()
+        except StopIteration:
+            raise DumbEOFError('unexpected EOF')
+
     def advance(self, expect_kind=None):
         """Advance to the next token.
 
         Args:
             expect_kind (str, optional): What kind of current
                 token should be. If `expect_kind` is not equal
-                to `self.curr_token.kind` an exception will be raised.
+                to `self.curr_kind` an exception will be raised.
 
         Returns:
             Token: Next token in the token stream.
@@ -162,18 +232,7 @@ class Parser:
             SyntaxError: Current token is different from what
                 we have expected.
         """
-        if expect_kind and self.curr_token.kind != expect_kind:
-            msg = 'unexpected token(expected=%r, actual=%r)' % (
-                expect_kind,
-                self.curr_token.kind)
-            self.diag.error(self.curr_token.loc, msg)
-            raise DumbSyntaxError(msg)
-
-        try:
-            self.curr_token = next(self.token_stream)
-        except StopIteration:
-            raise DumbEOFError('unexpected EOF')
-
+        self._skip(expect_kind)
         return self.curr_token
 
     def parse_expr(self):
@@ -203,40 +262,42 @@ class Parser:
              | - expr
              | ! expr
         """
-        if self.curr_token.kind not in UNARYOP_TOKENS:
+        if self.curr_kind not in UNARYOP_TOKENS:
             return self.parse_primary()
 
-        op = self.curr_token
-        self.advance()
+        op = self.curr_kind
+        loc = self.curr_loc
+        self._skip()
         value = self.parse_unary_expr()
-        return ast.UnaryOp(TOKEN_TO_UNARYOP[op.kind], value, loc=op.loc)
+        return ast.UnaryOp(TOKEN_TO_UNARYOP[op], value, loc=loc)
 
     def parse_binop_rhs(self, left, min_precedence=0):
         while True:
-            precedence = _get_precedence(self.curr_token)
+            precedence = _get_precedence(self.curr_kind)
             if precedence < min_precedence:
                 return left
-            op = self.curr_token
-            self.advance()
+            op = self.curr_kind
+            loc = self.curr_loc
+            self._skip()
 
-            if op.kind == 'AS':
+            if op == 'AS':
                 right = self.parse_type()
             else:
                 right = self.parse_unary_expr()
 
-            next_precedence = _get_precedence(self.curr_token)
+            next_precedence = _get_precedence(self.curr_kind)
             if precedence < next_precedence:
                 right = self.parse_binop_rhs(right, precedence + 1)
 
-            if op.kind == 'AS':
-                left = ast.Cast(left, right, loc=op.loc)
-            elif op.kind in ASSIGNMENT_TOKENS:
+            if op == 'AS':
+                left = ast.Cast(left, right, loc=loc)
+            elif op in ASSIGNMENT_TOKENS:
                 left = ast.Assignment(left, right,
-                                      op=AUGMENT_ASSIGNMENT_OP[op.kind],
-                                      loc=op.loc)
+                                      op=AUGMENT_ASSIGNMENT_OP[op],
+                                      loc=loc)
             else:
-                left = ast.BinaryOp(TOKEN_TO_BINOP[op.kind],
-                                    left, right, loc=op.loc)
+                left = ast.BinaryOp(TOKEN_TO_BINOP[op],
+                                    left, right, loc=loc)
 
     def parse_primary(self):
         """
@@ -248,7 +309,7 @@ class Parser:
              | IDENT func_call_args
              | ( expr )
         """
-        kind = self.curr_token.kind
+        kind = self.curr_kind
 
         if kind == 'INTEGER':
             return self.parse_integer()
@@ -263,40 +324,41 @@ class Parser:
         elif kind == 'LEFT_PAREN':
             return self.parse_paren_expr()
         else:
-            msg = 'unexpected token %r' % self.curr_token.value
-            self.diag.error(self.curr_token.loc, msg)
+            msg = 'unexpected token %r' % self.curr_value
+            self.diag.error(self.curr_loc, msg)
             raise DumbSyntaxError(msg)
 
     def parse_integer(self):
         """expr : INTEGER"""
-        integer_tok = self.curr_token
-        node = ast.IntegerConstant(int(integer_tok.value),
-                                   loc=integer_tok.loc)
-        self.advance()
+        value, ty = _split_type_suffix(self.curr_value)
+        if ty in ast.BuiltinTypes.FLOATS:
+            node = ast.FloatConstant(float(value), ty=ty,
+                                     loc=self.curr_loc)
+        else:
+            node = ast.IntegerConstant(int(value), ty=ty,
+                                       loc=self.curr_loc)
+        self._skip()
         return node
 
     def parse_float(self):
         """expr : FLOAT"""
-        float_tok = self.curr_token
-        node = ast.FloatConstant(float(float_tok.value),
-                                 loc=float_tok.loc)
-        self.advance()
+        value, ty = _split_type_suffix(self.curr_value)
+        node = ast.FloatConstant(float(value), ty=ty, loc=self.curr_loc)
+        self._skip()
         return node
 
     def parse_bool(self):
         """expr : BOOL"""
-        bool_tok = self.curr_token
-        value = True if bool_tok.value == 'true' else False
-        node = ast.BooleanConstant(value, loc=bool_tok.loc)
-        self.advance()
+        value = True if self.curr_value == 'true' else False
+        node = ast.BooleanConstant(value, loc=self.curr_loc)
+        self._skip()
         return node
 
     def parse_string(self):
         """expr : STR"""
-        string_tok = self.curr_token
-        value = _unescape_string(string_tok.value)
-        node = ast.StringConstant(value, loc=string_tok.loc)
-        self.advance()
+        value = _unescape_string(self.curr_value)
+        node = ast.StringConstant(value, loc=self.curr_loc)
+        self._skip()
         return node
 
     def parse_ident(self, no_func_call=False):
@@ -304,14 +366,15 @@ class Parser:
         expr : IDENT
              | IDENT func_call_args
         """
-        ident_tok = self.curr_token
-        self.advance()
+        name = self.curr_value
+        loc = self.curr_loc
+        self._skip()
 
-        if self.curr_token.kind != 'LEFT_PAREN' or no_func_call:
-            return ast.Identifier(ident_tok.value, loc=ident_tok.loc)
+        if self.curr_kind != 'LEFT_PAREN' or no_func_call:
+            return ast.Identifier(name, loc=loc)
 
         func_args = self.parse_func_call_args()
-        return ast.FuncCall(ident_tok.value, func_args, loc=ident_tok.loc)
+        return ast.FuncCall(name, func_args, loc=loc)
 
     def parse_func_call_args(self):
         """
@@ -322,25 +385,25 @@ class Parser:
              | args , expr
         """
         args = []
-        self.advance('LEFT_PAREN')
-        while self.curr_token.kind != 'RIGHT_PAREN':
+        self._skip('LEFT_PAREN')
+        while self.curr_kind != 'RIGHT_PAREN':
             args.append(self.parse_expr())
-            if self.curr_token.kind == 'RIGHT_PAREN':
+            if self.curr_kind == 'RIGHT_PAREN':
                 break
-            self.advance('COMMA')
-        self.advance('RIGHT_PAREN')
+            self._skip('COMMA')
+        self._skip('RIGHT_PAREN')
         return args
 
     def parse_paren_expr(self):
         """expr : ( expr )"""
-        self.advance()
+        self._skip()
         expr = self.parse_expr()
-        self.advance('RIGHT_PAREN')
+        self._skip('RIGHT_PAREN')
         return expr
 
     def skip_semicolon(self):
-        while self.curr_token.kind == 'SEMICOLON':
-            self.advance()
+        while self.curr_kind == 'SEMICOLON':
+            self._skip()
 
     def parse_stmt(self):
         """
@@ -353,7 +416,7 @@ class Parser:
              | var_stmt
              | expr_stmt
         """
-        kind = self.curr_token.kind
+        kind = self.curr_kind
 
         if kind == 'IF':
             node = self.parse_if()
@@ -381,13 +444,13 @@ class Parser:
         stmt_list : stmt
                   | stmt_list stmt
         """
-        loc = self.curr_token.loc
+        loc = self.curr_loc
         stmts = []
-        self.advance('LEFT_CURLY_BRACKET')
+        self._skip('LEFT_CURLY_BRACKET')
         self.skip_semicolon()
-        while self.curr_token.kind != 'RIGHT_CURLY_BRACKET':
+        while self.curr_kind != 'RIGHT_CURLY_BRACKET':
             stmts.append(self.parse_stmt())
-        self.advance('RIGHT_CURLY_BRACKET')
+        self._skip('RIGHT_CURLY_BRACKET')
         return ast.Block(stmts, loc=loc)
 
     def parse_if(self):
@@ -396,14 +459,14 @@ class Parser:
                 | IF expr block ELSE block
                 | IF expr block ELSE if_stmt
         """
-        loc = self.curr_token.loc
-        self.advance('IF')
+        loc = self.curr_loc
+        self._skip('IF')
         cond = self.parse_expr()
         then = self.parse_block()
-        if self.curr_token.kind != 'ELSE':
+        if self.curr_kind != 'ELSE':
             return ast.If(cond, then, loc=loc)
-        self.advance('ELSE')
-        if self.curr_token.kind == 'IF':
+        self._skip('ELSE')
+        if self.curr_kind == 'IF':
             otherwise = self.parse_if()
         else:
             otherwise = self.parse_block()
@@ -411,22 +474,22 @@ class Parser:
 
     def parse_while(self):
         """while_stmt : WHILE expr block"""
-        loc = self.curr_token.loc
-        self.advance('WHILE')
+        loc = self.curr_loc
+        self._skip('WHILE')
         cond = self.parse_expr()
         body = self.parse_block()
         return ast.While(cond, body, loc=loc)
 
     def parse_break(self):
         """break_stmt : BREAK"""
-        node = ast.Break(loc=self.curr_token.loc)
-        self.advance('BREAK')
+        node = ast.Break(loc=self.curr_loc)
+        self._skip('BREAK')
         return node
 
     def parse_continue(self):
         """continue_stmt : CONTINUE"""
-        node = ast.Continue(loc=self.curr_token.loc)
-        self.advance('CONTINUE')
+        node = ast.Continue(loc=self.curr_loc)
+        self._skip('CONTINUE')
         return node
 
     def parse_return(self):
@@ -434,9 +497,9 @@ class Parser:
         return_stmt : RETURN
                     | RETURN expr
         """
-        loc = self.curr_token.loc
-        self.advance('RETURN')
-        if self.curr_token.kind in EXPR_BEGIN_TOKENS:
+        loc = self.curr_loc
+        self._skip('RETURN')
+        if self.curr_kind in EXPR_BEGIN_TOKENS:
             ret_val = self.parse_expr()
             return ast.Return(ret_val, loc=loc)
         return ast.Return(loc=loc)
@@ -446,16 +509,16 @@ class Parser:
         var_stmt : VAR IDENT = expr
                  | VAR IDENT : ty = expr
         """
-        loc = self.curr_token.loc
-        self.advance('VAR')
-        name = self.curr_token.value
-        self.advance('IDENT')
-        if self.curr_token.kind == 'COLON':
-            self.advance()
+        loc = self.curr_loc
+        self._skip('VAR')
+        name = self.curr_value
+        self._skip('IDENT')
+        if self.curr_kind == 'COLON':
+            self._skip()
             ty = self.parse_type()
         else:
             ty = None
-        self.advance('ASSIGN')
+        self._skip('ASSIGN')
         initial_value = self.parse_expr()
         return ast.Var(name, initial_value, ty, loc=loc)
 
@@ -463,15 +526,15 @@ class Parser:
         """
         expr_stmt : expr
         """
-        loc = self.curr_token.loc
+        loc = self.curr_loc
         expr = self.parse_expr()
         return ast.Expression(expr, loc=loc)
 
     def parse_type(self):
         """ty : IDENT"""
-        ty = self.curr_token
-        self.advance('IDENT')
-        return ast.Type(ty.value)
+        name = self.curr_value
+        self._skip('IDENT')
+        return ast.BuiltinTypes.intern(name)
 
     def parse_attrs(self):
         """
@@ -481,17 +544,17 @@ class Parser:
               | attrs , attr
         """
         attrs = []
-        self.advance('ATTR_START')
-        if self.curr_token.kind == 'RIGHT_SQ_BRACKET':
+        self._skip('ATTR_START')
+        if self.curr_kind == 'RIGHT_SQ_BRACKET':
             msg = 'no attributes'
-            self.diag.error(self.curr_token.loc, msg)
+            self.diag.error(self.curr_loc, msg)
             raise DumbSyntaxError(msg)
         while True:
             attrs.append(self.parse_attr())
-            if self.curr_token.kind == 'RIGHT_SQ_BRACKET':
+            if self.curr_kind == 'RIGHT_SQ_BRACKET':
                 break
-            self.advance('COMMA')
-        self.advance('RIGHT_SQ_BRACKET')
+            self._skip('COMMA')
+        self._skip('RIGHT_SQ_BRACKET')
         return attrs
 
     def parse_attr(self):
@@ -499,10 +562,10 @@ class Parser:
         attr : IDENT
              | IDENT attr_args
         """
-        loc = self.curr_token.loc
-        name = self.curr_token.value
-        self.advance('IDENT')
-        if self.curr_token.kind != 'LEFT_PAREN':
+        loc = self.curr_loc
+        name = self.curr_value
+        self._skip('IDENT')
+        if self.curr_kind != 'LEFT_PAREN':
             return ast.Attribute(name, loc=loc)
         attr_args = self.parse_attr_args()
         return ast.Attribute(name, args=attr_args, loc=loc)
@@ -520,28 +583,28 @@ class Parser:
             | IDENT
         """
         args = []
-        self.advance('LEFT_PAREN')
-        if self.curr_token.kind == 'RIGHT_PAREN':
+        self._skip('LEFT_PAREN')
+        if self.curr_kind == 'RIGHT_PAREN':
             msg = 'no arguments were given for an attribute.'
-            self.diag.error(self.curr_token.loc, msg)
+            self.diag.error(self.curr_loc, msg)
             raise DumbSyntaxError(msg)
         while True:
-            if self.curr_token.kind == 'INTEGER':
+            if self.curr_kind == 'INTEGER':
                 args.append(self.parse_integer())
-            elif self.curr_token.kind == 'BOOL':
+            elif self.curr_kind == 'BOOL':
                 args.append(self.parse_bool())
-            elif self.curr_token.kind == 'FLOAT':
+            elif self.curr_kind == 'FLOAT':
                 args.append(self.parse_float())
-            elif self.curr_token.kind == 'IDENT':
+            elif self.curr_kind == 'IDENT':
                 args.append(self.parse_ident(no_func_call=True))
             else:
                 msg = 'unknown type of attribute argument'
-                self.diag.error(self.curr_token.loc, msg)
+                self.diag.error(self.curr_loc, msg)
                 raise DumbSyntaxError(msg)
-            if self.curr_token.kind == 'RIGHT_PAREN':
+            if self.curr_kind == 'RIGHT_PAREN':
                 break
-            self.advance('COMMA')
-        self.advance('RIGHT_PAREN')
+            self._skip('COMMA')
+        self._skip('RIGHT_PAREN')
         return args
 
     def parse_func_proto(self):
@@ -549,13 +612,13 @@ class Parser:
         func_proto : FUNC IDENT func_args
                    | FUNC IDENT func_args : ty
         """
-        loc = self.curr_token.loc
-        self.advance('FUNC')
-        name = self.curr_token.value
-        self.advance('IDENT')
+        loc = self.curr_loc
+        self._skip('FUNC')
+        name = self.curr_value
+        self._skip('IDENT')
         func_args = self.parse_func_args()
-        if self.curr_token.kind == 'COLON':
-            self.advance()
+        if self.curr_kind == 'COLON':
+            self._skip()
             ret_ty = self.parse_type()
         else:
             ret_ty = ast.BuiltinTypes.VOID
@@ -570,24 +633,24 @@ class Parser:
              | args , arg
         """
         args = []
-        self.advance('LEFT_PAREN')
-        if self.curr_token.kind == 'RIGHT_PAREN':
-            self.advance()
+        self._skip('LEFT_PAREN')
+        if self.curr_kind == 'RIGHT_PAREN':
+            self._skip()
             return args
         while True:
             args.append(self.parse_func_arg())
-            if self.curr_token.kind == 'RIGHT_PAREN':
+            if self.curr_kind == 'RIGHT_PAREN':
                 break
-            self.advance('COMMA')
-        self.advance('RIGHT_PAREN')
+            self._skip('COMMA')
+        self._skip('RIGHT_PAREN')
         return args
 
     def parse_func_arg(self):
         """arg : IDENT : ty"""
-        loc = self.curr_token.loc
-        name = self.curr_token.value
-        self.advance('IDENT')
-        self.advance('COLON')
+        loc = self.curr_loc
+        name = self.curr_value
+        self._skip('IDENT')
+        self._skip('COLON')
         ty = self.parse_type()
         return ast.Argument(name, ty, loc=loc)
 
@@ -596,21 +659,21 @@ class Parser:
         func : func_proto
              | func_proto block
         """
-        loc = self.curr_token.loc
+        loc = self.curr_loc
         proto = self.parse_func_proto()
-        if self.curr_token.kind != 'LEFT_CURLY_BRACKET':
+        if self.curr_kind != 'LEFT_CURLY_BRACKET':
             return ast.Function(proto, loc=loc)
         body = self.parse_block()
         return ast.Function(proto, body, loc=loc)
 
     def parse_with_attrs(self):
         attrs = self.parse_attrs()
-        if self.curr_token.kind == 'FUNC':
+        if self.curr_kind == 'FUNC':
             node = self.parse_func()
             node.proto.attrs = attrs
         else:
             msg = 'applying attributes is allowed only to functions'
-            self.diag.error(self.curr_token.loc, msg)
+            self.diag.error(self.curr_loc, msg)
             raise DumbSyntaxError(msg)
         return node
 
@@ -625,13 +688,13 @@ class Parser:
                            | top_level_decl func
         """
         decls = []
-        while self.curr_token.kind != 'EOF':
-            if self.curr_token.kind == 'FUNC':
+        while self.curr_kind != 'EOF':
+            if self.curr_kind == 'FUNC':
                 decls.append(self.parse_func())
-            elif self.curr_token.kind == 'ATTR_START':
+            elif self.curr_kind == 'ATTR_START':
                 decls.append(self.parse_with_attrs())
             else:
                 msg = 'unexpected token at top level'
-                self.diag.error(self.curr_token.loc, msg)
+                self.diag.error(self.curr_loc, msg)
                 raise DumbSyntaxError(msg)
         return ast.TranslationUnit(decls)
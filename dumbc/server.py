@@ -0,0 +1,179 @@
+__all__ = ('CompileServer',
+           'build_on_server',
+           'default_socket_path')
+
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import tempfile
+
+from dumbc.errors import Error
+from dumbc.utils.diagnostics import DiagnosticsEngine
+
+
+def default_socket_path():
+    """Get default location of the compile server socket.
+
+    It's `$DUMBC_SOCKET` if the variable is set, otherwise `dumbc.sock`
+    in `$XDG_RUNTIME_DIR`(or in the temporary directory).
+
+    Returns:
+        str: Path to the socket.
+    """
+    path = os.environ.get('DUMBC_SOCKET')
+    if path:
+        return path
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, 'dumbc.sock')
+    return os.path.join('/tmp', 'dumbc-%d.sock' % os.getuid())
+
+
+def _build(request): # pragma: nocover
+    from dumbc.compiler import Compiler
+    from dumbc.compiler import _read_source
+
+    os.chdir(request['cwd'])
+    source = _read_source(request['file'])
+    compiler = Compiler(source=source,
+                        output=request['output'],
+                        stdlib=request['stdlib'],
+                        dump_ir=request['dump_ir'],
+                        clean=request['clean'],
+                        opt_level=request['opt_level'],
+                        cache_dir=request['cache_dir'],
+                        cache_size=request['cache_size'],
+                        time_passes=request.get('time_passes', False),
+                        report_unused=request.get('report_unused', False),
+                        use_ssa=request.get('use_ssa', False),
+                        use_mir=request.get('use_mir', False),
+                        verify_ir=request.get('verify_ir', False),
+                        jobs=request.get('jobs', 1))
+    compiler.run()
+
+
+@contextlib.contextmanager
+def _captured_output(): # pragma: nocover
+    # Standard output and error are redirected at the level of file
+    # descriptors, so output of the linker is captured too. Requests
+    # are handled in forked processes, so they aren't restored.
+    output = io.StringIO()
+    errors = io.StringIO()
+    with tempfile.TemporaryFile('w+', buffering=1) as out, \
+            tempfile.TemporaryFile('w+', buffering=1) as err:
+        os.dup2(out.fileno(), 1)
+        os.dup2(err.fileno(), 2)
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            yield output, errors
+        for f, captured in ((out, output), (err, errors)):
+            f.flush()
+            f.seek(0)
+            captured.write(f.read())
+
+
+class _BuildHandler(socketserver.StreamRequestHandler): # pragma: nocover
+
+    def handle(self):
+        request = json.loads(self.rfile.readline().decode('utf-8'))
+        status = 0
+        with _captured_output() as (output, errors):
+            try:
+                _build(request)
+            except SystemExit as e:
+                status = e.code if isinstance(e.code, int) else 1
+            except Error as e:
+                DiagnosticsEngine(request['file'], '').error(e.message)
+                status = -1
+            except OSError as e:
+                print('error: %s' % e, file=sys.stderr)
+                status = 1
+            except Exception as e:
+                print('internal compiler error: %r' % e)
+                status = 1
+        response = {
+            'status': status,
+            'output': output.getvalue(),
+            'errors': errors.getvalue()
+        }
+        self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+
+
+class CompileServer(socketserver.ForkingMixIn,
+                    socketserver.UnixStreamServer): # pragma: nocover
+    """Compile server.
+
+    The server keeps LLVM initialized, so builds don't pay for
+    interpreter startup, imports and target machine creation. Every
+    request is handled in a forked process, so builds run concurrently
+    and don't share any compiler state.
+
+    Attributes:
+        socket_path (str): Path to the UNIX socket the server listens on.
+    """
+
+    def __init__(self, socket_path):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, _BuildHandler)
+        self.socket_path = socket_path
+
+    def warm_up(self, opt_levels=(0, 1, 2, 3)):
+        """Initialize LLVM and target machines."""
+        from dumbc.codegen.utils import get_target_machine
+        for opt_level in opt_levels:
+            get_target_machine(opt_level=opt_level)
+
+    def server_close(self):
+        super().server_close()
+        with contextlib.suppress(OSError):
+            os.unlink(self.socket_path)
+
+
+def build_on_server(request, socket_path=None): # pragma: nocover
+    """Forward a build request to the compile server.
+
+    Args:
+        request (dict): Arguments of the build command.
+        socket_path (str, optional): Path to the server socket.
+
+    Returns:
+        int: Exit status of the build, or None if the server is not
+            running.
+    """
+    if socket_path is None:
+        socket_path = default_socket_path()
+    request = dict(request, cwd=os.getcwd())
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(socket_path)
+            sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+            with sock.makefile('rb') as f:
+                line = f.readline()
+    except (FileNotFoundError, ConnectionRefusedError):
+        return None
+    if not line:
+        return None
+    response = json.loads(line.decode('utf-8'))
+    sys.stdout.write(response['output'])
+    sys.stderr.write(response.get('errors', ''))
+    return response['status']
+
+
+def serve(socket_path=None): # pragma: nocover
+    """Run the compile server until it's interrupted.
+
+    Args:
+        socket_path (str, optional): Path to the server socket.
+    """
+    if socket_path is None:
+        socket_path = default_socket_path()
+    with CompileServer(socket_path) as server:
+        server.warm_up()
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -17,8 +17,14 @@ def _build_function(description):
     return func
 
 
+def _prelude():
+    # Every translation unit gets its own prototypes, since passes
+    # store slots and other state on their arguments.
+    return list(map(_build_function, _BUILTIN_FUNCTIONS))
+
+
 def _inject_functions(translation_unit):
-    funcs = list(map(_build_function, _BUILTIN_FUNCTIONS))
+    funcs = _prelude()
     translation_unit.decls = funcs + translation_unit.decls
 
 
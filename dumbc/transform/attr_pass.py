@@ -2,10 +2,12 @@ import dumbc.ast.ast as ast
 
 from dumbc.errors import DumbTypeError
 from dumbc.errors import DumbNameError
-from dumbc.transform.base_pass import Pass
+from dumbc.transform.base_pass import HookPass
 
 
-class AttrPass(Pass):
+class AttrPass(HookPass):
+
+    requires = ('CallGraphPass',)
 
     def check_no_attrs(self, node):
         if node.body is None:
@@ -22,7 +24,21 @@ class AttrPass(Pass):
                    'define only prototype')
             raise DumbTypeError(msg, loc=node.loc)
 
-    def visit_Function(self, node):
+    def check_const_attr(self, node, attr):
+        if attr.args is not None:
+            msg = 'const attribute takes no arguments'
+            raise DumbTypeError(msg, loc=attr.loc)
+
+        if node.body is None:
+            msg = 'function with const attribute should have a body'
+            raise DumbTypeError(msg, loc=node.loc)
+
+        if node.pure is False:
+            msg = 'const function %r calls impure functions' % (
+                node.proto.name)
+            raise DumbTypeError(msg, loc=node.loc)
+
+    def enter_Function(self, node):
         attrs = node.proto.attrs
 
         if attrs is None:
@@ -32,6 +48,8 @@ class AttrPass(Pass):
         for attr in attrs:
             if attr.name == 'external':
                 self.check_external_attr(node, attr)
+            elif attr.name == 'const':
+                self.check_const_attr(node, attr)
             else:
                 msg = 'ambiguous function attribute name %r' % attr.name
                 raise DumbNameError(msg, loc=attr.loc)
@@ -2,21 +2,25 @@ from dumbc.ast.visitor import GenericVisitor
 
 
 class Pass(GenericVisitor): # pragma: no cover
-    """Base semantic analysis pass."""
+    """Base semantic analysis pass.
+
+    Visit methods are generators which yield children of a node,
+    so a pass can walk arbitrarily deep trees.
+    """
 
     def visit_BinaryOp(self, node):
-        self.visit(node.left)
-        self.visit(node.right)
+        yield node.left
+        yield node.right
 
     def visit_Assignment(self, node):
-        self.visit(node.lvalue)
-        self.visit(node.rvalue)
+        yield node.lvalue
+        yield node.rvalue
 
     def visit_UnaryOp(self, node):
-        self.visit(node.value)
+        yield node.value
 
     def visit_Cast(self, node):
-        self.visit(node.value)
+        yield node.value
 
     def visit_IntegerConstant(self, node):
         pass
@@ -35,17 +39,17 @@ class Pass(GenericVisitor): # pragma: no cover
 
     def visit_FuncCall(self, node):
         for arg in node.args:
-            self.visit(arg)
+            yield arg
 
     def visit_If(self, node):
-        self.visit(node.cond)
-        self.visit(node.then)
+        yield node.cond
+        yield node.then
         if node.otherwise is not None:
-            self.visit(node.otherwise)
+            yield node.otherwise
 
     def visit_While(self, node):
-        self.visit(node.cond)
-        self.visit(node.body)
+        yield node.cond
+        yield node.body
 
     def visit_Break(self, node):
         pass
@@ -55,22 +59,48 @@ class Pass(GenericVisitor): # pragma: no cover
 
     def visit_Block(self, node):
         for stmt in node.stmts:
-            self.visit(stmt)
+            yield stmt
 
     def visit_Return(self, node):
         if node.value:
-            self.visit(node.value)
+            yield node.value
 
     def visit_Var(self, node):
-        self.visit(node.initial_value)
+        yield node.initial_value
 
     def visit_Expression(self, node):
-        self.visit(node.expr)
+        yield node.expr
 
     def visit_Function(self, node):
         if node.body is not None:
-            self.visit(node.body)
+            yield node.body
 
     def visit_TranslationUnit(self, node):
         for decl in node.decls:
-            self.visit(decl)
+            yield decl
+
+
+class HookPass:
+    """Base pass run as a set of node hooks.
+
+    Instead of walking a tree on its own, a pass defines methods
+    `enter_<Node>` and `leave_<Node>` which are called before and
+    after children of a node of the class <Node> are walked. Hook
+    passes which follow each other are run by a pass manager in
+    a single fused walk.
+
+    Attributes:
+        requires (tuple): Names of passes which have to be run
+            before this pass.
+        whole_tree (bool): Whether results of the pass are complete
+            only after the whole tree is walked. Passes requiring such
+            a pass aren't run in the same walk.
+    """
+
+    requires = ()
+    whole_tree = False
+
+    def visit(self, node):
+        """Run the pass alone on a tree."""
+        from dumbc.transform.pass_manager import PassManager
+        PassManager([self]).run(node)
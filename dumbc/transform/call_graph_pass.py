@@ -0,0 +1,111 @@
+import dumbc.ast.ast as ast
+
+from dumbc.transform.base_pass import HookPass
+
+
+def _is_external(func):
+    attrs = func.proto.attrs or ()
+    return any(attr.name == 'external' for attr in attrs)
+
+
+class CallGraphPass(HookPass):
+    """Call graph pass.
+
+    Builds a graph of calls between functions of the translation unit
+    and removes functions which can't be reached from `main`, so they
+    are neither type checked nor compiled. Calls are renumbered to
+    the remaining declarations.
+
+    Functions with a body and an external attribute are kept as well.
+    The attribute marks only prototypes of functions defined elsewhere,
+    so these are errors, which are reported by a later pass.
+
+    Functions are marked pure unless they are external or call, maybe
+    transitively, an external or unresolved function. The language has
+    neither global variables nor pointers, so a pure function computes
+    its result from its arguments only.
+
+    Attributes:
+        removed (list): Functions removed from the translation unit.
+    """
+
+    requires = ('ResolvePass',)
+    # Functions are removed and marked pure after the walk.
+    whole_tree = True
+
+    def __init__(self):
+        # Calls made by each declaration of the translation unit.
+        self.calls = []
+        self.current = None
+        self.index = {}
+        self.removed = []
+
+    def enter_TranslationUnit(self, node):
+        self.calls = [[] for _ in node.decls]
+        self.index = {id(decl): i for i, decl in enumerate(node.decls)}
+        self.removed = []
+
+    def enter_Function(self, node):
+        self.current = self.calls[self.index[id(node)]]
+
+    def enter_FuncCall(self, node):
+        self.current.append(node)
+
+    def _mark_pure(self, decls):
+        callers = [[] for _ in decls]
+        stack = []
+        for i, decl in enumerate(decls):
+            if not isinstance(decl, ast.Function):
+                continue
+            decl.pure = True
+            if decl.body is None:
+                stack.append(i)
+            for call in self.calls[i]:
+                if call.slot is None:
+                    stack.append(i)
+                else:
+                    callers[call.slot].append(i)
+        # Impurity is propagated from callees to their callers.
+        while stack:
+            i = stack.pop()
+            if decls[i].pure:
+                decls[i].pure = False
+                stack.extend(callers[i])
+
+    def leave_TranslationUnit(self, node):
+        decls = node.decls
+        self._mark_pure(decls)
+        stack = [i for i, decl in enumerate(decls)
+                 if isinstance(decl, ast.Function) and
+                 decl.proto.name == 'main']
+        if not stack:
+            # Missing main function is reported by a later pass.
+            return
+        stack.extend(i for i, decl in enumerate(decls)
+                     if isinstance(decl, ast.Function) and
+                     decl.body is not None and
+                     _is_external(decl))
+        reachable = set()
+        while stack:
+            i = stack.pop()
+            if i in reachable:
+                continue
+            reachable.add(i)
+            stack.extend(call.slot for call in self.calls[i]
+                         if call.slot is not None)
+        # Redefinitions of reachable functions are kept to be reported.
+        names = {decls[i].proto.name for i in reachable}
+        keep = [i for i, decl in enumerate(decls)
+                if not isinstance(decl, ast.Function) or
+                decl.proto.name in names]
+        if len(keep) == len(decls):
+            return
+        kept = set(keep)
+        self.removed = [decl for i, decl in enumerate(decls)
+                        if i not in kept]
+        new_index = {old: new for new, old in enumerate(keep)}
+        for i in keep:
+            for call in self.calls[i]:
+                if call.slot is not None:
+                    call.slot = new_index.get(call.slot)
+        node.decls = [decls[i] for i in keep]
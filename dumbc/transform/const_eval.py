@@ -0,0 +1,450 @@
+__all__ = ('constant_value',
+           'make_constant',
+           'int_binop',
+           'float_binop',
+           'unaryop',
+           'cast',
+           'Evaluator')
+
+import math
+import struct
+
+import dumbc.ast.ast as ast
+
+from dumbc.ast.ast import BuiltinTypes
+from dumbc.ast.ast import Operator
+from dumbc.ast.visitor import ExprVisitor
+from dumbc.ast.visitor import StmtVisitor
+
+
+# Values are computed the way LLVM evaluates the instructions emitted
+# for them. An integer value of a type is kept in the range of the type
+# (negative numbers for signed types only), an 'f32' value is a double
+# exactly representable as a single precision float. Operations with
+# undefined or poison results(division by zero, overflowing shifts and
+# float to integer casts, etc) have no value.
+
+_NBITS = {ty: int(ty.name[1:]) for ty in BuiltinTypes.NUMERICAL}
+
+_INT_CONSTANT_TYPES = BuiltinTypes.INTEGERS | {None}
+_FLOAT_CONSTANT_TYPES = BuiltinTypes.FLOATS | {None}
+
+
+def _wrap(value, ty):
+    """Wrap an integer to the range of an integer type."""
+    nbits = _NBITS[ty]
+    value &= (1 << nbits) - 1
+    if ty in BuiltinTypes.SIGNED_INTS and value >> (nbits - 1):
+        value -= 1 << nbits
+    return value
+
+
+def _round_f32(value):
+    """Round a double to the nearest single precision float.
+
+    Returns:
+        float: Rounded value, or None if the value overflows.
+    """
+    try:
+        return struct.unpack('f', struct.pack('f', value))[0]
+    except OverflowError:
+        return None
+
+
+def _round(value, ty):
+    if ty == BuiltinTypes.F32:
+        return _round_f32(value)
+    return value
+
+
+def _compare(op, left, right):
+    if op == Operator.LT:
+        return left < right
+    elif op == Operator.LE:
+        return left <= right
+    elif op == Operator.GT:
+        return left > right
+    elif op == Operator.GE:
+        return left >= right
+    elif op == Operator.EQ:
+        return left == right
+    elif op == Operator.NE:
+        return left != right
+    return None
+
+
+def constant_value(node):
+    """Return a value and a type of a constant expression.
+
+    Returns:
+        tuple: A value and a type, or None if the node isn't
+            a constant.
+    """
+    cls = type(node)
+    if cls is ast.IntegerConstant and node.ty in _INT_CONSTANT_TYPES:
+        ty = node.ty or BuiltinTypes.I32
+        value = node.value
+        # Values out of range are left to be reported by LLVM.
+        if type(value) is int and _wrap(value, ty) == value:
+            return value, ty
+    elif cls is ast.FloatConstant and node.ty in _FLOAT_CONSTANT_TYPES:
+        ty = node.ty or BuiltinTypes.F32
+        value = _round(float(node.value), ty)
+        if value is not None:
+            return value, ty
+    elif cls is ast.BooleanConstant:
+        return bool(node.value), BuiltinTypes.BOOL
+    return None
+
+
+def make_constant(value, ty, loc):
+    if ty == BuiltinTypes.BOOL:
+        return ast.BooleanConstant(value, loc=loc)
+    if ty in BuiltinTypes.FLOATS:
+        return ast.FloatConstant(value, ty=ty, loc=loc)
+    return ast.IntegerConstant(value, ty=ty, loc=loc)
+
+
+def int_binop(op, ty, left, right):
+    nbits = _NBITS[ty]
+    signed = ty in BuiltinTypes.SIGNED_INTS
+    if op == Operator.ADD:
+        return _wrap(left + right, ty)
+    elif op == Operator.SUB:
+        return _wrap(left - right, ty)
+    elif op == Operator.MUL:
+        return _wrap(left * right, ty)
+    elif op in (Operator.DIV, Operator.MOD):
+        if right == 0:
+            return None
+        if signed and left == -(1 << (nbits - 1)) and right == -1:
+            return None
+        # sdiv and srem round towards zero.
+        quotient = abs(left) // abs(right)
+        if (left < 0) != (right < 0):
+            quotient = -quotient
+        if op == Operator.DIV:
+            return quotient
+        return left - right * quotient
+    elif op == Operator.AND:
+        return _wrap(left & right, ty)
+    elif op == Operator.OR:
+        return _wrap(left | right, ty)
+    elif op == Operator.XOR:
+        return _wrap(left ^ right, ty)
+    elif op in (Operator.SHL, Operator.SHR):
+        if not 0 <= right < nbits:
+            return None
+        if op == Operator.SHL:
+            return _wrap(left << right, ty)
+        # Signed values are shifted arithmetically, unsigned ones are
+        # never negative.
+        return left >> right
+    return _compare(op, left, right)
+
+
+def float_binop(op, ty, left, right):
+    if op == Operator.ADD:
+        result = left + right
+    elif op == Operator.SUB:
+        result = left - right
+    elif op == Operator.MUL:
+        result = left * right
+    elif op == Operator.DIV:
+        if right == 0:
+            return None
+        result = left / right
+    elif op == Operator.MOD:
+        if right == 0 or math.isinf(left):
+            return None
+        result = math.fmod(left, right)
+    else:
+        # Comparisons are ordered: they are false if either operand
+        # is NaN.
+        if math.isnan(left) or math.isnan(right):
+            return False
+        return _compare(op, left, right)
+    return _round(result, ty)
+
+
+def unaryop(op, ty, value):
+    if op == Operator.UNARY_PLUS:
+        return value
+    elif op == Operator.LOGICAL_NOT and ty == BuiltinTypes.BOOL:
+        return not value
+    elif op == Operator.NOT and ty in BuiltinTypes.INTEGERS:
+        return _wrap(~value, ty)
+    elif op == Operator.UNARY_MINUS and ty in BuiltinTypes.INTEGERS:
+        return _wrap(-value, ty)
+    elif op == Operator.UNARY_MINUS and ty in BuiltinTypes.FLOATS:
+        # Negation is emitted as a subtraction from zero.
+        return 0.0 - value
+    return None
+
+
+def cast(src_ty, dst_ty, value):
+    integers = BuiltinTypes.INTEGERS
+    floats = BuiltinTypes.FLOATS
+    if src_ty in integers and dst_ty in integers:
+        return _wrap(value, dst_ty)
+    elif src_ty in integers and dst_ty in floats:
+        # Larger integers would be rounded twice.
+        if abs(value) > 1 << 53:
+            return None
+        return _round(float(value), dst_ty)
+    elif src_ty in floats and dst_ty in integers:
+        if math.isnan(value) or math.isinf(value):
+            return None
+        result = int(value)
+        if _wrap(result, dst_ty) != result:
+            return None
+        return result
+    elif src_ty in floats and dst_ty in floats:
+        return _round(value, dst_ty)
+    return None
+
+
+def _key(value):
+    # Equal floats of different signs(0.0 and -0.0) must not share
+    # a result.
+    return repr(value) if type(value) is float else value
+
+
+class _NotConstant(Exception):
+    pass
+
+
+class _Return(Exception):
+
+    def __init__(self, value):
+        super(_Return, self).__init__()
+        self.value = value
+
+
+class _Break(Exception):
+    pass
+
+
+class _Continue(Exception):
+    pass
+
+
+class Evaluator(ExprVisitor, StmtVisitor):
+    """Compile-time evaluator of function calls.
+
+    Bodies of functions are interpreted with the semantics of code
+    emitted for them. Evaluation gives up on anything which has no
+    constant value: strings, calls of functions without a body,
+    undefined results of operations, and calls running too long or
+    recursing too deep.
+
+    Attributes:
+        max_steps (int): Maximum number of statements and calls run
+            by an evaluation.
+        max_depth (int): Maximum depth of nested calls.
+
+    Examples:
+
+        >>> from unittest import mock
+        >>> from dumbc import tokenize
+        >>> from dumbc import Parser
+        >>> from dumbc.utils.diagnostics import DiagnosticsEngine
+        >>> from dumbc.transform.resolve_pass import ResolvePass
+        >>> from dumbc.transform.type_pass import TypePass
+        >>> from dumbc.transform.pass_manager import PassManager
+        >>> code = 'func sq(x: i32): i32 { return x * x }'
+        >>> diag = mock.Mock(spec=DiagnosticsEngine)
+        >>> unit = Parser(tokenize(code), diag).parse_translation_unit()
+        >>> PassManager([ResolvePass(), TypePass()]).run(unit)
+        >>> Evaluator(unit.decls).call(0, [7])
+        49
+    """
+
+    max_steps = 20000
+    max_depth = 256
+
+    def __init__(self, decls):
+        self.decls = decls
+        self.frames = []
+        self.steps = 0
+        # Results of calls by function index and arguments, failed
+        # calls have None results.
+        self.results = {}
+
+    def _step(self):
+        self.steps += 1
+        if self.steps > self.max_steps:
+            raise _NotConstant()
+
+    def call(self, index, args):
+        """Evaluate a call of a function with constant arguments.
+
+        Args:
+            index (int): Index of the function in declarations.
+            args (list): Values of the arguments.
+
+        Returns:
+            The value returned by the function, or None if the call
+            can't be evaluated.
+        """
+        key = (index, tuple(_key(arg) for arg in args))
+        if key in self.results:
+            return self.results[key]
+        self.frames = []
+        self.steps = 0
+        try:
+            result = self._run(self._call(index, args),
+                               self._dispatch_table())
+        except _NotConstant:
+            result = None
+        self.results[key] = result
+        return result
+
+    def _call(self, index, args):
+        key = (index, tuple(_key(arg) for arg in args))
+        result = self.results.get(key)
+        if result is not None:
+            return result
+        decl = self.decls[index]
+        if decl.body is None or len(self.frames) >= self.max_depth:
+            raise _NotConstant()
+        self._step()
+        frame = [None] * decl.num_slots
+        for arg, value in zip(decl.proto.args, args):
+            frame[arg.slot] = value
+        self.frames.append(frame)
+        try:
+            yield decl.body
+            result = None
+        except _Return as e:
+            result = e.value
+        finally:
+            self.frames.pop()
+        if result is not None:
+            self.results[key] = result
+        return result
+
+    def visit_BinaryOp(self, node):
+        left = yield node.left
+        op = node.op
+        if op in (Operator.LOGICAL_AND, Operator.LOGICAL_OR):
+            if left == (op == Operator.LOGICAL_OR):
+                return left
+            return (yield node.right)
+        right = yield node.right
+        ty = node.ty
+        if ty in BuiltinTypes.INTEGERS:
+            result = int_binop(op, ty, left, right)
+        elif ty in BuiltinTypes.FLOATS:
+            result = float_binop(op, ty, left, right)
+        else:
+            result = None
+        if result is None:
+            raise _NotConstant()
+        return result
+
+    def visit_Assignment(self, node):
+        value = yield node.rvalue
+        slot = node.lvalue.slot
+        frame = self.frames[-1]
+        if node.op is not None:
+            # The stored value has the type of the variable.
+            ty = node.ty
+            if ty in BuiltinTypes.INTEGERS:
+                value = int_binop(node.op, ty, frame[slot], value)
+            elif ty in BuiltinTypes.FLOATS:
+                value = float_binop(node.op, ty, frame[slot], value)
+            else:
+                value = None
+            if value is None:
+                raise _NotConstant()
+        frame[slot] = value
+        return value
+
+    def visit_UnaryOp(self, node):
+        value = yield node.value
+        result = unaryop(node.op, node.ty, value)
+        if result is None:
+            raise _NotConstant()
+        return result
+
+    def visit_Cast(self, node):
+        value = yield node.value
+        result = cast(node.src_ty, node.dst_ty, value)
+        if result is None:
+            raise _NotConstant()
+        return result
+
+    def _constant(self, node):
+        value = constant_value(node)
+        if value is None:
+            raise _NotConstant()
+        return value[0]
+
+    def visit_IntegerConstant(self, node):
+        return self._constant(node)
+
+    def visit_FloatConstant(self, node):
+        return self._constant(node)
+
+    def visit_BooleanConstant(self, node):
+        return self._constant(node)
+
+    def visit_StringConstant(self, node):
+        raise _NotConstant()
+
+    def visit_Identifier(self, node):
+        value = self.frames[-1][node.slot]
+        if value is None:
+            raise _NotConstant()
+        return value
+
+    def visit_FuncCall(self, node):
+        if node.slot is None:
+            raise _NotConstant()
+        args = []
+        for arg in node.args:
+            value = yield arg
+            args.append(value)
+        return (yield from self._call(node.slot, args))
+
+    def visit_If(self, node):
+        cond = yield node.cond
+        if cond:
+            yield node.then
+        elif node.otherwise is not None:
+            yield node.otherwise
+
+    def visit_While(self, node):
+        while (yield node.cond):
+            self._step()
+            try:
+                yield node.body
+            except _Break:
+                break
+            except _Continue:
+                pass
+
+    def visit_Break(self, node):
+        raise _Break()
+
+    def visit_Continue(self, node):
+        raise _Continue()
+
+    def visit_Block(self, node):
+        for stmt in node.stmts:
+            self._step()
+            yield stmt
+
+    def visit_Return(self, node):
+        value = None
+        if node.value is not None:
+            value = yield node.value
+        raise _Return(value)
+
+    def visit_Var(self, node):
+        self.frames[-1][node.slot] = yield node.initial_value
+
+    def visit_Expression(self, node):
+        yield node.expr
+
@@ -0,0 +1,192 @@
+import dumbc.ast.ast as ast
+
+from dumbc.ast.ast import BuiltinTypes
+from dumbc.ast.ast import Operator
+from dumbc.transform.base_pass import Pass
+from dumbc.transform.const_eval import cast
+from dumbc.transform.const_eval import constant_value
+from dumbc.transform.const_eval import float_binop
+from dumbc.transform.const_eval import int_binop
+from dumbc.transform.const_eval import make_constant
+from dumbc.transform.const_eval import unaryop
+from dumbc.transform.const_eval import Evaluator
+
+
+def _fold_binop(node):
+    left = constant_value(node.left)
+    if left is None:
+        return None
+    op = node.op
+    if op in (Operator.LOGICAL_AND, Operator.LOGICAL_OR):
+        # The right operand isn't evaluated if the left one determines
+        # the result.
+        if left[0] == (op == Operator.LOGICAL_OR):
+            return make_constant(left[0], BuiltinTypes.BOOL, node.loc)
+        return node.right
+    right = constant_value(node.right)
+    if right is None:
+        return None
+    ty = node.ty
+    if left[1] != ty or right[1] != ty:
+        return None
+    if ty in BuiltinTypes.INTEGERS:
+        result = int_binop(op, ty, left[0], right[0])
+    elif ty in BuiltinTypes.FLOATS:
+        result = float_binop(op, ty, left[0], right[0])
+    else:
+        return None
+    if result is None:
+        return None
+    if Operator.relational(op):
+        ty = BuiltinTypes.BOOL
+    return make_constant(result, ty, node.loc)
+
+
+def _fold_unaryop(node):
+    value = constant_value(node.value)
+    if value is None:
+        return None
+    value, ty = value
+    result = unaryop(node.op, ty, value)
+    if result is None:
+        return None
+    return make_constant(result, ty, node.loc)
+
+
+def _fold_cast(node):
+    value = constant_value(node.value)
+    if value is None:
+        return None
+    value, src_ty = value
+    if src_ty != node.src_ty:
+        return None
+    result = cast(src_ty, node.dst_ty, value)
+    if result is None:
+        return None
+    return make_constant(result, node.dst_ty, node.loc)
+
+
+class ConstFoldPass(Pass):
+    """Constant folding and propagation pass.
+
+    Operators and casts with constant operands are replaced with their
+    results. Variables which are initialized with a constant and never
+    assigned are replaced with the constant, and their declarations
+    are removed. Calls of pure functions with constant arguments are
+    evaluated and replaced with their results.
+    """
+
+    requires = ('ResolvePass', 'CallGraphPass', 'TypePass')
+
+    def __init__(self):
+        self.constants = {}
+        self.evaluator = None
+
+    def _evaluate_call(self, node):
+        """Evaluate a call of a pure function with constant arguments.
+
+        Returns:
+            Expr: A constant, or None if the call can't be evaluated.
+        """
+        if self.evaluator is None or node.slot is None:
+            return None
+        decl = self.evaluator.decls[node.slot]
+        proto = decl.proto
+        if (not decl.pure or proto.ret_ty == BuiltinTypes.VOID or
+                len(node.args) != len(proto.args)):
+            return None
+        args = []
+        for arg, formal in zip(node.args, proto.args):
+            value = constant_value(arg)
+            if value is None or value[1] != formal.ty:
+                return None
+            args.append(value[0])
+        result = self.evaluator.call(node.slot, args)
+        if result is None:
+            return None
+        return make_constant(result, proto.ret_ty, node.loc)
+
+    def visit_BinaryOp(self, node):
+        node.left = yield node.left
+        node.right = yield node.right
+        return _fold_binop(node) or node
+
+    def visit_Assignment(self, node):
+        node.rvalue = yield node.rvalue
+        return node
+
+    def visit_UnaryOp(self, node):
+        node.value = yield node.value
+        return _fold_unaryop(node) or node
+
+    def visit_Cast(self, node):
+        node.value = yield node.value
+        return _fold_cast(node) or node
+
+    def visit_IntegerConstant(self, node):
+        return node
+
+    def visit_FloatConstant(self, node):
+        return node
+
+    def visit_BooleanConstant(self, node):
+        return node
+
+    def visit_StringConstant(self, node):
+        return node
+
+    def visit_Identifier(self, node):
+        constant = self.constants.get(node.slot)
+        if constant is None:
+            return node
+        value, ty = constant
+        return make_constant(value, ty, node.loc)
+
+    def visit_FuncCall(self, node):
+        for i, arg in enumerate(node.args):
+            node.args[i] = yield arg
+        return self._evaluate_call(node) or node
+
+    def visit_If(self, node):
+        node.cond = yield node.cond
+        yield node.then
+        if node.otherwise is not None:
+            yield node.otherwise
+
+    def visit_While(self, node):
+        node.cond = yield node.cond
+        yield node.body
+
+    def visit_Block(self, node):
+        for stmt in node.stmts:
+            yield stmt
+        if any(type(stmt) is ast.Var and stmt.slot in self.constants
+               for stmt in node.stmts):
+            node.stmts = [stmt for stmt in node.stmts
+                          if not (type(stmt) is ast.Var and
+                                  stmt.slot in self.constants)]
+
+    def visit_Return(self, node):
+        if node.value is not None:
+            node.value = yield node.value
+
+    def visit_Var(self, node):
+        node.initial_value = yield node.initial_value
+        if node.assigned is not False:
+            return
+        constant = constant_value(node.initial_value)
+        if constant is not None and constant[1] == node.ty:
+            self.constants[node.slot] = constant
+
+    def visit_Expression(self, node):
+        node.expr = yield node.expr
+
+    def visit_Function(self, node):
+        if node.body is not None:
+            self.constants = {}
+            yield node.body
+
+    def visit_TranslationUnit(self, node):
+        self.evaluator = Evaluator(node.decls)
+        for decl in node.decls:
+            yield decl
@@ -1,24 +1,251 @@
 import dumbc.ast.ast as ast
 
-from dumbc.transform.base_pass import Pass
+from dumbc.errors import DumbTypeError
+from dumbc.transform.base_pass import HookPass
 
 
-def eliminate_dead_code(stmts):
-    # Find the first return/break/continue statement and delete
-    # the rest after it. The else clause executes when the loop
-    # completes normally (in our case no return/break/continue
-    # statements were found).
-    classes = (ast.Return, ast.Break, ast.Continue)
-    for i, stmt in enumerate(stmts):
-        if any(isinstance(stmt, klass) for klass in classes):
-            return stmts[:i + 1]
-    else:
-        return stmts
+def _select_branch(stmt):
+    """Replace a statement with a constant condition by the code it runs.
 
+    Returns:
+        Stmt: The statement, its branch, or None if nothing would run.
+    """
+    while (isinstance(stmt, ast.If) and
+           isinstance(stmt.cond, ast.BooleanConstant)):
+        stmt = stmt.then if stmt.cond.value else stmt.otherwise
+    if (isinstance(stmt, ast.While) and
+            isinstance(stmt.cond, ast.BooleanConstant) and
+            not stmt.cond.value):
+        return None
+    return stmt
 
-class DeadCodePass(Pass):
 
-    def visit_Block(self, node):
-        node.stmts = eliminate_dead_code(node.stmts)
+class DeadCodePass(HookPass):
+    """Dead code elimination pass.
+
+    Statements which can't be reached are removed, and so are branches
+    of if statements and while loops with constant conditions. Then
+    stores to variables which are never read are removed, keeping side
+    effects of the stored values. A function returning a value must
+    not reach the end of its body.
+
+    Statements following an unreachable point of a block are still
+    walked(by other passes of a fused walk), the hooks skip them and
+    they are removed on leaving the block.
+    """
+
+    # Dead code is still type checked and checked for misplaced
+    # break/continue statements.
+    requires = ('TypePass', 'LoopPass', 'ConstFoldPass')
+
+    def __init__(self):
+        # Whether the end of the statement being walked is reachable,
+        # and whether each loop being walked is left by a break.
+        self.reachable = True
+        self.breaks = []
+        # Each open block with positions of its statements and the
+        # number of its statements to keep, or None. For each open if
+        # statement, whether the end of its then branch is reachable.
+        self.blocks = []
+        self.ifs = []
+        # Dead statement being walked.
+        self.dead = None
+        # Slots which are read, and stores as tuples (block, index,
+        # slot, value, whether the value has side effects).
+        self.live = set()
+        self.stores = []
+        # Number of calls and assignments walked, and its value at the
+        # beginning of the current statement.
+        self.effects = 0
+        self.mark = 0
+        # Identifier assigned by the current statement, and the slot
+        # and the value it stores.
+        self.target = None
+        self.store = None
+
+    def _remove_dead_stores(self):
+        dead = {}
+        for block, index, slot, value, effects in self.stores:
+            if slot is None or slot in self.live:
+                continue
+            replacement = None
+            if effects:
+                replacement = ast.Expression(value, loc=value.loc)
+            dead.setdefault(id(block), (block, {}))[1][index] = replacement
+        for block, replacements in dead.values():
+            stmts = []
+            for i, stmt in enumerate(block.stmts):
+                stmt = replacements.get(i, stmt)
+                if stmt is not None:
+                    stmts.append(stmt)
+            block.stmts = stmts
+
+    def _enter_dead(self, node):
+        # Whether a statement being entered is dead code.
+        if self.dead is not None:
+            return True
+        if not self.blocks:
+            return False
+        _, positions, keep = self.blocks[-1]
+        if keep is not None and id(node) in positions:
+            self.dead = node
+            return True
+        return False
+
+    def _leave_dead(self, node):
+        # Whether a statement being left is dead code.
+        if self.dead is None:
+            return False
+        if node is self.dead:
+            self.dead = None
+        return True
+
+    def _cut(self, node):
+        # Statements after a statement whose end can't be reached are
+        # removed from its block.
+        if self.reachable or not self.blocks:
+            return
+        block = self.blocks[-1]
+        index = block[1].get(id(node))
+        if block[2] is None and index is not None:
+            block[2] = index + 1
+
+    def _add_store(self, node, slot, value, effects):
+        block, positions, _ = self.blocks[-1]
+        index = positions.get(id(node))
+        if index is not None:
+            self.stores.append((block, index, slot, value, effects))
+
+    def leave_Assignment(self, node):
+        self.effects += 1
+
+    def leave_Identifier(self, node):
+        if self.dead is None and node is not self.target:
+            self.live.add(node.slot)
+
+    def leave_FuncCall(self, node):
+        self.effects += 1
+
+    def enter_If(self, node):
+        if self._enter_dead(node):
+            return
+        node.otherwise = _select_branch(node.otherwise)
+        self.ifs.append([node, True])
+
+    def leave_If(self, node):
+        if self._leave_dead(node):
+            return
+        _, then_reachable = self.ifs.pop()
+        self.reachable = self.reachable or then_reachable
+        self._cut(node)
+
+    def enter_While(self, node):
+        if self._enter_dead(node):
+            return
+        self.breaks.append(False)
+
+    def leave_While(self, node):
+        if self._leave_dead(node):
+            return
+        # A loop with a constant(true) condition is left by breaks only.
+        broken = self.breaks.pop()
+        self.reachable = (broken or
+                          not isinstance(node.cond, ast.BooleanConstant))
+        self._cut(node)
+
+    def enter_Break(self, node):
+        if self._enter_dead(node):
+            self._leave_dead(node)
+            return
+        if self.breaks:
+            self.breaks[-1] = True
+        self.reachable = False
+        self._cut(node)
+
+    def enter_Continue(self, node):
+        if self._enter_dead(node):
+            self._leave_dead(node)
+            return
+        self.reachable = False
+        self._cut(node)
+
+    def enter_Block(self, node):
+        if self._enter_dead(node):
+            self.blocks.append([node, {}, None])
+            return
+        stmts = []
         for stmt in node.stmts:
-            self.visit(stmt)
+            stmt = _select_branch(stmt)
+            if stmt is not None:
+                stmts.append(stmt)
+        node.stmts = stmts
+        positions = {id(stmt): i for i, stmt in enumerate(node.stmts)}
+        self.blocks.append([node, positions, None])
+
+    def leave_Block(self, node):
+        _, _, keep = self.blocks.pop()
+        if self._leave_dead(node):
+            return
+        if keep is not None:
+            node.stmts = list(node.stmts)[:keep]
+        if self.ifs and self.ifs[-1][0].then is node:
+            # The else branch is reached regardless of the then branch.
+            self.ifs[-1][1] = self.reachable
+            self.reachable = True
+        self._cut(node)
+
+    def enter_Return(self, node):
+        self._enter_dead(node)
+
+    def leave_Return(self, node):
+        if self._leave_dead(node):
+            return
+        self.reachable = False
+        self._cut(node)
+
+    def enter_Var(self, node):
+        if not self._enter_dead(node):
+            self.mark = self.effects
+
+    def leave_Var(self, node):
+        if self._leave_dead(node):
+            return
+        self._add_store(node, node.slot, node.initial_value,
+                        self.effects > self.mark)
+
+    def enter_Expression(self, node):
+        if self._enter_dead(node):
+            return
+        self.mark = self.effects
+        expr = node.expr
+        if (isinstance(expr, ast.Assignment) and
+                isinstance(expr.lvalue, ast.Identifier)):
+            # The assigned variable isn't read.
+            self.target = expr.lvalue
+            self.store = expr.lvalue.slot, expr.rvalue
+
+    def leave_Expression(self, node):
+        if self._leave_dead(node) or self.target is None:
+            return
+        slot, value = self.store
+        # The assignment itself is counted as well.
+        self._add_store(node, slot, value, self.effects - self.mark > 1)
+        self.target = self.store = None
+
+    def enter_Function(self, node):
+        self.reachable = True
+        self.breaks = []
+        self.blocks = []
+        self.ifs = []
+        self.dead = None
+        self.live = set()
+        self.stores = []
+
+    def leave_Function(self, node):
+        if node.body is None:
+            return
+        proto = node.proto
+        if self.reachable and proto.ret_ty != ast.BuiltinTypes.VOID:
+            msg = 'missing return statement in function %r' % proto.name
+            raise DumbTypeError(msg, loc=node.loc)
+        self._remove_dead_stores()
@@ -0,0 +1,57 @@
+import dumbc.ast.ast as ast
+
+from dumbc.transform.base_pass import HookPass
+
+
+class LowerPass(HookPass):
+    """Lowering pass.
+
+    Rewrites statements to the canonical forms expected by code
+    generation:
+
+    * An augmented assignment `x op= y` becomes `x = x op y`, the
+      operation has the type of `x`.
+    * An else branch holding only an if statement becomes a link of an
+      else-if chain, and an empty else branch is dropped.
+
+    Else branches are rewritten on leaving a function, after prints in
+    them are coalesced.
+    """
+
+    # Earlier passes see statements as they were written.
+    requires = ('TypePass', 'ConstFoldPass', 'DeadCodePass',
+                'PrintCoalescePass')
+
+    def __init__(self):
+        self.ifs = []
+
+    def leave_Assignment(self, node):
+        if node.op is None:
+            return
+        lvalue = node.lvalue
+        left = ast.Identifier(lvalue.name, loc=lvalue.loc)
+        left.slot = lvalue.slot
+        node.rvalue = ast.BinaryOp(node.op, left, node.rvalue,
+                                   ty=node.ty, loc=node.loc)
+        node.op = None
+
+    def _lower_if(self, node):
+        otherwise = node.otherwise
+        if not isinstance(otherwise, ast.Block):
+            return
+        stmts = otherwise.stmts
+        if not stmts:
+            node.otherwise = None
+        elif len(stmts) == 1 and isinstance(stmts[0], ast.If):
+            node.otherwise = stmts[0]
+
+    def enter_Function(self, node):
+        self.ifs = []
+
+    def leave_If(self, node):
+        self.ifs.append(node)
+
+    def leave_Function(self, node):
+        for node in self.ifs:
+            self._lower_if(node)
+        self.ifs = []
@@ -2,12 +2,12 @@ import dumbc.ast.ast as ast
 
 from dumbc.errors import DumbNameError
 from dumbc.errors import DumbTypeError
-from dumbc.transform.base_pass import Pass
+from dumbc.transform.base_pass import HookPass
 
 
-class MainFuncPass(Pass):
+class MainFuncPass(HookPass):
 
-    def visit_TranslationUnit(self, node):
+    def leave_TranslationUnit(self, node):
         for decl in node.decls:
             if not isinstance(decl, ast.Function): # pragma: nocover
                 continue
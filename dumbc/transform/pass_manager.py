@@ -0,0 +1,231 @@
+__all__ = ('PassManager',)
+
+import collections
+import operator
+import time
+
+import dumbc.ast.ast as ast
+
+from dumbc.transform.base_pass import HookPass
+
+
+# Fields of a node holding its children, in order of a walk; names
+# ending with '*' hold lists of nodes. Prototypes of functions are
+# not walked.
+_CHILD_FIELDS = {
+    'BinaryOp': ('left', 'right'),
+    'Assignment': ('lvalue', 'rvalue'),
+    'UnaryOp': ('value',),
+    'Cast': ('value',),
+    'FuncCall': ('args*',),
+    'If': ('cond', 'then', 'otherwise'),
+    'While': ('cond', 'body'),
+    'Block': ('stmts*',),
+    'Return': ('value',),
+    'Var': ('initial_value',),
+    'Expression': ('expr',),
+    'Function': ('body',),
+    'TranslationUnit': ('decls*',)
+}
+
+_EXPR_CLASSES = {cls.__name__ for cls in ast.Expr.__subclasses__()}
+
+# Fields which never hold expressions.
+_STMT_FIELDS = {'then', 'otherwise', 'body', 'stmts', 'decls'}
+
+# Kinds of children of a node.
+_NO_CHILDREN = 0
+_CHILD = 1
+_CHILDREN = 2
+_LIST = 3
+
+
+def _name(p):
+    return type(p).__name__
+
+
+def _schedule(passes):
+    # Order passes so that every pass runs after the passes it
+    # requires, otherwise keeping the given order.
+    pending = list(passes)
+    names = set(map(_name, passes))
+    done = set()
+    ordered = []
+    while pending:
+        for p in pending:
+            requires = getattr(p, 'requires', ())
+            if all(name in done or name not in names for name in requires):
+                break
+        else:
+            raise ValueError('cyclic pass requirements: %s' %
+                             ', '.join(map(_name, pending)))
+        pending.remove(p)
+        ordered.append(p)
+        done.add(_name(p))
+    return ordered
+
+
+def _add_time(timings, name, seconds):
+    timings[name] = timings.get(name, 0.0) + seconds
+
+
+def _timed(hook, timings, name):
+    perf_counter = time.perf_counter
+
+    def timed_hook(node):
+        start = perf_counter()
+        try:
+            hook(node)
+        finally:
+            _add_time(timings, name, perf_counter() - start)
+
+    return timed_hook
+
+
+class PassManager:
+    """Pass manager.
+
+    Runs passes in order of their requirements. Hook passes which
+    follow each other are fused into a single walk over the tree unless
+    a pass requires a pass of the walk whose results are complete only
+    after the whole tree is walked. Other passes(visitors) walk the
+    tree on their own.
+
+    Attributes:
+        passes (list): Passes in order they're run.
+
+    Examples:
+
+        >>> from dumbc.transform.call_graph_pass import CallGraphPass
+        >>> from dumbc.transform.const_fold_pass import ConstFoldPass
+        >>> from dumbc.transform.loop_pass import LoopPass
+        >>> from dumbc.transform.type_pass import TypePass
+        >>> manager = PassManager([LoopPass(), TypePass(), CallGraphPass(),
+        ...                        ConstFoldPass()])
+        >>> [type(p).__name__ for p in manager.passes]
+        ['CallGraphPass', 'TypePass', 'LoopPass', 'ConstFoldPass']
+        >>> [[type(p).__name__ for p in group] for group in manager.groups()]
+        [['CallGraphPass'], ['TypePass', 'LoopPass'], ['ConstFoldPass']]
+    """
+
+    def __init__(self, passes):
+        self.passes = _schedule(passes)
+
+    def groups(self):
+        """Split passes into groups run by a single walk."""
+        groups = []
+        for p in self.passes:
+            if (isinstance(p, HookPass) and groups and
+                    isinstance(groups[-1][0], HookPass) and
+                    not any(q.whole_tree and _name(q) in p.requires
+                            for q in groups[-1])):
+                groups[-1].append(p)
+            else:
+                groups.append([p])
+        return groups
+
+    def run(self, root, timings=None):
+        """Run passes on a tree.
+
+        Args:
+            root (Node): Root of the tree.
+            timings (dict, optional): If it's given, time spent by
+                each pass in seconds is added to it. Time spent by
+                a fused walk itself is added under the name 'walk'.
+        """
+        for group in self.groups():
+            if isinstance(group[0], HookPass):
+                self._walk(root, group, timings)
+            elif timings is None:
+                group[0].visit(root)
+            else:
+                start = time.perf_counter()
+                group[0].visit(root)
+                elapsed = time.perf_counter() - start
+                _add_time(timings, _name(group[0]), elapsed)
+
+    def _walk(self, root, passes, timings):
+        enter = collections.defaultdict(list)
+        leave = collections.defaultdict(list)
+        for p in passes:
+            for attr in dir(p):
+                if attr.startswith('enter_'):
+                    hooks = enter[attr[len('enter_'):]]
+                elif attr.startswith('leave_'):
+                    hooks = leave[attr[len('leave_'):]]
+                else:
+                    continue
+                hook = getattr(p, attr)
+                if timings is not None:
+                    hook = _timed(hook, timings, _name(p))
+                hooks.append(hook)
+
+        # Expressions are not walked if none of the passes has hooks
+        # for them.
+        walk_exprs = any(name in _EXPR_CLASSES
+                         for name in set(enter) | set(leave))
+        plans = {}
+
+        def make_plan(cls):
+            # Children of a node are got by a single getter: a child,
+            # a tuple of children in reverse order, or a list.
+            name = cls.__name__
+            fields = [field for field in reversed(_CHILD_FIELDS.get(name, ()))
+                      if walk_exprs or field.rstrip('*') in _STMT_FIELDS]
+            if not fields:
+                getter, kind = None, _NO_CHILDREN
+            elif fields[0][-1] == '*':
+                getter, kind = operator.attrgetter(fields[0][:-1]), _LIST
+            else:
+                getter = operator.attrgetter(*fields)
+                kind = _CHILD if len(fields) == 1 else _CHILDREN
+            plan = plans[cls] = (tuple(enter.get(name, ())),
+                                 tuple(leave.get(name, ())),
+                                 getter, kind)
+            return plan
+
+        if timings is not None:
+            hooks_time = sum(timings.get(_name(p), 0.0) for p in passes)
+            start = time.perf_counter()
+        # A node whose leave hooks are due is pushed on the stack as
+        # a tuple of the hooks and the node. Missing children(None)
+        # are pushed as well and skipped.
+        stack = [root]
+        push = stack.append
+        pop = stack.pop
+        extend = stack.extend
+        while stack:
+            node = pop()
+            if node is None:
+                continue
+            cls = type(node)
+            if cls is tuple:
+                leave_hooks, node = node
+                for hook in leave_hooks:
+                    hook(node)
+                continue
+            plan = plans.get(cls)
+            if plan is None:
+                plan = make_plan(cls)
+            enter_hooks, leave_hooks, getter, kind = plan
+            for hook in enter_hooks:
+                hook(node)
+            if kind == _NO_CHILDREN:
+                for hook in leave_hooks:
+                    hook(node)
+                continue
+            if leave_hooks:
+                push((leave_hooks, node))
+            # Children are pushed in reverse order, so they're popped
+            # in order.
+            if kind == _CHILD:
+                push(getter(node))
+            elif kind == _CHILDREN:
+                extend(getter(node))
+            else:
+                extend(reversed(getter(node)))
+
+        if timings is not None:
+            elapsed = time.perf_counter() - start
+            hooks_time -= sum(timings.get(_name(p), 0.0) for p in passes)
+            _add_time(timings, 'walk', elapsed + hooks_time)
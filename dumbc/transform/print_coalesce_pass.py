@@ -0,0 +1,153 @@
+import itertools
+
+import dumbc.ast.ast as ast
+
+from dumbc.transform.base_pass import HookPass
+
+
+def _is_pure(expr):
+    # Whether an expression has no side effects(calls or assignments)
+    # and can't trap, like an integer division by zero.
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (ast.FuncCall, ast.Assignment)):
+            return False
+        elif isinstance(node, ast.BinaryOp):
+            if (node.op in (ast.Operator.DIV, ast.Operator.MOD) and
+                    node.ty in ast.BuiltinTypes.INTEGERS):
+                return False
+            stack.append(node.left)
+            stack.append(node.right)
+        elif isinstance(node, (ast.UnaryOp, ast.Cast)):
+            stack.append(node.value)
+    return True
+
+
+def _common_length(a, b):
+    # Number of leading characters the sequences have in common.
+    pairs = itertools.takewhile(lambda pair: pair[0] == pair[1], zip(a, b))
+    return sum(1 for _ in pairs)
+
+
+def _make_print(template, text):
+    call = template.expr
+    new_call = ast.FuncCall(call.name,
+                            [ast.StringConstant(text, loc=call.args[0].loc)],
+                            loc=call.loc)
+    new_call.slot = call.slot
+    return ast.Expression(new_call, loc=template.loc)
+
+
+class PrintCoalescePass(HookPass):
+    """Print coalescing pass.
+
+    Adjacent calls of the builtin `print` with constant strings are
+    merged into a single call. Constant text printed at the end of
+    both branches of an if statement is printed after the statement
+    instead, and so is text printed at the beginning of both branches
+    before the statement if its condition has no side effects.
+
+    Blocks are rewritten on leaving a function, innermost first, so
+    dead stores between prints are removed by then.
+    """
+
+    requires = ('TypePass', 'DeadCodePass')
+
+    def __init__(self):
+        self.decls = []
+        self.blocks = []
+
+    def _text(self, stmt):
+        """Return a text printed by a statement.
+
+        Returns:
+            str: The text, or None if the statement isn't a call of
+                the builtin `print` with a constant string.
+        """
+        if not isinstance(stmt, ast.Expression):
+            return None
+        call = stmt.expr
+        if (not isinstance(call, ast.FuncCall) or call.slot is None or
+                len(call.args) != 1 or
+                not isinstance(call.args[0], ast.StringConstant)):
+            return None
+        proto = self.decls[call.slot].proto
+        if proto.name != 'print' or not any(attr.name == 'external'
+                                            for attr in proto.attrs or ()):
+            return None
+        text = call.args[0].value
+        # Text after a null character isn't printed.
+        return text if '\0' not in text else None
+
+    def _trim(self, block, index, text):
+        # Replace a print at an index of a block with a print of
+        # a shorter text.
+        if text:
+            block.stmts[index] = _make_print(block.stmts[index], text)
+        else:
+            del block.stmts[index]
+
+    def _hoist(self, node):
+        # Returns prints to be put before and after an if statement.
+        then, otherwise = node.then, node.otherwise
+        if (not isinstance(otherwise, ast.Block) or not then.stmts or
+                not otherwise.stmts):
+            return None, None
+        before = after = None
+        then_text = self._text(then.stmts[-1])
+        else_text = self._text(otherwise.stmts[-1])
+        if then_text is not None and else_text is not None:
+            size = _common_length(reversed(then_text), reversed(else_text))
+            if size:
+                after = _make_print(then.stmts[-1], then_text[-size:])
+                self._trim(then, len(then.stmts) - 1, then_text[:-size])
+                self._trim(otherwise, len(otherwise.stmts) - 1,
+                           else_text[:-size])
+        if not then.stmts or not otherwise.stmts or not _is_pure(node.cond):
+            return before, after
+        then_text = self._text(then.stmts[0])
+        else_text = self._text(otherwise.stmts[0])
+        if then_text is not None and else_text is not None:
+            prefix = then_text[:_common_length(then_text, else_text)]
+            if prefix:
+                before = _make_print(then.stmts[0], prefix)
+                self._trim(then, 0, then_text[len(prefix):])
+                self._trim(otherwise, 0, else_text[len(prefix):])
+        return before, after
+
+    def _append(self, stmts, stmt):
+        text = self._text(stmt)
+        if text is not None and stmts:
+            prev_text = self._text(stmts[-1])
+            if prev_text is not None:
+                stmts[-1] = _make_print(stmts[-1], prev_text + text)
+                return
+        stmts.append(stmt)
+
+    def enter_TranslationUnit(self, node):
+        self.decls = node.decls
+
+    def _coalesce(self, node):
+        stmts = []
+        for stmt in node.stmts:
+            before = after = None
+            if isinstance(stmt, ast.If):
+                before, after = self._hoist(stmt)
+            if before is not None:
+                self._append(stmts, before)
+            self._append(stmts, stmt)
+            if after is not None:
+                self._append(stmts, after)
+        node.stmts = stmts
+
+    def enter_Function(self, node):
+        self.blocks = []
+
+    def leave_Block(self, node):
+        self.blocks.append(node)
+
+    def leave_Function(self, node):
+        for block in self.blocks:
+            self._coalesce(block)
+        self.blocks = []
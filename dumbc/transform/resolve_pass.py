@@ -0,0 +1,73 @@
+import dumbc.ast.ast as ast
+
+from dumbc.transform.base_pass import HookPass
+
+
+class ResolvePass(HookPass):
+    """Name resolution pass.
+
+    Every argument and variable of a function gets a slot, a number
+    unique within the function, and every identifier gets the slot of
+    the declaration it refers to. A function call gets the index of
+    the called function in declarations of the translation unit. Later
+    passes index arrays with slots instead of looking names up in
+    scope chains. Declarations are marked if they're assigned.
+
+    Names which can't be resolved are left without a slot, so they
+    are reported by the type checking pass.
+    """
+
+    def __init__(self):
+        self.functions = {}
+        # Slots bound to each name, innermost last, and names declared
+        # in each open scope.
+        self.bindings = {}
+        self.scopes = []
+        self.decls = []
+
+    def _declare(self, node):
+        node.slot = len(self.decls)
+        node.assigned = False
+        self.decls.append(node)
+        self.bindings.setdefault(node.name, []).append(node.slot)
+        self.scopes[-1].append(node.name)
+
+    def enter_TranslationUnit(self, node):
+        self.functions = {}
+        for i, decl in enumerate(node.decls):
+            if isinstance(decl, ast.Function):
+                self.functions.setdefault(decl.proto.name, i)
+
+    def enter_Function(self, node):
+        self.bindings = {}
+        self.scopes = [[]]
+        self.decls = []
+        for arg in node.proto.args:
+            self._declare(arg)
+
+    def leave_Function(self, node):
+        node.num_slots = len(self.decls)
+
+    def enter_Block(self, node):
+        self.scopes.append([])
+
+    def leave_Block(self, node):
+        bindings = self.bindings
+        for name in self.scopes.pop():
+            bindings[name].pop()
+
+    def leave_Var(self, node):
+        # A variable is visible after its initial value.
+        self._declare(node)
+
+    def enter_Identifier(self, node):
+        slots = self.bindings.get(node.name)
+        node.slot = slots[-1] if slots else None
+
+    def leave_Assignment(self, node):
+        lvalue = node.lvalue
+        if type(lvalue) is ast.Identifier and lvalue.slot is not None:
+            self.decls[lvalue.slot].assigned = True
+
+    def enter_FuncCall(self, node):
+        node.slot = self.functions.get(node.name)
@@ -1,18 +1,43 @@
 __all__ = ('transform_ast',)
 
+from dumbc.transform.resolve_pass import ResolvePass
+from dumbc.transform.call_graph_pass import CallGraphPass
 from dumbc.transform.type_pass import TypePass
+from dumbc.transform.const_fold_pass import ConstFoldPass
 from dumbc.transform.loop_pass import LoopPass
 from dumbc.transform.dead_code_pass import DeadCodePass
+from dumbc.transform.print_coalesce_pass import PrintCoalescePass
 from dumbc.transform.attr_pass import AttrPass
 from dumbc.transform.main_func_pass import MainFuncPass
+from dumbc.transform.lower_pass import LowerPass
+from dumbc.transform.pass_manager import PassManager
 
 
-def transform_ast(ast):
-    passes = [TypePass(),
-              LoopPass(),
-              DeadCodePass(),
-              AttrPass(),
-              MainFuncPass()]
-    for _pass in passes:
-        _pass.visit(ast)
+def transform_ast(ast, timings=None, unused=None):
+    """Run semantic analysis passes on the AST.
+
+    Args:
+        ast (TranslationUnit): Root of the AST.
+        timings (dict, optional): If it's given, time spent by each
+            pass in seconds is added to it.
+        unused (list, optional): If it's given, functions removed
+            as unreachable from `main` are appended to it.
+
+    Returns:
+        TranslationUnit: Transformed AST.
+    """
+    call_graph = CallGraphPass()
+    passes = PassManager([ResolvePass(),
+                          call_graph,
+                          TypePass(),
+                          LoopPass(),
+                          ConstFoldPass(),
+                          DeadCodePass(),
+                          PrintCoalescePass(),
+                          AttrPass(),
+                          MainFuncPass(),
+                          LowerPass()])
+    passes.run(ast, timings)
+    if unused is not None:
+        unused.extend(call_graph.removed)
     return ast
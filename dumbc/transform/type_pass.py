@@ -7,7 +7,7 @@ from dumbc.errors import DumbNameError
 from dumbc.ast.ast import Type
 from dumbc.ast.ast import BuiltinTypes
 from dumbc.ast.ast import Operator
-from dumbc.transform.base_pass import Pass
+from dumbc.transform.base_pass import HookPass
 from dumbc.utils.symbol_table import SymbolTable
 
 
@@ -58,7 +58,7 @@ def _boolean_conversion(left_ty, right_ty):
     return None
 
 
-def _builtin_type_conversion(left_ty, right_ty):
+def _type_conversion(left_ty, right_ty):
     static_types = (BuiltinTypes.STR, BuiltinTypes.VOID)
     if left_ty in static_types or right_ty in static_types:
         return None
@@ -67,67 +67,201 @@ def _builtin_type_conversion(left_ty, right_ty):
     return _integral_conversion(left_ty, right_ty)
 
 
-def _builtin_type_promotion(from_ty, to_ty):
+def _type_promotion(from_ty, to_ty):
     numerical_types = BuiltinTypes.NUMERICAL
     if from_ty in numerical_types and to_ty in numerical_types:
         return _integral_promotion(from_ty, to_ty)
     return None
 
 
-def _validate_bitwise_binop(node, left_ty, right_ty):
+def _binop_check(op, left_ty, right_ty):
+    # Returns an error message format, or a node type, a result type
+    # and types the operands are promoted to.
+    result_ty = _type_conversion(left_ty, right_ty)
+    if result_ty is None:
+        return 'invalid operands to binary expression (%r and %r)'
     integer_types = BuiltinTypes.INTEGERS
-    if left_ty not in integer_types or right_ty not in integer_types:
-        msg = 'invalid operands to bitwise expression (%r and %r)' % (
-            left_ty.name, right_ty.name)
-        raise DumbTypeError(msg, loc=node.loc)
+    numerical_types = BuiltinTypes.NUMERICAL
+    if Operator.logical(op):
+        if (op not in (Operator.EQ, Operator.NE) and
+                (left_ty != BuiltinTypes.BOOL or
+                 right_ty != BuiltinTypes.BOOL)):
+            return 'invalid operand types to logical expression (%r and %r)'
+    elif Operator.bitwise(op):
+        if left_ty not in integer_types or right_ty not in integer_types:
+            return 'invalid operands to bitwise expression (%r and %r)'
+    elif Operator.shift(op):
+        if left_ty not in integer_types or right_ty not in integer_types:
+            return 'invalid operands to shift expression (%r and %r)'
+    elif left_ty not in numerical_types or right_ty not in numerical_types:
+        return 'invalid operands to arithmetic expression (%r and %r)'
+    return (result_ty,
+            BuiltinTypes.BOOL if Operator.relational(op) else result_ty,
+            _type_promotion(left_ty, result_ty),
+            _type_promotion(right_ty, result_ty))
+
+
+# Relations between builtin types are computed once. Types are
+# numbered, and a relation is kept in a flat table indexed by
+# `left_id * _NUM_TYPES + right_id`.
+_TYPE_IDS = {ty: i for i, ty in enumerate(BuiltinTypes.ALL)}
+_NUM_TYPES = len(BuiltinTypes.ALL)
+
+
+def _pair_table(func, *args):
+    return [func(*args, left_ty, right_ty)
+            for left_ty in BuiltinTypes.ALL
+            for right_ty in BuiltinTypes.ALL]
+
+
+def _pair_index(left_ty, right_ty):
+    left_id = _TYPE_IDS.get(left_ty)
+    right_id = _TYPE_IDS.get(right_ty)
+    if left_id is None or right_id is None:
+        return None
+    return left_id * _NUM_TYPES + right_id
 
 
-def _validate_shift_binop(node, left_ty, right_ty):
-    integer_types = BuiltinTypes.INTEGERS
-    if left_ty not in integer_types or right_ty not in integer_types:
-        msg = 'invalid operands to shift expression (%r and %r)' % (
-            left_ty.name, right_ty.name)
-        raise DumbTypeError(msg, loc=node.loc)
+_CONVERSIONS = _pair_table(_type_conversion)
+_PROMOTIONS = _pair_table(_type_promotion)
+_BINOP_CHECKS = {op: _pair_table(_binop_check, op)
+                 for op in Operator if Operator.binary(op)}
 
+_UNARYOP_CHECKS = {
+    Operator.LOGICAL_NOT: (frozenset((BuiltinTypes.BOOL,)),
+                           'invalid operand type %r'),
+    Operator.NOT: (BuiltinTypes.INTEGERS,
+                   'invalid operand type %r (integer type expected)'),
+    Operator.UNARY_PLUS: (BuiltinTypes.NUMERICAL,
+                          'invalid operand type %r (integral type expected)'),
+    Operator.UNARY_MINUS: (BuiltinTypes.NUMERICAL,
+                           'invalid operand type %r '
+                           '(integral type expected)')
+}
 
-def _validate_logical_binop(node, left_ty, right_ty):
-    if node.op in (Operator.EQ, Operator.NE):
-        return
-    if left_ty != BuiltinTypes.BOOL or right_ty != BuiltinTypes.BOOL:
-        msg = 'invalid operand types to logical expression (%r and %r)' % (
-            left_ty.name, right_ty.name)
-        raise DumbTypeError(msg, loc=node.loc)
 
-
-def _validate_arithmetic_binop(node, left_ty, right_ty):
-    numerical_types = BuiltinTypes.NUMERICAL
-    if left_ty not in numerical_types or right_ty not in numerical_types:
-        msg = 'invalid operands to arithmetic expression (%r and %r)' % (
-            left_ty.name, right_ty.name)
-        raise DumbTypeError(msg, loc=node.loc)
+def _builtin_type_conversion(left_ty, right_ty):
+    index = _pair_index(left_ty, right_ty)
+    return None if index is None else _CONVERSIONS[index]
 
 
-def _validate_assignment(node, left_ty, right_ty):
-    if not isinstance(node.lvalue, ast.Identifier):
-        msg = 'lvalue required as left operand of assignment'
-        raise DumbTypeError(msg, loc=node.loc)
+def _builtin_type_promotion(from_ty, to_ty):
+    index = _pair_index(from_ty, to_ty)
+    return None if index is None else _PROMOTIONS[index]
 
 
-def _validate_logical_not_unaryop(node, value_ty):
-    if value_ty != BuiltinTypes.BOOL:
-        msg = 'invalid operand type %r' % value_ty.name
-        raise DumbTypeError(msg, loc=node.loc)
+def _check_binop(node, left_ty, right_ty):
+    """Check operand types of a binary operator.
 
+    Returns:
+        tuple: Type of the operation, type of the result, and types
+            the left and the right operand are promoted to.
 
-def _validate_not_unaryop(node, value_ty):
-    if value_ty not in BuiltinTypes.INTEGERS:
-        msg = 'invalid operand type %r (integer type expected)' % value_ty.name
+    Raises:
+        DumbTypeError: The operator can't be applied to the types.
+    """
+    index = _pair_index(left_ty, right_ty)
+    if index is None:
+        check = 'invalid operands to binary expression (%r and %r)'
+    else:
+        check = _BINOP_CHECKS[node.op][index]
+    if type(check) is str:
+        msg = check % (left_ty.name, right_ty.name)
         raise DumbTypeError(msg, loc=node.loc)
+    return check
+
+
+def _int_range(ty):
+    kind, nbits = _parse_integral_type(ty)
+    if kind == 'u':
+        return 0, (1 << nbits) - 1
+    return -(1 << (nbits - 1)), (1 << (nbits - 1)) - 1
+
+
+# Integers up to the magnitude are represented by a float type exactly.
+_EXACT_FLOAT_INTS = {BuiltinTypes.F32: 1 << 24, BuiltinTypes.F64: 1 << 53}
+
+_SIGN_OPS = (Operator.UNARY_PLUS, Operator.UNARY_MINUS)
+_FLOAT_LITERAL_OPS = frozenset((Operator.ADD, Operator.SUB, Operator.MUL,
+                                Operator.DIV, Operator.MOD))
+
+
+def _float_literal_tree(node):
+    # Returns nodes of an arithmetic expression of untyped float
+    # literals, or None if it's another expression.
+    nodes = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        if isinstance(node, ast.FloatConstant):
+            if node.ty is not None:
+                return None
+        elif (isinstance(node, ast.BinaryOp) and
+                node.op in _FLOAT_LITERAL_OPS):
+            stack.append(node.left)
+            stack.append(node.right)
+        elif isinstance(node, ast.UnaryOp) and node.op in _SIGN_OPS:
+            stack.append(node.value)
+        else:
+            return None
+    return nodes
+
+
+def _contextual_literal(node, ty):
+    """Type an untyped literal by its context.
+
+    A literal without a suffix takes a type expected by its context(the
+    other operand, a type of a variable, etc) if the type represents
+    its value exactly. Arithmetic of float literals takes 'f64' as a
+    whole, so it isn't computed in 'f32'. Literals which take their
+    default type('i32' or 'f32') are left untyped.
+
+    Returns:
+        Expr: The expression with typed literals, or None if it isn't
+            a literal or the type doesn't fit it.
+    """
+    if ty == BuiltinTypes.F64:
+        nodes = _float_literal_tree(node)
+        if nodes is not None:
+            for n in nodes:
+                n.ty = ty
+            return node
+    literal = node
+    sign = 1
+    if isinstance(node, ast.UnaryOp) and node.op in _SIGN_OPS:
+        literal = node.value
+        sign = -1 if node.op == Operator.UNARY_MINUS else 1
+    if not isinstance(literal, ast.IntegerConstant) or literal.ty is not None:
+        return None
+    value = literal.value
+    if ty in BuiltinTypes.INTEGERS:
+        low, high = _int_range(ty)
+        if not low <= sign * value <= high:
+            return None
+        if literal is not node:
+            # The sign is folded into the constant, since the magnitude
+            # of the minimum of a signed type is out of its range.
+            literal = ast.IntegerConstant(sign * value, loc=node.loc)
+        if ty != BuiltinTypes.I32:
+            literal.ty = ty
+        return literal
+    elif ty in BuiltinTypes.FLOATS and abs(value) <= _EXACT_FLOAT_INTS[ty]:
+        typed = ast.FloatConstant(float(value),
+                                  ty=ty if ty != BuiltinTypes.F32 else None,
+                                  loc=literal.loc)
+    else:
+        return None
+    if literal is node:
+        return typed
+    node.value = typed
+    node.ty = ty
+    return node
 
 
-def _validate_arithmetic_unaryop(node, value_ty):
-    if value_ty not in BuiltinTypes.NUMERICAL:
-        msg = 'invalid operand type %r (integral type expected)' % value_ty.name
+def _validate_assignment(node, left_ty, right_ty):
+    if not isinstance(node.lvalue, ast.Identifier):
+        msg = 'lvalue required as left operand of assignment'
         raise DumbTypeError(msg, loc=node.loc)
 
 
@@ -137,101 +271,141 @@ def _validate_cast(node, src_ty, dst_ty):
         raise DumbTypeError(msg, loc=node.loc)
 
 
-class TypePass(Pass):
-    """Type checking semantic analysis pass."""
+class TypePass(HookPass):
+    """Type checking semantic analysis pass.
+
+    Names resolved by `ResolvePass` are looked up by their slots, other
+    names are looked up in scope chains.
+
+    Types of expressions are kept on a stack: a leave hook of an
+    expression pops types of its operands and pushes its own type.
+    """
+
+    requires = ('ResolvePass', 'CallGraphPass')
 
     def __init__(self):
         self.symbol_table = SymbolTable()
         self.func_table = SymbolTable()
-
-    def visit_BinaryOp(self, node):
-        op = node.op
-        left_ty = self.visit(node.left)
-        right_ty = self.visit(node.right)
-        result_ty = _builtin_type_conversion(left_ty, right_ty)
-        if result_ty is None:
-            msg = 'invalid operands to binary expression (%r and %r)' % (
-                left_ty.name, right_ty.name)
+        self.slot_types = {}
+        self.decls = []
+        self.types = []
+        self.curr_function = None
+
+    def visit(self, node):
+        """Run the pass alone on a tree.
+
+        Returns:
+            Type: Type of the tree if it's an expression, otherwise None.
+        """
+        self.types = []
+        super().visit(node)
+        return self.types.pop() if self.types else None
+
+    def _lookup_func(self, node):
+        if node.slot is not None:
+            return self.decls[node.slot]
+        return self.func_table.get(node.name)
+
+    def _check_cond(self, node):
+        cond_ty = self.types.pop()
+        if cond_ty != BuiltinTypes.BOOL:
+            msg = "condition expression must be of the type 'bool'"
             raise DumbTypeError(msg, loc=node.loc)
-        if Operator.logical(op):
-            _validate_logical_binop(node, left_ty, right_ty)
-        elif Operator.bitwise(op):
-            _validate_bitwise_binop(node, left_ty, right_ty)
-        elif Operator.shift(op):
-            _validate_shift_binop(node, left_ty, right_ty)
-        else:
-            _validate_arithmetic_binop(node, left_ty, right_ty)
+
+    def leave_BinaryOp(self, node):
+        right_ty = self.types.pop()
+        left_ty = self.types.pop()
+        if left_ty != right_ty:
+            # An untyped literal takes a type of the other operand if
+            # it would be converted to the type anyway, so operations
+            # aren't narrowed to a type of the other operand.
+            conversion_ty = _builtin_type_conversion(left_ty, right_ty)
+            left = None
+            if conversion_ty == right_ty:
+                left = _contextual_literal(node.left, right_ty)
+            if left is not None:
+                node.left = left
+                left_ty = right_ty
+            elif conversion_ty == left_ty:
+                right = _contextual_literal(node.right, left_ty)
+                if right is not None:
+                    node.right = right
+                    right_ty = left_ty
+        check = _check_binop(node, left_ty, right_ty)
+        node.ty, result_ty, left_promote_ty, right_promote_ty = check
         # Promote left and right operand to the common type.
-        node.ty = result_ty
-        left_promote_ty = _builtin_type_promotion(left_ty, result_ty)
-        right_promote_ty = _builtin_type_promotion(right_ty, result_ty)
         if left_promote_ty:
             node.left = ast.Cast(node.left, left_promote_ty, left_ty)
         if right_promote_ty:
             node.right = ast.Cast(node.right, right_promote_ty, right_ty)
-        if Operator.relational(op):
-            result_ty = BuiltinTypes.BOOL
-        return result_ty
+        self.types.append(result_ty)
 
-    def visit_Assignment(self, node):
-        lvalue_ty = self.visit(node.lvalue)
-        rvalue_ty = self.visit(node.rvalue)
+    def leave_Assignment(self, node):
+        rvalue_ty = self.types.pop()
+        lvalue_ty = self.types.pop()
         node.ty = lvalue_ty
+        self.types.append(lvalue_ty)
         _validate_assignment(node, lvalue_ty, rvalue_ty)
+        if lvalue_ty != rvalue_ty:
+            rvalue = _contextual_literal(node.rvalue, lvalue_ty)
+            if rvalue is not None:
+                node.rvalue = rvalue
+                rvalue_ty = lvalue_ty
         if node.op is not None:
-            expr = ast.BinaryOp(node.op, node.lvalue, node.rvalue,
-                                loc=node.loc)
-            self.visit(expr)
+            _check_binop(node, lvalue_ty, rvalue_ty)
         if lvalue_ty == rvalue_ty:
-            return lvalue_ty
+            return
         promote_to = _builtin_type_promotion(rvalue_ty, lvalue_ty)
         if not promote_to:
             msg = 'cannot implicitly cast %r to %r' % (
                 rvalue_ty.name, lvalue_ty.name)
             raise DumbTypeError(msg, loc=node.loc)
         node.rvalue = ast.Cast(node.rvalue, lvalue_ty, rvalue_ty)
-        return lvalue_ty
 
-    def visit_UnaryOp(self, node):
-        op = node.op
-        value_ty = self.visit(node.value)
+    def leave_UnaryOp(self, node):
+        value_ty = self.types[-1]
         node.ty = value_ty
-        if op == Operator.LOGICAL_NOT:
-            _validate_logical_not_unaryop(node, value_ty)
-        elif op == Operator.NOT:
-            _validate_not_unaryop(node, value_ty)
-        elif op in (Operator.UNARY_PLUS, Operator.UNARY_MINUS):
-            _validate_arithmetic_unaryop(node, value_ty)
+        check = _UNARYOP_CHECKS.get(node.op)
+        if check is not None and value_ty not in check[0]:
+            raise DumbTypeError(check[1] % value_ty.name, loc=node.loc)
 
-        return value_ty
-
-    def visit_Cast(self, node):
-        value_ty = self.visit(node.value)
+    def leave_Cast(self, node):
+        value_ty = self.types.pop()
         node.src_ty = value_ty
         _validate_cast(node, value_ty, node.dst_ty)
-        return node.dst_ty
+        self.types.append(node.dst_ty)
 
-    def visit_IntegerConstant(self, node):
-        return BuiltinTypes.I32
+    def leave_IntegerConstant(self, node):
+        if node.ty is None:
+            self.types.append(BuiltinTypes.I32)
+            return
+        low, high = _int_range(node.ty)
+        if not low <= node.value <= high:
+            msg = 'integer constant is out of range of %r' % node.ty.name
+            raise DumbTypeError(msg, loc=node.loc)
+        self.types.append(node.ty)
 
-    def visit_FloatConstant(self, node):
-        return BuiltinTypes.F32
+    def leave_FloatConstant(self, node):
+        self.types.append(node.ty or BuiltinTypes.F32)
 
-    def visit_BooleanConstant(self, node):
-        return BuiltinTypes.BOOL
+    def leave_BooleanConstant(self, node):
+        self.types.append(BuiltinTypes.BOOL)
 
-    def visit_StringConstant(self, node):
-        return BuiltinTypes.STR
+    def leave_StringConstant(self, node):
+        self.types.append(BuiltinTypes.STR)
 
-    def visit_Identifier(self, node):
+    def leave_Identifier(self, node):
+        if node.slot is not None:
+            self.types.append(self.slot_types[node.slot])
+            return
         ty = self.symbol_table.get(node.name)
         if ty is None:
             msg = 'name %r is not defined.' % node.name
             raise DumbNameError(msg, loc=node.loc)
-        return ty
+        self.types.append(ty)
 
-    def visit_FuncCall(self, node):
-        func = self.func_table.get(node.name)
+    def enter_FuncCall(self, node):
+        func = self._lookup_func(node)
         if not func:
             msg = 'name %r is not defined' % node.name
             raise DumbNameError(msg, loc=node.loc)
@@ -240,42 +414,48 @@ class TypePass(Pass):
             msg = '%s() takes %d arguments (%d given)' % (
                 proto.name, len(proto.args), len(node.args))
             raise DumbTypeError(msg, loc=node.loc)
-        for i, value in enumerate(node.args):
+
+    def leave_FuncCall(self, node):
+        proto = self._lookup_func(node).proto
+        num_args = len(node.args)
+        if num_args:
+            arg_types = self.types[-num_args:]
+            del self.types[-num_args:]
+        else:
+            arg_types = []
+        for i, value_ty in enumerate(arg_types):
             arg_ty = proto.args[i].ty
-            value_ty = self.visit(value)
             if arg_ty == value_ty:
                 continue
+            value = node.args[i]
+            literal = _contextual_literal(value, arg_ty)
+            if literal is not None:
+                node.args[i] = literal
+                continue
             promote_to = _builtin_type_promotion(value_ty, arg_ty)
             if not promote_to:
                 msg = 'cannot implicitly cast %r to %r' % (
                     value_ty.name, arg_ty.name)
                 raise DumbTypeError(msg, loc=node.loc)
             node.args[i] = ast.Cast(value, arg_ty, value_ty)
-        return proto.ret_ty
+        self.types.append(proto.ret_ty)
 
-    def visit_Block(self, node):
+    def enter_Block(self, node):
         self.symbol_table.push()
-        for stmt in node.stmts:
-            ty = self.visit(stmt)
+
+    def leave_Block(self, node):
         self.symbol_table.pop()
 
-    def visit_If(self, node):
-        cond_ty = self.visit(node.cond)
-        if cond_ty != BuiltinTypes.BOOL:
-            msg = "condition expression must be of the type 'bool'"
-            raise DumbTypeError(msg, loc=node.loc)
-        self.visit(node.then)
-        if node.otherwise is not None:
-            self.visit(node.otherwise)
+    def leave_If(self, node):
+        self._check_cond(node)
 
-    def visit_While(self, node):
-        cond_ty = self.visit(node.cond)
-        if cond_ty != BuiltinTypes.BOOL:
-            msg = "condition expression must be of the type 'bool'"
-            raise DumbTypeError(msg, loc=node.loc)
-        self.visit(node.body)
+    def leave_While(self, node):
+        self._check_cond(node)
+
+    def leave_Expression(self, node):
+        self.types.pop()
 
-    def visit_Return(self, node):
+    def enter_Return(self, node):
         proto = self.curr_function.proto
         if proto.ret_ty == BuiltinTypes.VOID and node.value is not None:
             msg = 'unexpected return value'
@@ -283,11 +463,18 @@ class TypePass(Pass):
         if proto.ret_ty != BuiltinTypes.VOID and node.value is None:
             msg = 'expected %r return value' % proto.ret_ty.name
             raise DumbTypeError(msg, loc=node.loc)
+
+    def leave_Return(self, node):
         if not node.value:
             return
-        value_ty = self.visit(node.value)
+        proto = self.curr_function.proto
+        value_ty = self.types.pop()
         if value_ty == proto.ret_ty:
             return
+        literal = _contextual_literal(node.value, proto.ret_ty)
+        if literal is not None:
+            node.value = literal
+            return
         promote_to = _builtin_type_promotion(value_ty, proto.ret_ty)
         if not promote_to:
             msg = 'cannot implicitly cast %r to %r' % (
@@ -295,12 +482,17 @@ class TypePass(Pass):
             raise DumbTypeError(msg, loc=node.loc)
         node.value = ast.Cast(node.value, proto.ret_ty, value_ty, loc=node.loc)
 
-    def visit_Var(self, node):
-        value_ty = self.visit(node.initial_value)
+    def leave_Var(self, node):
+        value_ty = self.types.pop()
         if not node.ty:
             node.ty = value_ty
         elif node.ty not in BuiltinTypes.VAR_TYPES:
             raise DumbTypeError('unknown type %r' % node.ty.name, loc=node.loc)
+        if node.ty != value_ty:
+            literal = _contextual_literal(node.initial_value, node.ty)
+            if literal is not None:
+                node.initial_value = literal
+                value_ty = node.ty
         if node.ty != value_ty:
             promote_to = _builtin_type_promotion(value_ty, node.ty)
             if promote_to:
@@ -311,9 +503,15 @@ class TypePass(Pass):
                 msg = 'cannot implicitly cast %r to %r' % (
                     value_ty.name, node.ty.name)
                 raise DumbTypeError(msg, loc=node.loc)
-        self.symbol_table.set(node.name, node.ty)
+        if node.slot is not None:
+            self.slot_types[node.slot] = node.ty
+        else:
+            self.symbol_table.set(node.name, node.ty)
 
-    def visit_Function(self, node):
+    def enter_Function(self, node):
+        # Slots are assigned by ResolvePass as it walks the function,
+        # so their number is known only after the walk.
+        self.slot_types = {}
         self.symbol_table.push()
         for arg in node.proto.args:
             if self.symbol_table.has(arg.name):
@@ -323,13 +521,16 @@ class TypePass(Pass):
                 msg = 'invalid argument type (%r)' % arg.ty.name
                 raise DumbTypeError(msg, loc=arg.loc)
             self.symbol_table.set(arg.name, arg.ty)
-        if node.body:
-            self.curr_function = node
-            self.visit(node.body)
-            self.curr_function = None
+            if arg.slot is not None:
+                self.slot_types[arg.slot] = arg.ty
+        self.curr_function = node
+
+    def leave_Function(self, node):
+        self.curr_function = None
         self.symbol_table.pop()
 
     def _populate_func_table(self, translation_unit):
+        self.decls = translation_unit.decls
         self.func_table.push()
         for decl in translation_unit.decls:
             if not isinstance(decl, ast.Function): # pragma: no cover
@@ -340,8 +541,8 @@ class TypePass(Pass):
                                     loc=decl.loc)
             self.func_table.set(proto.name, decl)
 
-    def visit_TranslationUnit(self, node):
+    def enter_TranslationUnit(self, node):
         self._populate_func_table(node)
-        for decl in node.decls:
-            self.visit(decl)
+
+    def leave_TranslationUnit(self, node):
         self.func_table.pop()
@@ -0,0 +1,187 @@
+import hashlib
+import os
+import tempfile
+
+
+def default_cache_dir():
+    """Get default location of dumbc caches.
+
+    It's `$DUMBC_CACHE_DIR` if the variable is set, otherwise
+    `$XDG_CACHE_HOME/dumbc` (or `~/.cache/dumbc`). Caching is
+    disabled by default if `$DUMBC_NO_CACHE` is set.
+
+    Returns:
+        str: Path to the cache directory, or None if caching is
+            disabled.
+    """
+    if os.environ.get('DUMBC_NO_CACHE'):
+        return None
+    path = os.environ.get('DUMBC_CACHE_DIR')
+    if path:
+        return path
+    cache_home = os.environ.get('XDG_CACHE_HOME')
+    if not cache_home:
+        cache_home = os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'dumbc')
+
+
+def make_key(*parts):
+    """Make a cache key by hashing given parts.
+
+    Examples:
+        >>> make_key('foo', 2) == make_key('foo', 2)
+        True
+        >>> make_key('foo', 2) == make_key('foo2')
+        False
+    """
+    h = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, bytes):
+            part = str(part).encode('utf-8')
+        h.update(str(len(part)).encode('ascii') + b':')
+        h.update(part)
+    return h.hexdigest()
+
+
+# Directories searched by the linker after ones given with `-L`.
+_SYSTEM_LIB_DIRS = ('/usr/local/lib', '/usr/local/lib64', '/usr/lib',
+                    '/usr/lib64', '/lib', '/lib64')
+
+
+def library_stamp(name, lib_paths=None):
+    """Identify the file of a library the linker would pick.
+
+    Args:
+        name (str): Name of the library, as given with `-l`.
+        lib_paths (list, optional): Library search paths.
+
+    Returns:
+        tuple: Path, size and modification time of the library, or None
+            if it isn't found.
+
+    Examples:
+        >>> import tempfile
+        >>> lib_dir = tempfile.mkdtemp()
+        >>> library_stamp('foo', [lib_dir]) is None
+        True
+        >>> with open(os.path.join(lib_dir, 'libfoo.so'), 'wb') as f:
+        ...     _ = f.write(b'\x7fELF')
+        >>> library_stamp('foo', [lib_dir])[1]
+        4
+    """
+    dirs = list(lib_paths or [])
+    library_path = os.environ.get('LIBRARY_PATH')
+    if library_path:
+        dirs.extend(library_path.split(os.pathsep))
+    dirs.extend(_SYSTEM_LIB_DIRS)
+    for directory in dirs:
+        for filename in ('lib%s.so' % name, 'lib%s.a' % name):
+            path = os.path.join(directory, filename)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            return os.path.realpath(path), st.st_size, st.st_mtime_ns
+    return None
+
+
+class ObjectCache:
+    """On-disk storage of compiled objects.
+
+    Entries are addressed by keys produced with `make_key`. If the total
+    size of entries exceeds `max_size`, least recently used entries are
+    evicted.
+
+    Attributes:
+        directory (str): Where cached objects are stored.
+        max_size (int, optional): Maximum size of the cache in bytes.
+
+    Examples:
+        >>> import tempfile
+        >>> cache = ObjectCache(tempfile.mkdtemp())
+        >>> key = make_key('func main(): i32 { return 0 }')
+        >>> cache.get(key) is None
+        True
+        >>> cache.put(key, b'\\x7fELF')
+        >>> cache.get(key)
+        b'\\x7fELF'
+    """
+
+    def __init__(self, directory, max_size=None):
+        self.directory = directory
+        self.max_size = max_size
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key[2:])
+
+    def get(self, key):
+        """Get cached data.
+
+        Returns:
+            bytes: Cached data, or None if there is no such entry.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            # Modification time is used to track recently used entries.
+            os.utime(path)
+        except OSError:
+            return None
+        return data
+
+    def put(self, key, data):
+        """Store data in the cache.
+
+        The entry is written to a temporary file first and then
+        renamed, so concurrent readers never see partial data.
+        """
+        path = self._path(key)
+        dirname = os.path.dirname(path)
+        os.makedirs(dirname, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=dirname)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        if self.max_size is not None:
+            self.evict(self.max_size)
+
+    def _entries(self):
+        for dirpath, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield st.st_mtime, st.st_size, path
+
+    def evict(self, max_size):
+        """Remove least recently used entries until the cache fits.
+
+        Args:
+            max_size (int): Maximum size of the cache in bytes.
+
+        Examples:
+            >>> import tempfile
+            >>> cache = ObjectCache(tempfile.mkdtemp())
+            >>> cache.put(make_key('foo'), b'foo')
+            >>> cache.put(make_key('bar'), b'bar')
+            >>> cache.evict(0)
+            >>> cache.get(make_key('foo')) is None
+            True
+        """
+        entries = sorted(self._entries())
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total_size <= max_size:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total_size -= size
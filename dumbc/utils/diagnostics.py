@@ -1,3 +1,6 @@
+from dumbc.ast import ast
+
+
 class Colors:
     RED = '\033[91;1m'
     MAGENTA = '\033[95;1m'
@@ -12,31 +15,44 @@ class DiagnosticsEngine:
 
     Attributes:
         filename (str): Filename of a file to be compiled.
-        lines (list): Lines of the file.
+        text (str): Text of the file.
     """
 
     def __init__(self, filename, text):
         self.filename = filename
-        self.lines = text.split('\n')
+        self.text = text
+        self._lines = None
+
+    def _line_index(self, loc):
+        if loc.lines is not None:
+            return loc.lines
+        if self._lines is None:
+            self._lines = ast.LineIndex.from_text(self.text)
+        return self._lines
 
     def _print_full(self, color, kind, message, loc, window=3):
+        lines = self._line_index(loc)
+        line, column = lines.resolve(loc.offset)
         msg = '{filename}:{line}:{col}:{color}{kind}{normal_color}: {message}'
         msg = msg.format(filename=self.filename,
-                         line=loc.line,
-                         col=loc.column,
+                         line=line,
+                         col=column,
                          color=color,
                          kind=kind,
                          normal_color=Colors.NORMAL,
                          message=message)
         print(msg + '\n')
         for i in range(-window, window):
-            curr_line = loc.line + i
-            if curr_line < 0 or curr_line > len(self.lines):
+            curr_line = line + i
+            if curr_line < 0 or curr_line > len(lines):
                 continue
-            print('\t' + self.lines[curr_line - 1])
+            # NOTE: line 0 wraps around to the last line.
+            if curr_line == 0:
+                curr_line = len(lines)
+            print('\t' + lines.line_text(self.text, curr_line))
             if i == 0:
                 print('\t{space}{color}^{tildas}{normal_color}'.format(
-                    space=' ' * (loc.column - 1),
+                    space=' ' * (column - 1),
                     color=color,
                     tildas='~' * (loc.extent - 1),
                     normal_color=Colors.NORMAL))
@@ -0,0 +1,95 @@
+__all__ = ('function_size',
+           'partition_functions',
+           'split_balanced')
+
+import dumbc.ast.ast as ast
+
+from dumbc.transform.pass_manager import _CHILD_FIELDS
+
+
+def function_size(func):
+    """Estimate cost of compiling a function by the number of its nodes.
+
+    Args:
+        func (Function): Function declaration.
+
+    Returns:
+        int: Number of nodes of the body, 0 if the function is external.
+    """
+    size = 0
+    stack = [func.body]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        size += 1
+        for field in _CHILD_FIELDS.get(type(node).__name__, ()):
+            if field[-1] == '*':
+                stack.extend(getattr(node, field[:-1]))
+            else:
+                stack.append(getattr(node, field))
+    return size
+
+
+def split_balanced(sizes, num_parts):
+    """Split items into contiguous groups of about equal total size.
+
+    Every group gets at least one item, so there are no more groups
+    than items.
+
+    Args:
+        sizes (list): Sizes of items.
+        num_parts (int): Maximum number of groups.
+
+    Returns:
+        list: Lists of indices of items in each group.
+
+    Examples:
+        >>> split_balanced([5, 1, 1, 1, 5, 1], 2)
+        [[0, 1, 2], [3, 4, 5]]
+        >>> split_balanced([9, 1, 1], 3)
+        [[0], [1], [2]]
+        >>> split_balanced([1, 1], 4)
+        [[0], [1]]
+        >>> split_balanced([], 2)
+        []
+    """
+    num_parts = min(num_parts, len(sizes))
+    total = sum(sizes)
+    parts = []
+    current = []
+    acc = 0
+    for i, size in enumerate(sizes):
+        current.append(i)
+        acc += size
+        parts_left = num_parts - len(parts) - 1
+        if parts_left <= 0:
+            continue
+        if (acc * num_parts >= total * (len(parts) + 1) or
+                len(sizes) - i - 1 == parts_left):
+            parts.append(current)
+            current = []
+    if current:
+        parts.append(current)
+    return parts
+
+
+def partition_functions(unit, num_parts):
+    """Split functions defined in a translation unit into partitions.
+
+    Partitions are contiguous runs of definitions of about equal size,
+    so objects compiled from them and linked in order keep symbols
+    in the order of the source file.
+
+    Args:
+        unit (TranslationUnit): Transformed translation unit.
+        num_parts (int): Maximum number of partitions.
+
+    Returns:
+        list: Lists of indices of declarations in each partition.
+    """
+    indices = [i for i, decl in enumerate(unit.decls)
+               if isinstance(decl, ast.Function) and decl.body is not None]
+    sizes = [function_size(unit.decls[i]) for i in indices]
+    return [[indices[j] for j in part]
+            for part in split_balanced(sizes, num_parts)]
@@ -1 +1,10 @@
+import pytest
 
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Keep builds of tests out of the user's cache."""
+    path = tmp_path / 'dumbc-cache'
+    monkeypatch.setenv('DUMBC_CACHE_DIR', str(path))
+    monkeypatch.delenv('DUMBC_NO_CACHE', raising=False)
+    return path
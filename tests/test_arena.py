@@ -0,0 +1,183 @@
+import math
+import pickle
+
+import pytest
+
+import dumbc.ast.ast as ast
+
+from dumbc.ast.arena import Arena
+from dumbc.ast.visitor import Visitor
+from dumbc.transform.dead_code_pass import DeadCodePass
+
+
+def make_function():
+    # func f(a: i32): i32 { var x = a + 1; return x; break }
+    body = ast.Block([
+        ast.Var('x', ast.BinaryOp(ast.Operator.ADD,
+                                  ast.Identifier('a'),
+                                  ast.IntegerConstant(1))),
+        ast.Return(ast.Identifier('x')),
+        ast.Break()
+    ])
+    args = [ast.Argument('a', ast.BuiltinTypes.I32)]
+    proto = ast.FunctionProto('f', args, ast.BuiltinTypes.I32)
+    return ast.Function(proto, body)
+
+
+def dump(node):
+    if isinstance(node, list):
+        return [dump(item) for item in node]
+    if not isinstance(node, ast.Node):
+        return node
+    attrs = {name: dump(value) for name, value in vars(node).items()}
+    return type(node).__name__, attrs
+
+
+def test_roundtrip():
+    func = make_function()
+    arena, root = Arena.from_tree(func)
+    assert dump(arena.to_tree(root)) == dump(func)
+
+
+def test_view_fields():
+    arena, root = Arena.from_tree(make_function())
+    func = arena.view(root)
+    assert type(func).__name__ == 'Function'
+    assert isinstance(func, ast.Function)
+    assert func.proto.name == 'f'
+    assert func.proto.ret_ty == ast.BuiltinTypes.I32
+    assert func.proto.attrs is None
+    var = func.body.stmts[0]
+    assert var.initial_value.op == ast.Operator.ADD
+    assert var.initial_value.right.value == 1
+    assert var.ty is None
+    assert func.body.stmts[0] is var
+
+
+def test_constants_keep_type():
+    block = ast.Block([ast.Expression(ast.IntegerConstant(1)),
+                       ast.Expression(ast.FloatConstant(1.0)),
+                       ast.Expression(ast.BooleanConstant(True))])
+    arena, root = Arena.from_tree(block)
+    values = [stmt.expr.value for stmt in arena.view(root).stmts]
+    assert [type(value) for value in values] == [int, float, bool]
+
+
+def test_constants_keep_sign_and_nan():
+    values = [0.0, -0.0, float('nan'), 0.0, -0.0]
+    block = ast.Block([ast.Expression(ast.FloatConstant(value))
+                       for value in values])
+    arena, root = Arena.from_tree(block)
+    stmts = arena.to_tree(root).stmts
+    results = [stmt.expr.value for stmt in stmts]
+    assert [math.copysign(1.0, value) for value in results] == \
+        [1.0, -1.0, 1.0, 1.0, -1.0]
+    assert math.isnan(results[2])
+    assert results[:2] == [0.0, 0.0]
+
+
+def test_visitor_dispatch():
+
+    class NameCollector(Visitor):
+
+        def __init__(self):
+            self.names = []
+
+        def visit_Block(self, node):
+            for stmt in node.stmts:
+                self.visit(stmt)
+
+        def visit_Var(self, node):
+            self.names.append(node.name)
+
+        def visit_Return(self, node):
+            self.names.append(node.value.name)
+
+        def visit_Break(self, node):
+            self.names.append('break')
+
+    arena, root = Arena.from_tree(make_function().body)
+    collector = NameCollector()
+    collector.visit(arena.view(root))
+    assert collector.names == ['x', 'x', 'break']
+
+
+def test_pass_modifies_arena():
+    arena, root = Arena.from_tree(make_function())
+    DeadCodePass().visit(arena.view(root))
+    stmts = arena.to_tree(root).body.stmts
+    assert [type(stmt) for stmt in stmts] == [ast.Var, ast.Return]
+
+
+def test_set_fields():
+    arena, root = Arena.from_tree(make_function())
+    var = arena.view(root).body.stmts[0]
+    binop = var.initial_value
+    var.ty = ast.BuiltinTypes.F32
+    binop.op = ast.Operator.SUB
+    binop.left = ast.Cast(binop.left, ast.BuiltinTypes.F32,
+                          ast.BuiltinTypes.I32)
+    binop.checked = True
+
+    tree = arena.to_tree(root).body.stmts[0]
+    assert tree.ty == ast.BuiltinTypes.F32
+    assert tree.initial_value.op == ast.Operator.SUB
+    assert tree.initial_value.checked
+    cast = tree.initial_value.left
+    assert isinstance(cast, ast.Cast)
+    assert cast.src_ty == ast.BuiltinTypes.I32
+    assert cast.value.name == 'a'
+
+
+def test_node_list():
+    arena, root = Arena.from_tree(make_function())
+    stmts = arena.view(root).body.stmts
+    stmts[2] = ast.Continue()
+    stmts.insert(0, ast.Expression(ast.IntegerConstant(7)))
+    del stmts[1]
+    assert len(stmts) == 3
+    kinds = [type(stmt).__name__ for stmt in stmts]
+    assert kinds == ['Expression', 'Return', 'Continue']
+
+
+def test_rewrites_reuse_records():
+    arena, root = Arena.from_tree(make_function())
+    view = arena.view(root)
+    binop = view.body.stmts[0].initial_value
+    stmts = view.body.stmts
+    size = len(arena.children)
+    for i in range(10):
+        # Records of the same length are overwritten in place.
+        binop.right = ast.IntegerConstant(i)
+        stmts[2] = ast.Continue()
+    assert len(arena.children) == size
+    assert arena.to_tree(root).body.stmts[0].initial_value.right.value == 9
+
+    stmts.insert(0, ast.Break())
+    grown = len(arena.children)
+    for i in range(10):
+        # Records of both lengths are taken from the free list.
+        del stmts[0]
+        stmts.insert(0, ast.Break())
+    assert len(arena.children) == grown
+    kinds = [type(stmt).__name__ for stmt in stmts]
+    assert kinds == ['Break', 'Var', 'Return', 'Continue']
+
+
+def test_node_list_index():
+    arena, root = Arena.from_tree(make_function())
+    stmts = arena.view(root).body.stmts
+    stmts[-1] = ast.Continue()
+    stmts[0] = stmts[1]
+    kinds = [type(stmt).__name__ for stmt in stmts]
+    assert kinds == ['Return', 'Return', 'Continue']
+    with pytest.raises(IndexError):
+        stmts[3] = ast.Break()
+
+
+def test_pickle():
+    arena, root = Arena.from_tree(make_function())
+    arena.view(root).body.stmts[0].initial_value.checked = True
+    copy = pickle.loads(pickle.dumps(arena))
+    assert dump(copy.to_tree(root)) == dump(arena.to_tree(root))
+    assert copy.view(root).body.stmts[0].initial_value.checked
@@ -61,3 +61,49 @@ def test_unknown_attr():
     ap = AttrPass()
     with pytest.raises(DumbNameError):
         ap.visit(foo_func)
+
+
+def test_const_attr():
+    attrs = [ast.Attribute('const')]
+    foo_func = ast.Function(
+        ast.FunctionProto('foo', [], ast.BuiltinTypes.I32, attrs),
+        ast.Block([
+            ast.Return(ast.IntegerConstant(1))
+        ]))
+    foo_func.pure = True
+    ap = AttrPass()
+    ap.visit(foo_func)
+
+
+def test_const_attr_no_body():
+    attrs = [ast.Attribute('const')]
+    foo_func = ast.Function(
+        ast.FunctionProto('foo', [], ast.BuiltinTypes.I32, attrs))
+    ap = AttrPass()
+    with pytest.raises(DumbTypeError):
+        ap.visit(foo_func)
+
+
+def test_const_attr_with_args():
+    attrs = [ast.Attribute('const', args=(ast.BooleanConstant(True),))]
+    foo_func = ast.Function(
+        ast.FunctionProto('foo', [], ast.BuiltinTypes.I32, attrs),
+        ast.Block([
+            ast.Return(ast.IntegerConstant(1))
+        ]))
+    ap = AttrPass()
+    with pytest.raises(DumbTypeError):
+        ap.visit(foo_func)
+
+
+def test_const_attr_impure():
+    attrs = [ast.Attribute('const')]
+    foo_func = ast.Function(
+        ast.FunctionProto('foo', [], ast.BuiltinTypes.I32, attrs),
+        ast.Block([
+            ast.Return(ast.IntegerConstant(1))
+        ]))
+    foo_func.pure = False
+    ap = AttrPass()
+    with pytest.raises(DumbTypeError):
+        ap.visit(foo_func)
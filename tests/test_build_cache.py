@@ -0,0 +1,75 @@
+import os
+import stat
+
+import pytest
+
+from dumbc.compiler import Compiler
+from dumbc.compiler import SourceFile
+from dumbc.utils.cache import default_cache_dir
+
+
+CODE = """
+func main(): i32 {
+    print("hello")
+    return 0
+}
+"""
+
+
+@pytest.fixture
+def linker(tmp_path, monkeypatch):
+    """Fake linker which counts its runs."""
+    log = tmp_path / 'links'
+    log.write_text('')
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    script = bin_dir / 'clang'
+    script.write_text('#!/bin/sh\n'
+                      'echo link >> %s\n'
+                      'while [ $# -gt 0 ]; do\n'
+                      '    [ "$1" = -o ] && echo exe > "$2"\n'
+                      '    shift\n'
+                      'done\n' % log)
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv('PATH', '%s%s%s' % (bin_dir, os.pathsep,
+                                           os.environ.get('PATH', '')))
+    return lambda: len(log.read_text().split())
+
+
+def build(tmp_path, lib_dir):
+    compiler = Compiler(SourceFile('prog.dumb', CODE),
+                        output=str(tmp_path / 'prog'),
+                        stdlib=str(lib_dir),
+                        cache_dir=str(tmp_path / 'cache'))
+    compiler.run()
+    with open(str(tmp_path / 'prog')) as f:
+        assert f.read() == 'exe\n'
+
+
+def test_executable_is_cached(tmp_path, linker):
+    lib_dir = tmp_path / 'lib'
+    lib_dir.mkdir()
+    lib = lib_dir / 'libstddumb.so'
+    lib.write_bytes(b'v1')
+
+    build(tmp_path, lib_dir)
+    build(tmp_path, lib_dir)
+    assert linker() == 1
+
+    # The executable is linked again with a rebuilt library.
+    lib.write_bytes(b'v2.0')
+    build(tmp_path, lib_dir)
+    assert linker() == 2
+
+
+def test_executable_isnt_cached_without_library(tmp_path, linker):
+    lib_dir = tmp_path / 'missing'
+    build(tmp_path, lib_dir)
+    build(tmp_path, lib_dir)
+    assert linker() == 2
+
+
+def test_default_cache_dir(cache_dir, monkeypatch):
+    assert default_cache_dir() == str(cache_dir)
+    monkeypatch.setenv('DUMBC_NO_CACHE', '1')
+    assert default_cache_dir() is None
@@ -0,0 +1,114 @@
+import pytest
+
+from unittest import mock
+
+from dumbc import tokenize
+from dumbc import Parser
+from dumbc import DumbTypeError
+from dumbc.stdlib.injector import inject_stdlib
+from dumbc.transform.call_graph_pass import CallGraphPass
+from dumbc.transform.pass_manager import PassManager
+from dumbc.transform.resolve_pass import ResolvePass
+from dumbc.transform.transform import transform_ast
+from dumbc.utils.diagnostics import DiagnosticsEngine
+
+
+def parse(code):
+    diag = mock.Mock(spec=DiagnosticsEngine)
+    root = Parser(tokenize(code), diag).parse_translation_unit()
+    inject_stdlib(root)
+    return root
+
+
+def names(decls):
+    return [decl.proto.name for decl in decls]
+
+
+CODE = """
+    func unused(): i32 { return used() }
+    func used(): i32 { return 1 }
+    func rec(n: i32): i32 { return rec(n - 1) }
+    func main(): i32 {
+        print('hi')
+        return used() + later()
+    }
+    func later(): i32 { return used() }
+"""
+
+
+def test_remove_unreachable():
+    root = parse(CODE)
+    call_graph = CallGraphPass()
+    PassManager([ResolvePass(), call_graph]).run(root)
+    assert names(root.decls) == ['print', 'used', 'main', 'later']
+    assert names(call_graph.removed) == ['unused', 'rec']
+    # Calls refer to the remaining declarations.
+    main = root.decls[2]
+    call = main.body.stmts[1].value
+    assert root.decls[call.left.slot].proto.name == 'used'
+    assert root.decls[call.right.slot].proto.name == 'later'
+
+
+def test_unused_builtin():
+    root = parse('func main(): i32 { return 0 }')
+    unused = []
+    transform_ast(root, unused=unused)
+    assert names(root.decls) == ['main']
+    assert names(unused) == ['print']
+
+
+def test_unused_not_type_checked():
+    root = parse("""
+        func broken(): i32 { return true }
+        func main(): i32 { return 0 }
+    """)
+    transform_ast(root)
+    assert names(root.decls) == ['main']
+
+
+def test_keep_external_with_body():
+    root = parse("""
+        #[external]
+        func helper(): i32 { return used() }
+        func used(): i32 { return 1 }
+        func unused(): i32 { return 2 }
+        func main(): i32 { return 0 }
+    """)
+    PassManager([ResolvePass(), CallGraphPass()]).run(root)
+    assert names(root.decls) == ['helper', 'used', 'main']
+    # The attribute is only allowed on prototypes.
+    with pytest.raises(DumbTypeError):
+        transform_ast(root)
+
+
+def test_no_main():
+    root = parse(CODE.replace('main', 'start'))
+    decls = list(root.decls)
+    CallGraphPass().visit(root)
+    assert root.decls == decls
+
+
+def test_pure():
+    root = parse(CODE)
+    PassManager([ResolvePass(), CallGraphPass()]).run(root)
+    purity = {decl.proto.name: decl.pure for decl in root.decls}
+    assert purity == {'print': False,
+                      'used': True,
+                      'main': False,
+                      'later': True}
+
+
+def test_pure_transitive():
+    root = parse("""
+        func log(x: i32): i32 { print('x') return x }
+        func f(x: i32): i32 { return g(x) }
+        func g(x: i32): i32 { return log(x) }
+        func h(x: i32): i32 { return h(x) }
+    """)
+    PassManager([ResolvePass(), CallGraphPass()]).run(root)
+    purity = {decl.proto.name: decl.pure for decl in root.decls}
+    assert purity == {'print': False,
+                      'log': False,
+                      'f': False,
+                      'g': False,
+                      'h': True}
@@ -0,0 +1,200 @@
+from unittest import mock
+
+import pytest
+
+from dumbc import tokenize
+from dumbc import Parser
+from dumbc.codegen import Codegen
+from dumbc.stdlib.injector import inject_stdlib
+from dumbc.transform import transform_ast
+from dumbc.utils.diagnostics import DiagnosticsEngine
+
+
+def generate(code, use_ssa=False):
+    diag = mock.Mock(spec=DiagnosticsEngine)
+    root = Parser(tokenize(code), diag).parse_translation_unit()
+    inject_stdlib(root)
+    transform_ast(root)
+    return Codegen(module_name='test', use_ssa=use_ssa).generate(root)
+
+
+def function(module, name):
+    func = module.get_global(name)
+    assert func.blocks
+    return func
+
+
+def instructions(func):
+    for block in func.blocks:
+        for instr in block.instructions:
+            yield block, instr
+
+
+def lifetime_markers(func, intrinsic):
+    """Return names of slots passed to lifetime intrinsics in order."""
+    # Markers take pointers to slots cast to i8*.
+    casts = {instr: instr.operands[0]
+             for _, instr in instructions(func) if instr.opname == 'bitcast'}
+    names = []
+    for block, instr in instructions(func):
+        if instr.opname == 'call' and \
+                instr.callee.name.startswith(intrinsic):
+            names.append((block.name, casts[instr.args[1]].name))
+    return names
+
+
+NESTED_SCOPES = """
+    func f(n: i32): i32 {
+        var s = 0
+        while n > 0 {
+            var t = n * 2
+            if t > 3 {
+                var u = t + 1
+                s += u
+            }
+            n -= 1
+        }
+        return s
+    }
+    func g(n: i32) {
+        var a = n
+        if a > 1 {
+            var b = a * 2
+            var c = b + 1
+            a = c
+        }
+        if a > 100 {
+            print("big")
+        }
+    }
+    func main(): i32 {
+        g(2)
+        return f(3)
+    }
+"""
+
+
+def test_allocas_in_entry_block():
+    module = generate(NESTED_SCOPES)
+    for name in ('f', 'g'):
+        func = function(module, name)
+        entry = func.blocks[0]
+        *allocas, branch = entry.instructions
+        assert all(instr.opname == 'alloca' for instr in allocas)
+        assert branch.opname == 'br'
+        for block, instr in instructions(func):
+            assert instr.opname != 'alloca' or block is entry
+
+
+def test_allocas_of_arguments_and_variables():
+    func = function(generate(NESTED_SCOPES), 'f')
+    names = [instr.name for instr in func.blocks[0].instructions[:-1]]
+    assert names == ['n', 's', 't', 'u']
+
+
+def test_lifetime_markers_wrap_scopes():
+    func = function(generate(NESTED_SCOPES), 'f')
+    starts = lifetime_markers(func, 'llvm.lifetime.start')
+    ends = lifetime_markers(func, 'llvm.lifetime.end')
+    # Arguments live as long as the function.
+    assert starts == [('body', 's'), ('while.body', 't'), ('if.then', 'u')]
+    # Scope of `s` is left by return, where no marker is needed.
+    assert ends == [('if.then', 'u'), ('if.exit', 't')]
+
+
+def test_lifetime_ends_in_reverse_order():
+    func = function(generate(NESTED_SCOPES), 'g')
+    assert lifetime_markers(func, 'llvm.lifetime.start') == [
+        ('body', 'a'), ('if.then', 'b'), ('if.then', 'c')]
+    assert lifetime_markers(func, 'llvm.lifetime.end') == [
+        ('if.then', 'c'), ('if.then', 'b'), ('if.exit.1', 'a')]
+
+
+def test_lifetime_marker_position():
+    func = function(generate(NESTED_SCOPES), 'f')
+    block = [b for b in func.blocks if b.name == 'if.then'][0]
+    ops = [instr.opname for instr in block.instructions]
+    # The slot is live from its initialization until the block ends.
+    start = ops.index('call')
+    assert ops[start + 1] == 'store'
+    end = len(ops) - 1 - ops[::-1].index('call')
+    assert ops[end + 1:] == ['br']
+    assert 'load' not in ops[end:]
+
+
+def test_no_slots_with_ssa():
+    module = generate(NESTED_SCOPES, use_ssa=True)
+    func = function(module, 'f')
+    opnames = {instr.opname for _, instr in instructions(func)}
+    assert 'alloca' not in opnames
+    assert not lifetime_markers(func, 'llvm.lifetime')
+
+
+LOGICAL_OPERATORS = """
+    func side(x: i32): bool {
+        print("side")
+        return x > 0
+    }
+    func and_cheap(a: i32, b: i32): bool { return a > 0 && b < 3 }
+    func or_cheap(a: i32, b: i32): bool { return a > 0 || b < 3 }
+    func and_call(a: i32, b: i32): bool { return a > 0 && side(b) }
+    func or_call(a: i32, b: i32): bool { return a > 0 || side(b) }
+    func or_div(a: i32, b: i32): bool { return a == 0 || 10 / a > b }
+    func main(): i32 {
+        var r = and_cheap(1, 2) && or_cheap(0, 1)
+        r = r && and_call(1, 2) && or_call(0, 1) && or_div(0, 1)
+        if r {
+            return 1
+        }
+        return 0
+    }
+"""
+
+
+def opnames(func):
+    return [instr.opname for _, instr in instructions(func)]
+
+
+@pytest.mark.parametrize('name,index,value', [
+    ('and_cheap', 2, 'i1 0'),
+    ('or_cheap', 1, 'i1 1'),
+])
+def test_cheap_operand_is_selected(name, index, value):
+    func = function(generate(LOGICAL_OPERATORS), name)
+    ops = opnames(func)
+    assert 'phi' not in ops
+    assert ops.count('br') == 1
+    select, = [instr for _, instr in instructions(func)
+               if instr.opname == 'select']
+    # The left operand selects either the right one or the constant.
+    assert str(select.operands[index]) == value
+
+
+def test_operand_with_side_effects_keeps_branch():
+    module = generate(LOGICAL_OPERATORS)
+    for name, prefix, skipped in (('and_call', 'and', 0),
+                                  ('or_call', 'or', 1)):
+        func = function(module, name)
+        assert 'select' not in opnames(func)
+        blocks = {block.name: block for block in func.blocks}
+        rhs = blocks[prefix + '.rhs']
+        exit = blocks[prefix + '.exit']
+        # The call is made only on the branch evaluating the operand.
+        calls = [block.name for block, instr in instructions(func)
+                 if instr.opname == 'call']
+        assert calls == [rhs.name]
+        phi = exit.instructions[0]
+        assert phi.opname == 'phi'
+        incomings = {block.name: str(value) for value, block in phi.incomings}
+        assert incomings['body'] == 'i1 %d' % skipped
+        assert rhs.name in incomings
+
+
+def test_trapping_operand_keeps_branch():
+    func = function(generate(LOGICAL_OPERATORS), 'or_div')
+    ops = opnames(func)
+    assert 'select' not in ops
+    assert 'phi' in ops
+    sdiv, = [block.name for block, instr in instructions(func)
+             if instr.opname == 'sdiv']
+    assert sdiv == 'or.rhs'
@@ -0,0 +1,461 @@
+import math
+import random
+import struct
+
+import pytest
+
+from unittest import mock
+
+import dumbc.ast.ast as ast
+
+from llvmlite import binding as llvm
+
+from dumbc import tokenize
+from dumbc import Parser
+from dumbc import BuiltinTypes
+from dumbc import Operator
+from dumbc.stdlib.injector import inject_stdlib
+from dumbc.transform.call_graph_pass import CallGraphPass
+from dumbc.transform.const_fold_pass import ConstFoldPass
+from dumbc.transform.pass_manager import PassManager
+from dumbc.transform.resolve_pass import ResolvePass
+from dumbc.transform.type_pass import TypePass
+from dumbc.utils.diagnostics import DiagnosticsEngine
+
+
+def const(value, ty):
+    if ty == BuiltinTypes.BOOL:
+        return ast.BooleanConstant(value)
+    if ty in BuiltinTypes.FLOATS:
+        return ast.FloatConstant(value, ty=ty)
+    return ast.IntegerConstant(value, ty=ty)
+
+
+def fold(node):
+    return ConstFoldPass().visit(node)
+
+
+def folded_value(node):
+    if isinstance(node, (ast.IntegerConstant,
+                         ast.FloatConstant,
+                         ast.BooleanConstant)):
+        return node.value
+    return None
+
+
+def test_fold_binop():
+    node = ast.BinaryOp(Operator.MUL,
+                        const(6, BuiltinTypes.I32),
+                        ast.BinaryOp(Operator.ADD,
+                                     const(3, BuiltinTypes.I32),
+                                     const(4, BuiltinTypes.I32),
+                                     ty=BuiltinTypes.I32),
+                        ty=BuiltinTypes.I32)
+    result = fold(node)
+    assert isinstance(result, ast.IntegerConstant)
+    assert result.value == 42
+
+
+def test_fold_overflow():
+    node = ast.BinaryOp(Operator.ADD,
+                        const(127, BuiltinTypes.I8),
+                        const(1, BuiltinTypes.I8),
+                        ty=BuiltinTypes.I8)
+    assert folded_value(fold(node)) == -128
+
+
+@pytest.mark.parametrize('op,right', [
+    (Operator.DIV, 0),
+    (Operator.MOD, 0),
+    (Operator.SHL, 32),
+    (Operator.SHR, -1),
+])
+def test_no_fold_undefined(op, right):
+    node = ast.BinaryOp(op,
+                        const(1, BuiltinTypes.I32),
+                        const(right, BuiltinTypes.I32),
+                        ty=BuiltinTypes.I32)
+    assert fold(node) is node
+
+
+def test_fold_cast():
+    node = ast.Cast(ast.FloatConstant(3.14), BuiltinTypes.I32,
+                    BuiltinTypes.F32)
+    result = fold(node)
+    assert isinstance(result, ast.IntegerConstant)
+    assert result.value == 3
+    assert result.ty == BuiltinTypes.I32
+
+
+@pytest.mark.parametrize('op,left,expected', [
+    (Operator.LOGICAL_AND, False, False),
+    (Operator.LOGICAL_AND, True, None),
+    (Operator.LOGICAL_OR, True, True),
+    (Operator.LOGICAL_OR, False, None),
+])
+def test_fold_short_circuit(op, left, expected):
+    right = ast.FuncCall('foo', [])
+    node = ast.BinaryOp(op, ast.BooleanConstant(left), right,
+                        ty=BuiltinTypes.BOOL)
+    result = fold(node)
+    if expected is None:
+        assert result is right
+    else:
+        assert folded_value(result) is expected
+
+
+def make_function(stmts):
+    proto = ast.FunctionProto('main', [], BuiltinTypes.I32)
+    return ast.TranslationUnit([ast.Function(proto, ast.Block(stmts))])
+
+
+def run_passes(root):
+    PassManager([ResolvePass(), TypePass(), ConstFoldPass()]).run(root)
+    return root.decls[0].body.stmts
+
+
+def test_propagation():
+    stmts = run_passes(make_function([
+        ast.Var('width', ast.IntegerConstant(100)),
+        ast.Var('x', ast.IntegerConstant(1)),
+        ast.Expression(ast.Assignment(ast.Identifier('x'),
+                                      ast.IntegerConstant(2))),
+        ast.Return(ast.BinaryOp(Operator.DIV,
+                                ast.Identifier('x'),
+                                ast.Identifier('width')))
+    ]))
+    # 'width' is replaced with its value, 'x' is assigned.
+    assert [type(stmt) for stmt in stmts] == [ast.Var,
+                                              ast.Expression,
+                                              ast.Return]
+    assert stmts[0].name == 'x'
+    value = stmts[2].value
+    assert isinstance(value.left, ast.Identifier)
+    assert folded_value(value.right) == 100
+
+
+def test_propagation_with_cast():
+    stmts = run_passes(make_function([
+        ast.Var('scale', ast.IntegerConstant(2), BuiltinTypes.F64),
+        ast.Return(ast.Cast(ast.BinaryOp(Operator.MUL,
+                                         ast.Identifier('scale'),
+                                         ast.FloatConstant(1.5)),
+                            BuiltinTypes.I32))
+    ]))
+    assert len(stmts) == 1
+    result = stmts[0].value
+    assert isinstance(result, ast.IntegerConstant)
+    assert result.ty == BuiltinTypes.I32
+    assert result.value == 3
+
+
+# Differential testing against the LLVM constant folder.
+
+LLVM_TYPES = {
+    BuiltinTypes.I8: 'i8',
+    BuiltinTypes.U8: 'i8',
+    BuiltinTypes.I32: 'i32',
+    BuiltinTypes.U32: 'i32',
+    BuiltinTypes.I64: 'i64',
+    BuiltinTypes.U64: 'i64',
+    BuiltinTypes.F32: 'float',
+    BuiltinTypes.F64: 'double',
+    BuiltinTypes.BOOL: 'i1'
+}
+
+NBITS = {ty: int(ty.name[1:]) for ty in BuiltinTypes.NUMERICAL}
+
+COMMON_INT_OPS = {
+    Operator.ADD: 'add',
+    Operator.SUB: 'sub',
+    Operator.MUL: 'mul',
+    Operator.AND: 'and',
+    Operator.OR: 'or',
+    Operator.XOR: 'xor',
+    Operator.SHL: 'shl',
+    Operator.EQ: 'icmp eq',
+    Operator.NE: 'icmp ne'
+}
+
+SIGNED_OPS = dict(COMMON_INT_OPS)
+SIGNED_OPS.update({
+    Operator.DIV: 'sdiv',
+    Operator.MOD: 'srem',
+    Operator.SHR: 'ashr',
+    Operator.LT: 'icmp slt',
+    Operator.LE: 'icmp sle',
+    Operator.GT: 'icmp sgt',
+    Operator.GE: 'icmp sge'
+})
+
+UNSIGNED_OPS = dict(COMMON_INT_OPS)
+UNSIGNED_OPS.update({
+    Operator.DIV: 'udiv',
+    Operator.MOD: 'urem',
+    Operator.SHR: 'lshr',
+    Operator.LT: 'icmp ult',
+    Operator.LE: 'icmp ule',
+    Operator.GT: 'icmp ugt',
+    Operator.GE: 'icmp uge'
+})
+
+FLOAT_OPS = {
+    Operator.ADD: 'fadd',
+    Operator.SUB: 'fsub',
+    Operator.MUL: 'fmul',
+    Operator.DIV: 'fdiv',
+    Operator.MOD: 'frem',
+    Operator.LT: 'fcmp olt',
+    Operator.LE: 'fcmp ole',
+    Operator.GT: 'fcmp ogt',
+    Operator.GE: 'fcmp oge',
+    Operator.EQ: 'fcmp oeq',
+    Operator.NE: 'fcmp one'
+}
+
+
+def llvm_value(value, ty):
+    if ty in BuiltinTypes.FLOATS:
+        bits = struct.unpack('<Q', struct.pack('<d', value))[0]
+        return '0x%016X' % bits
+    if ty == BuiltinTypes.BOOL:
+        return 'true' if value else 'false'
+    return str(value)
+
+
+def llvm_fold(expr, ty):
+    """Let LLVM fold a constant expression of a type."""
+    mod = llvm.parse_assembly('@r = global %s %s' % (LLVM_TYPES[ty], expr))
+    text = str(mod.get_global_variable('r')).split(' global ')[1]
+    value = text.split(' ', 1)[1]
+    if value in ('poison', 'undef'):
+        return None
+    if ty == BuiltinTypes.BOOL:
+        return value == 'true'
+    if ty in BuiltinTypes.FLOATS:
+        if value.startswith('0x'):
+            bits = int(value[2:], 16)
+            return struct.unpack('<d', struct.pack('<Q', bits))[0]
+        return float(value)
+    value = int(value)
+    if ty in BuiltinTypes.UNSIGNED_INTS:
+        value &= (1 << NBITS[ty]) - 1
+    return value
+
+
+def random_value(rnd, ty):
+    if ty == BuiltinTypes.BOOL:
+        return rnd.random() < 0.5
+    if ty in BuiltinTypes.FLOATS:
+        value = rnd.choice([0.0, -0.0, 1.0, -2.5, 0.1, 3.0, 1e30, 3.4e38,
+                            1e300, math.inf, -math.inf, math.nan,
+                            rnd.uniform(-1e3, 1e3)])
+        if ty == BuiltinTypes.F32:
+            try:
+                value = struct.unpack('f', struct.pack('f', value))[0]
+            except OverflowError:
+                value = math.inf
+        return value
+    nbits = NBITS[ty]
+    if ty in BuiltinTypes.SIGNED_INTS:
+        low, high = -(1 << (nbits - 1)), (1 << (nbits - 1)) - 1
+    else:
+        low, high = 0, (1 << nbits) - 1
+    return rnd.choice([0, 1, 2, 3, nbits - 1, nbits, low, high,
+                       max(low, -1), rnd.randint(low, high)])
+
+
+def llvm_operand(value, ty):
+    return '%s %s' % (LLVM_TYPES[ty], llvm_value(value, ty))
+
+
+def check(node, expected_ty, expr):
+    result = fold(node)
+    if result is node:
+        return
+    expected = llvm_fold(expr, expected_ty)
+    assert expected is not None, expr
+    value = folded_value(result)
+    if isinstance(expected, float) and math.isnan(expected):
+        assert math.isnan(value), expr
+    else:
+        assert value == expected, expr
+        assert math.copysign(1, value) == math.copysign(1, expected), expr
+
+
+NUMERIC_TYPES = [BuiltinTypes.I8, BuiltinTypes.U8, BuiltinTypes.I32,
+                 BuiltinTypes.U32, BuiltinTypes.I64, BuiltinTypes.U64,
+                 BuiltinTypes.F32, BuiltinTypes.F64]
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_binop_matches_llvm(seed):
+    llvm.initialize()
+    rnd = random.Random(seed)
+    for _ in range(50):
+        ty = rnd.choice(NUMERIC_TYPES)
+        if ty in BuiltinTypes.FLOATS:
+            ops = FLOAT_OPS
+        elif ty in BuiltinTypes.SIGNED_INTS:
+            ops = SIGNED_OPS
+        else:
+            ops = UNSIGNED_OPS
+        op = rnd.choice(sorted(ops, key=lambda op: op.value))
+        left, right = random_value(rnd, ty), random_value(rnd, ty)
+        node = ast.BinaryOp(op, const(left, ty), const(right, ty), ty=ty)
+        result_ty = BuiltinTypes.BOOL if Operator.relational(op) else ty
+        expr = '%s (%s, %s)' % (ops[op], llvm_operand(left, ty),
+                                llvm_operand(right, ty))
+        check(node, result_ty, expr)
+
+
+def cast_instruction(src_ty, dst_ty):
+    integers = BuiltinTypes.INTEGERS
+    if src_ty in integers and dst_ty in integers:
+        if NBITS[src_ty] > NBITS[dst_ty]:
+            return 'trunc'
+        if NBITS[src_ty] == NBITS[dst_ty]:
+            return 'bitcast'
+        if src_ty in BuiltinTypes.SIGNED_INTS:
+            return 'sext'
+        return 'zext'
+    if src_ty in integers:
+        return 'sitofp' if src_ty in BuiltinTypes.SIGNED_INTS else 'uitofp'
+    if dst_ty in integers:
+        return 'fptosi' if dst_ty in BuiltinTypes.SIGNED_INTS else 'fptoui'
+    if NBITS[src_ty] > NBITS[dst_ty]:
+        return 'fptrunc'
+    if NBITS[src_ty] == NBITS[dst_ty]:
+        return 'bitcast'
+    return 'fpext'
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_cast_matches_llvm(seed):
+    llvm.initialize()
+    rnd = random.Random(seed)
+    for _ in range(50):
+        src_ty = rnd.choice(NUMERIC_TYPES)
+        dst_ty = rnd.choice(NUMERIC_TYPES)
+        value = random_value(rnd, src_ty)
+        if src_ty in BuiltinTypes.FLOATS and rnd.random() < 0.5:
+            value = float(int(rnd.uniform(-300, 300)))
+        node = ast.Cast(const(value, src_ty), dst_ty, src_ty)
+        expr = '%s (%s to %s)' % (cast_instruction(src_ty, dst_ty),
+                                  llvm_operand(value, src_ty),
+                                  LLVM_TYPES[dst_ty])
+        check(node, dst_ty, expr)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_unaryop_matches_llvm(seed):
+    llvm.initialize()
+    rnd = random.Random(seed)
+    for _ in range(50):
+        ty = rnd.choice(NUMERIC_TYPES + [BuiltinTypes.BOOL])
+        value = random_value(rnd, ty)
+        if ty == BuiltinTypes.BOOL:
+            op = Operator.LOGICAL_NOT
+            expr = 'xor (i1 %s, i1 true)' % llvm_value(value, ty)
+        elif ty in BuiltinTypes.FLOATS:
+            op = Operator.UNARY_MINUS
+            expr = 'fsub (%s, %s)' % (llvm_operand(0.0, ty),
+                                      llvm_operand(value, ty))
+        else:
+            op = rnd.choice([Operator.NOT, Operator.UNARY_MINUS])
+            instr = 'xor' if op == Operator.NOT else 'sub'
+            if op == Operator.NOT:
+                operands = (llvm_operand(value, ty), llvm_operand(-1, ty))
+            else:
+                operands = (llvm_operand(0, ty), llvm_operand(value, ty))
+            expr = '%s (%s, %s)' % ((instr,) + operands)
+        node = ast.UnaryOp(op, const(value, ty), ty=ty)
+        check(node, ty, expr)
+
+
+def evaluate(code):
+    diag = mock.Mock(spec=DiagnosticsEngine)
+    root = Parser(tokenize(code), diag).parse_translation_unit()
+    inject_stdlib(root)
+    PassManager([ResolvePass(),
+                 CallGraphPass(),
+                 TypePass(),
+                 ConstFoldPass()]).run(root)
+    return {decl.proto.name: decl.body.stmts for decl in root.decls
+            if decl.body is not None}
+
+
+def returned(stmts):
+    return stmts[-1].value
+
+
+def test_call_evaluation():
+    funcs = evaluate("""
+        func fib(n: i32): i32 {
+            if n < 2 {
+                return n
+            }
+            return fib(n - 1) + fib(n - 2)
+        }
+        func main(): i32 { return fib(30) }
+    """)
+    result = returned(funcs['main'])
+    assert isinstance(result, ast.IntegerConstant)
+    assert result.value == 832040
+    assert result.ty == BuiltinTypes.I32
+
+
+def test_call_evaluation_loops():
+    funcs = evaluate("""
+        func odd_sum(n: i32): i8 {
+            var s: i8 = 0
+            var i = 0
+            while true {
+                i += 1
+                if i > n {
+                    break
+                }
+                if i % 2 == 0 {
+                    continue
+                }
+                s += 100
+            }
+            return s
+        }
+        func third(x: f32): f32 { return x / 3 }
+        func a(): i8 { return odd_sum(5) }
+        func b(): f32 { return third(1) }
+    """)
+    a, b = returned(funcs['a']), returned(funcs['b'])
+    # 300 wraps around in 'i8'.
+    assert folded_value(a) == 44
+    assert a.ty == BuiltinTypes.I8
+    assert folded_value(b) == struct.unpack('f', struct.pack('f', 1 / 3))[0]
+    assert b.ty == BuiltinTypes.F32
+
+
+@pytest.mark.parametrize('body', [
+    "print('x') return x",
+    'return x / 0',
+    'while true {} return x',
+    'return f(x + 1)',
+    'var s = \'a\' return x'
+])
+def test_call_not_evaluated(body):
+    funcs = evaluate("""
+        func f(x: i32): i32 { %s }
+        func main(): i32 { return f(1) }
+    """ % body)
+    assert isinstance(returned(funcs['main']), ast.FuncCall)
+
+
+def test_call_with_variable_not_evaluated():
+    funcs = evaluate("""
+        func f(x: i32): i32 { return x }
+        func main(): i32 {
+            var y = 1
+            y = 2
+            return f(y)
+        }
+    """)
+    assert isinstance(returned(funcs['main']), ast.FuncCall)
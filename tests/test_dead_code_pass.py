@@ -1,8 +1,22 @@
 import pytest
 
+from unittest import mock
+
 import dumbc.ast.ast as ast
 
+from dumbc import tokenize
+from dumbc import Parser
+from dumbc import DumbSyntaxError
+from dumbc import DumbTypeError
+from dumbc.stdlib.injector import inject_stdlib
+from dumbc.transform.const_fold_pass import ConstFoldPass
 from dumbc.transform.dead_code_pass import DeadCodePass
+from dumbc.transform.loop_pass import LoopPass
+from dumbc.transform.pass_manager import PassManager
+from dumbc.transform.resolve_pass import ResolvePass
+from dumbc.transform.transform import transform_ast
+from dumbc.transform.type_pass import TypePass
+from dumbc.utils.diagnostics import DiagnosticsEngine
 
 
 def assert_tree(tree, expected):
@@ -77,3 +91,140 @@ def test_dce(with_dead_code, without_dead_code):
     dcp.visit(root)
 
     assert_tree(root.stmts, without_dead_code)
+
+
+def eliminate(code):
+    diag = mock.Mock(spec=DiagnosticsEngine)
+    root = Parser(tokenize(code), diag).parse_translation_unit()
+    PassManager([ResolvePass(),
+                 TypePass(),
+                 ConstFoldPass(),
+                 LoopPass(),
+                 DeadCodePass()]).run(root)
+    return {decl.proto.name: decl.body.stmts for decl in root.decls}
+
+
+def transform(code):
+    diag = mock.Mock(spec=DiagnosticsEngine)
+    root = Parser(tokenize(code), diag).parse_translation_unit()
+    inject_stdlib(root)
+    return transform_ast(root)
+
+
+def kinds(stmts):
+    return [type(stmt).__name__ for stmt in stmts]
+
+
+def test_unreachable_after_if():
+    funcs = eliminate("""
+        func f(x: i32): i32 {
+            if x < 0 {
+                return 1
+            } else {
+                return 2
+            }
+            x = 3
+            return x
+        }
+    """)
+    assert kinds(funcs['f']) == ['If']
+
+
+def test_constant_conditions():
+    funcs = eliminate("""
+        func g(): i32 { return 1 }
+        func f() {
+            if false {
+                g()
+            } else if 1 < 2 {
+                g()
+            }
+            if false {
+                g()
+            }
+            while false {
+                g()
+            }
+        }
+    """)
+    stmts = funcs['f']
+    assert kinds(stmts) == ['Block']
+    assert kinds(stmts[0].stmts) == ['Expression']
+
+
+def test_infinite_loop():
+    funcs = eliminate("""
+        func f(): i32 {
+            while true {
+                return 1
+            }
+            return 2
+        }
+        func g(): i32 {
+            while true {
+                break
+            }
+            return 2
+        }
+    """)
+    assert kinds(funcs['f']) == ['While']
+    assert kinds(funcs['g']) == ['While', 'Return']
+
+
+def test_dead_stores():
+    funcs = eliminate("""
+        func g(): i32 { return 1 }
+        func f(x: i32): i32 {
+            var a = x * 2
+            var b = g()
+            var c = 1
+            a = 5
+            c += g()
+            x = 4
+            return x
+        }
+    """)
+    stmts = funcs['f']
+    assert kinds(stmts) == ['Expression', 'Expression', 'Expression',
+                            'Return']
+    assert isinstance(stmts[0].expr, ast.FuncCall)
+    assert isinstance(stmts[1].expr, ast.FuncCall)
+    assert isinstance(stmts[2].expr, ast.Assignment)
+
+
+@pytest.mark.parametrize('body', [
+    'if x < 0 { return 1 }',
+    'while x < 0 { return 1 }',
+    'while true { if x < 0 { break } return 1 }',
+])
+def test_missing_return(body):
+    with pytest.raises(DumbTypeError):
+        eliminate('func f(x: i32): i32 { %s }' % body)
+
+
+def test_reads_in_dead_code():
+    funcs = eliminate("""
+        func g(y: i32): i32 { return y }
+        func f(x: i32): i32 {
+            var a = x * 2
+            if x > 0 {
+                return 1
+                g(a)
+            }
+            return x
+            a = g(a)
+        }
+    """)
+    stmts = funcs['f']
+    assert kinds(stmts) == ['If', 'Return']
+    assert kinds(stmts[0].then.stmts) == ['Return']
+
+
+@pytest.mark.parametrize('body', [
+    'if false { break }',
+    'if false { continue }',
+    'return 1 break',
+])
+def test_dead_code_is_checked(body):
+    with pytest.raises(DumbSyntaxError):
+        transform('func main(): i32 { %s return 0 }' % body)
@@ -0,0 +1,32 @@
+from unittest import mock
+
+from dumbc import tokenize
+from dumbc import Parser
+from dumbc.stdlib.injector import inject_stdlib
+from dumbc.transform import transform_ast
+from dumbc.utils.diagnostics import DiagnosticsEngine
+
+
+CODE = """
+func main(): i32 {
+    print("hello")
+    return 0
+}
+"""
+
+
+def transform(code):
+    diag = mock.Mock(spec=DiagnosticsEngine)
+    root = Parser(tokenize(code), diag).parse_translation_unit()
+    inject_stdlib(root)
+    transform_ast(root)
+    return root
+
+
+def test_units_dont_share_prototypes():
+    first = transform(CODE)
+    second = transform(CODE)
+    first_print, second_print = first.decls[0], second.decls[0]
+    assert first_print.proto.name == second_print.proto.name == 'print'
+    assert first_print.proto is not second_print.proto
+    assert first_print.proto.args[0] is not second_print.proto.args[0]
@@ -0,0 +1,86 @@
+import ctypes
+
+import pytest
+
+from llvmlite import binding as llvm
+from llvmlite import ir
+
+from dumbc.codegen.utils import iter_ir_chunks
+from dumbc.codegen.utils import link_ir_chunks
+
+
+I8 = ir.IntType(8)
+I32 = ir.IntType(32)
+
+
+def make_module(num_funcs):
+    """Make a module where each function calls the previous one and
+    reads a shared string constant."""
+    module = ir.Module(name='chunks')
+    text = bytearray(b'\x05\x00')
+    value = ir.Constant(ir.ArrayType(I8, len(text)), text)
+    const = ir.GlobalVariable(module, value.type, name='str')
+    const.global_constant = True
+    const.initializer = value
+    const.linkage = 'internal'
+    ir.Function(module, ir.FunctionType(ir.VoidType(), []), name='unused')
+    prev = None
+    for i in range(num_funcs):
+        func = ir.Function(module, ir.FunctionType(I32, []),
+                           name='f%d' % i)
+        builder = ir.IRBuilder(func.append_basic_block('entry'))
+        ptr = builder.bitcast(const, I8.as_pointer())
+        result = builder.zext(builder.load(ptr), I32)
+        if prev is not None:
+            result = builder.add(result, builder.call(prev, []))
+        builder.ret(result)
+        prev = func
+    main = ir.Function(module, ir.FunctionType(I32, []), name='main')
+    builder = ir.IRBuilder(main.append_basic_block('entry'))
+    builder.ret(builder.call(prev, []))
+    return module
+
+
+def run_main(mod):
+    llvm.initialize()
+    llvm.initialize_native_target()
+    llvm.initialize_native_asmprinter()
+    # An engine owns its target machine.
+    machine = llvm.Target.from_default_triple().create_target_machine()
+    engine = llvm.create_mcjit_compiler(mod, machine)
+    engine.finalize_object()
+    main = ctypes.CFUNCTYPE(ctypes.c_int32)(
+        engine.get_function_address('main'))
+    return main()
+
+
+@pytest.mark.parametrize('chunk_size', [1, 300, 1 << 20])
+def test_chunks_are_self_contained(chunk_size):
+    module = make_module(10)
+    chunks = list(iter_ir_chunks(module, chunk_size))
+    if chunk_size == 1:
+        assert len(chunks) == 11
+    elif chunk_size == 1 << 20:
+        assert len(chunks) == 1
+    for text in chunks:
+        llvm.parse_assembly(text).verify()
+        # Only used declarations are written.
+        assert '@"unused"' not in text
+
+
+@pytest.mark.parametrize('chunk_size', [1, 300, 1 << 20])
+def test_linked_module(chunk_size):
+    module = make_module(10)
+    mod = link_ir_chunks(iter_ir_chunks(module, chunk_size), verify=True)
+    names = [func.name for func in mod.functions if not func.is_declaration]
+    assert names == ['f%d' % i for i in range(10)] + ['main']
+    assert run_main(mod) == 50
+
+
+def test_module_without_definitions():
+    module = ir.Module(name='empty')
+    ir.Function(module, ir.FunctionType(ir.VoidType(), []), name='f')
+    chunks = list(iter_ir_chunks(module))
+    assert len(chunks) == 1
+    mod = link_ir_chunks(chunks, verify=True)
+    assert list(mod.functions) == []
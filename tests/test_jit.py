@@ -0,0 +1,54 @@
+from dumbc.compiler import Compiler
+from dumbc.compiler import SourceFile
+
+
+CODE = """
+func main(): i32 {
+    var x = 40
+    print("héllo, wörld ✓\\n")
+    return x + 2
+}
+"""
+
+
+def execute(code, **kwargs):
+    return Compiler(SourceFile('prog.dumb', code), **kwargs).execute()
+
+
+def count_builds(monkeypatch):
+    builds = []
+    build_ast = Compiler._build_ast
+
+    def counting_build_ast(self):
+        builds.append(self)
+        return build_ast(self)
+
+    monkeypatch.setattr(Compiler, '_build_ast', counting_build_ast)
+    return builds
+
+
+def test_run(capfd):
+    assert execute(CODE) == 42
+    assert capfd.readouterr().out == 'héllo, wörld ✓\n'
+
+
+def test_run_optimized(capfd):
+    assert execute(CODE, opt_level='2') == 42
+    assert capfd.readouterr().out == 'héllo, wörld ✓\n'
+
+
+def test_cache(tmp_path, capfd, monkeypatch):
+    builds = count_builds(monkeypatch)
+    cache_dir = str(tmp_path)
+
+    assert execute(CODE, cache_dir=cache_dir) == 42
+    assert len(builds) == 1
+    # Compiled code is found without running the front-end.
+    assert execute(CODE, cache_dir=cache_dir) == 42
+    assert len(builds) == 1
+    assert capfd.readouterr().out == 'héllo, wörld ✓\n' * 2
+
+    # A different source or optimization level is a cache miss.
+    assert execute(CODE.replace('40', '50'), cache_dir=cache_dir) == 52
+    assert execute(CODE, cache_dir=cache_dir, opt_level='2') == 42
+    assert len(builds) == 3
@@ -1,10 +1,12 @@
 import itertools
 import os
+import random
+import re
 import pytest
 
 from dumbc import tokenize
 from dumbc import DumbValueError
-from dumbc.parser.lexer import KEYWORDS
+from dumbc.parser.lexer import KEYWORDS, PUNCTUATORS
 
 
 dirname = os.path.abspath(os.path.dirname(__file__))
@@ -28,7 +30,7 @@ def get_loc_list(code):
     tokens = tokenize(code)
     t1, t2 = itertools.tee(tokens, 2)
     loc = extract_field(t1, 'loc')
-    return list(loc)
+    return [(l.line, l.column, l.extent) for l in loc]
 
 
 @pytest.mark.parametrize('bad_input', [
@@ -52,6 +54,14 @@ def test_invalid_input(bad_input):
     ('123.3E-123', ['FLOAT']),
     ('123.3e123',  ['FLOAT']),
     ('123.3e-123', ['FLOAT']),
+    ('1u64',       ['INTEGER']),
+    ('1i8',        ['INTEGER']),
+    ('1f64',       ['INTEGER']),
+    ('1.5f32',     ['FLOAT']),
+    ('.5e3f64',    ['FLOAT']),
+    ('1u16',       ['INTEGER', 'IDENT']),
+    ('1u8x',       ['INTEGER', 'IDENT']),
+    ('1.5u8',      ['FLOAT', 'IDENT']),
 ])
 def test_integral(text, tokens):
     assert get_kind_list(text) == tokens
@@ -207,3 +217,68 @@ def tokenized_sample(request):
 def test_tokenize_sample(tokenized_sample):
     code, tokens = tokenized_sample
     assert get_kind_list(code) == tokens
+
+
+# The regex alternation scanner the lexer is checked against.
+REFERENCE_TOKENS = (
+    ('FLOAT', r'\d*\.\d+([eE][-+]?\d+)?(f(32|64)(?!\w))?'),
+    ('INTEGER', r'\d+(([iu](8|32|64)|f(32|64))(?!\w))?'),
+    ('BOOL', r'true|false'),
+    ('STR', r'"([^"\\]*(\\.[^"\\]*)*)"|\'([^\'\\]*(\\.[^\'\\]*)*)\''),
+    ('IDENT', r'[a-zA-Z_][a-zA-Z_0-9]*'),
+) + tuple((kind, re.escape(literal)) for kind, literal in PUNCTUATORS) + (
+    ('COMMENT', r'#.*'),
+    ('NEWLINE', r'\n'),
+    ('WS', r'[ \t]+')
+)
+
+
+def reference_tokenize(text):
+    regex = '|'.join('(?P<%s>%s)' % token for token in REFERENCE_TOKENS)
+    line = 1
+    line_pos = -1
+    pos = 0
+    for m in iter(re.compile(regex).scanner(text).match, None):
+        kind = m.lastgroup
+        if kind == 'NEWLINE':
+            line_pos = pos
+            line += 1
+        elif kind != 'WS' and kind != 'COMMENT':
+            value = m.group()
+            if kind == 'IDENT' and value in KEYWORDS:
+                kind = value.upper()
+            yield (kind, value, (line, pos - line_pos, len(value)))
+        pos = m.end()
+    if pos != len(text):
+        yield ('ERROR', None, (line, pos - line_pos))
+
+
+def tokenize_or_error(text):
+    try:
+        for token in tokenize(text):
+            if token.kind != 'EOF':
+                loc = token.loc
+                yield (token.kind, token.value,
+                       (loc.line, loc.column, loc.extent))
+    except DumbValueError as e:
+        line, column = str(e).rsplit(' ', 1)[1].split(':')
+        yield ('ERROR', None, (int(line), int(column)))
+
+
+FRAGMENTS = [literal for _, literal in PUNCTUATORS] + list(KEYWORDS) + [
+    'true', 'false', 'trueish', 'x', '_a1', '0', '42', '1.5', '.5', '1e3',
+    '2.5e-3', '2.5e', '"s"', '"a\\"b"', "'c'", '#', '# note',
+    ' ', '\t', '\n', '\u0663', 'e', 'E', '-', 'u8', 'i64', 'f32', 'f6', 'u'
+]
+
+BAD_FRAGMENTS = ['.', '$', '@', '\\', '"open', '\u00e9']
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_matches_reference(seed):
+    rnd = random.Random(seed)
+    pieces = [rnd.choice(FRAGMENTS) for _ in range(rnd.randint(1, 60))]
+    if rnd.random() < 0.5:
+        pieces.insert(rnd.randrange(len(pieces)), rnd.choice(BAD_FRAGMENTS))
+    text = ''.join(pieces)
+    assert list(tokenize_or_error(text)) == list(reference_tokenize(text))
@@ -0,0 +1,60 @@
+import dumbc.ast.ast as ast
+
+from dumbc import BuiltinTypes
+from dumbc import Operator
+from dumbc.transform.lower_pass import LowerPass
+from dumbc.transform.pass_manager import PassManager
+from dumbc.transform.resolve_pass import ResolvePass
+from dumbc.transform.type_pass import TypePass
+
+
+def lower(stmts, args=()):
+    proto = ast.FunctionProto('f', list(args), BuiltinTypes.VOID)
+    root = ast.TranslationUnit([ast.Function(proto, ast.Block(stmts))])
+    PassManager([ResolvePass(), TypePass(), LowerPass()]).run(root)
+    return root.decls[0].body.stmts
+
+
+def test_augmented_assignment():
+    stmts = lower([
+        ast.Var('x', ast.IntegerConstant(1), BuiltinTypes.I8),
+        ast.Expression(ast.Assignment(ast.Identifier('x'),
+                                      ast.IntegerConstant(2),
+                                      op=Operator.SHL))
+    ])
+    assignment = stmts[1].expr
+    assert assignment.op is None
+    rvalue = assignment.rvalue
+    assert isinstance(rvalue, ast.BinaryOp)
+    assert rvalue.op == Operator.SHL
+    assert rvalue.ty == BuiltinTypes.I8
+    assert isinstance(rvalue.left, ast.Identifier)
+    assert rvalue.left is not assignment.lvalue
+    assert rvalue.left.slot == assignment.lvalue.slot == stmts[0].slot
+
+
+def test_augmented_assignment_with_cast():
+    stmts = lower([
+        ast.Var('x', ast.FloatConstant(1.0), BuiltinTypes.F64),
+        ast.Var('y', ast.FloatConstant(2.0), BuiltinTypes.F32),
+        ast.Expression(ast.Assignment(ast.Identifier('x'),
+                                      ast.Identifier('y'),
+                                      op=Operator.MUL))
+    ])
+    rvalue = stmts[2].expr.rvalue
+    assert rvalue.ty == BuiltinTypes.F64
+    assert isinstance(rvalue.right, ast.Cast)
+    assert rvalue.right.dst_ty == BuiltinTypes.F64
+
+
+def test_else_if_chain():
+    cond = ast.BooleanConstant(True)
+    inner = ast.If(cond, ast.Block([]))
+    stmts = lower([
+        ast.If(cond, ast.Block([]), ast.Block([inner])),
+        ast.If(cond, ast.Block([]), ast.Block([])),
+        ast.If(cond, ast.Block([]), ast.Block([inner, ast.Return()]))
+    ])
+    assert stmts[0].otherwise is inner
+    assert stmts[1].otherwise is None
+    assert isinstance(stmts[2].otherwise, ast.Block)
@@ -0,0 +1,357 @@
+import ctypes
+
+from unittest import mock
+
+import pytest
+
+from llvmlite import binding as llvm
+
+from dumbc import tokenize
+from dumbc import Parser
+from dumbc.mir import build_module
+from dumbc.mir import optimize_module
+from dumbc.mir.analysis import dominance_frontiers
+from dumbc.mir.analysis import dominates
+from dumbc.mir.analysis import dominators
+from dumbc.mir.analysis import find_loops
+from dumbc.mir.analysis import reverse_postorder
+from dumbc.mir.dce import remove_dead_instrs
+from dumbc.mir.dce import simplify_cfg
+from dumbc.mir.emit import emit_module
+from dumbc.mir.gvn import number_values
+from dumbc.mir.licm import hoist_invariants
+from dumbc.mir.sccp import propagate_constants
+from dumbc.stdlib.injector import inject_stdlib
+from dumbc.transform import transform_ast
+from dumbc.utils.diagnostics import DiagnosticsEngine
+
+
+def build(code):
+    diag = mock.Mock(spec=DiagnosticsEngine)
+    root = Parser(tokenize(code), diag).parse_translation_unit()
+    inject_stdlib(root)
+    transform_ast(root)
+    return build_module(root)
+
+
+def function(module, name):
+    for func in module.functions:
+        if func is not None and func.name == name:
+            return func
+    raise KeyError(name)
+
+
+def block(func, prefix):
+    blocks = [b for b in func.blocks if b.name.startswith(prefix)]
+    assert len(blocks) == 1
+    return blocks[0]
+
+
+def opcodes(func):
+    return [instr.opcode for instr in func.instrs()]
+
+
+def run_main(module):
+    llvm.initialize()
+    llvm.initialize_native_target()
+    llvm.initialize_native_asmprinter()
+    mod = llvm.parse_assembly(str(emit_module(module, 'test')))
+    mod.verify()
+    # An engine owns its target machine.
+    machine = llvm.Target.from_default_triple().create_target_machine()
+    engine = llvm.create_mcjit_compiler(mod, machine)
+    engine.finalize_object()
+    main = ctypes.CFUNCTYPE(ctypes.c_int32)(
+        engine.get_function_address('main'))
+    return main()
+
+
+def test_variables_are_promoted():
+    module = build("""
+        func f(n: i32): i32 {
+            var s = 0
+            while n > 0 {
+                s += n
+                n -= 1
+            }
+            return s
+        }
+        func main(): i32 { return f(3) }
+    """)
+    func = function(module, 'f')
+    assert 'get' not in opcodes(func)
+    assert 'set' not in opcodes(func)
+    header = block(func, 'while.cond')
+    assert len(list(header.phis())) == 2
+    assert 'phi [i32 0, entry0]' in str(func)
+
+
+def test_logical_operators_branch():
+    module = build("""
+        func f(a: bool, b: bool): bool { return a && b }
+        func main(): i32 {
+            if f(true, false) { return 1 }
+            return 0
+        }
+    """)
+    func = function(module, 'f')
+    rhs = block(func, 'rhs')
+    exit = block(func, 'exit')
+    assert func.entry.terminator.attr == (rhs, exit)
+    phi, = exit.phis()
+    assert phi.attr == [func.entry, rhs]
+
+
+def test_dominators():
+    module = build("""
+        func f(x: i32): i32 {
+            var r = 0
+            if x > 0 {
+                r = 1
+            } else {
+                r = 2
+            }
+            return r
+        }
+        func main(): i32 { return f(1) }
+    """)
+    func = function(module, 'f')
+    then = block(func, 'if.then')
+    otherwise = block(func, 'if.else')
+    exit = block(func, 'if.exit')
+    idom = dominators(func)
+    assert idom[func.entry] is None
+    assert idom[then] is func.entry
+    assert idom[otherwise] is func.entry
+    assert idom[exit] is func.entry
+    assert dominates(idom, func.entry, exit)
+    assert not dominates(idom, then, exit)
+    frontiers = dominance_frontiers(func, idom)
+    assert frontiers[then] == {exit}
+    assert frontiers[otherwise] == {exit}
+    assert frontiers[func.entry] == set()
+    order = reverse_postorder(func)
+    assert order[0] is func.entry
+    assert order[-1] is exit
+
+
+def test_find_loops():
+    module = build("""
+        func f(n: i32): i32 {
+            var s = 0
+            var i = 0
+            while i < n {
+                var j = 0
+                while j < i {
+                    s += j
+                    j += 1
+                }
+                i += 1
+            }
+            return s
+        }
+        func main(): i32 { return f(3) }
+    """)
+    func = function(module, 'f')
+    loops = find_loops(func, dominators(func))
+    assert len(loops) == 2
+    outer, inner = loops
+    assert outer.depth == 1 and outer.parent is None
+    assert inner.depth == 2 and inner.parent is outer
+    assert inner.blocks < outer.blocks
+    assert outer.header.name.startswith('while.cond')
+    assert func.entry not in outer.blocks
+
+
+def test_sccp_through_loops():
+    module = build("""
+        func f(n: i32): i32 {
+            var x = 1
+            var i = 0
+            while i < n {
+                if x != 1 {
+                    x = 2
+                }
+                i += 1
+            }
+            return x
+        }
+        func main(): i32 { return f(3) }
+    """)
+    func = function(module, 'f')
+    propagate_constants(func)
+    simplify_cfg(func)
+    ret = func.blocks[-1].terminator
+    assert str(ret.operands[0]) == 'i32 1'
+    assert not any(b.name.startswith('if.then') for b in func.blocks)
+
+
+def test_sccp_keeps_undefined_results():
+    module = build("""
+        func f(x: i32): i32 {
+            var y = 0
+            return x / y
+        }
+        func main(): i32 { return f(3) }
+    """)
+    func = function(module, 'f')
+    propagate_constants(func)
+    assert 'binop' in opcodes(func)
+
+
+def test_gvn():
+    module = build("""
+        func sq(x: i32): i32 { return x * x }
+        func f(a: i32, b: i32): i32 {
+            print("a")
+            var c = a * b
+            print("a")
+            return c + b * a + sq(a) + sq(a)
+        }
+        func main(): i32 { return f(1, 2) }
+    """)
+    func = function(module, 'f')
+    number_values(func, module.functions)
+    assert opcodes(func).count('binop') == 4
+    # Only calls of pure functions are merged.
+    assert opcodes(func).count('call') == 3
+
+
+def test_gvn_respects_dominance():
+    module = build("""
+        func f(a: i32, c: bool): i32 {
+            var r = 0
+            if c {
+                r = a + 1
+            } else {
+                r = a + 1
+            }
+            return r + (a + 1)
+        }
+        func main(): i32 { return f(1, true) }
+    """)
+    func = function(module, 'f')
+    number_values(func, module.functions)
+    assert opcodes(func).count('binop') == 4
+
+
+def test_licm():
+    module = build("""
+        func f(n: i32, k: i32): i32 {
+            var s = 0
+            var i = 0
+            while i < n {
+                s += k * 3 + i
+                s += n / k
+                i += 1
+            }
+            return s
+        }
+        func main(): i32 { return f(3, 2) }
+    """)
+    func = function(module, 'f')
+    hoist_invariants(func)
+    preheader = func.entry
+    hoisted = [instr.format() for instr in preheader.instrs]
+    assert any('mul %k, i32 3' in text for text in hoisted)
+    # Division by zero must not happen if the loop isn't run.
+    assert not any('div' in text for text in hoisted)
+
+
+def test_dead_instrs():
+    module = build("""
+        func f(a: i32): i32 {
+            var unused = a * 7
+            var i = 0
+            while i < a {
+                unused += i
+                i += 1
+            }
+            print("x")
+            return a
+        }
+        func main(): i32 { return f(3) }
+    """)
+    func = function(module, 'f')
+    remove_dead_instrs(func)
+    text = str(func)
+    assert 'mul' not in text
+    assert 'call' in text
+    # Only the counter is left in the loop.
+    assert len(list(block(func, 'while.cond').phis())) == 1
+
+
+def test_print():
+    module = build("""
+        func f(x: f32): i64 { return -x as i64 }
+        func main(): i32 { return f(1.5) as i32 }
+    """)
+    assert str(function(module, 'f')) == '\n'.join([
+        'func f(%x: f32): i64 {',
+        'entry0:',
+        '  %2 = f32 unop unary_minus %x',
+        '  %3 = i64 cast f32 %2',
+        '  ret %3',
+        '}'])
+
+
+PROGRAMS = [
+    ("""
+        func gcd(a: i32, b: i32): i32 {
+            while b != 0 {
+                var t = b
+                b = a % b
+                a = t
+            }
+            return a
+        }
+        func fib(n: i64): i64 {
+            if n < 2 {
+                return n
+            }
+            return fib(n - 1) + fib(n - 2)
+        }
+        func main(): i32 {
+            var x = 1070
+            x += 1
+            return gcd(x, 462) + fib(10) as i32
+        }
+    """, 76),
+    ("""
+        func main(): i32 {
+            var total = 0
+            var i = 0
+            var k = 4
+            while i < 10 {
+                var j = 0
+                var seen = false
+                while j < i || !seen {
+                    seen = true
+                    if k > 3 {
+                        total += j * k
+                    } else {
+                        total -= 1
+                    }
+                    j += 1
+                    if j > 5 {
+                        break
+                    }
+                }
+                i += 1
+                if i == 8 {
+                    continue
+                }
+            }
+            return total
+        }
+    """, 320)
+]
+
+
+@pytest.mark.parametrize('optimize', [False, True])
+@pytest.mark.parametrize('code,expected', PROGRAMS)
+def test_run(code, expected, optimize):
+    module = build(code)
+    if optimize:
+        optimize_module(module)
+    assert run_main(module) == expected
@@ -0,0 +1,75 @@
+import pytest
+
+from llvmlite import binding as llvm
+
+from dumbc.codegen.utils import _INLINE_THRESHOLD
+from dumbc.codegen.utils import get_target_machine
+from dumbc.codegen.utils import optimize_module
+from dumbc.codegen.utils import parse_opt_level
+
+
+LEVELS = ['0', '1', '2', '3', 's']
+
+
+@pytest.mark.parametrize('level,expected', [
+    ('0', (0, 0)),
+    ('1', (1, 0)),
+    ('2', (2, 0)),
+    ('3', (3, 0)),
+    ('s', (2, 1)),
+    (2, (2, 0)),
+])
+def test_parse_opt_level(level, expected):
+    assert parse_opt_level(level) == expected
+
+
+@pytest.mark.parametrize('level', ['4', 'z', '', '-1'])
+def test_parse_bad_opt_level(level):
+    with pytest.raises(ValueError):
+        parse_opt_level(level)
+
+
+def test_inline_thresholds():
+    # Every level running the optimization pipeline has a threshold.
+    levels = {parse_opt_level(level) for level in LEVELS}
+    assert set(_INLINE_THRESHOLD) == levels - {(0, 0)}
+
+
+def make_ir(num_ops):
+    """Make IR where `main` calls a function of `num_ops` operations twice."""
+    lines = ['define i32 @"f"(i32 %a) {',
+             '  %v0 = add i32 %a, 1']
+    for i in range(num_ops):
+        lines.append('  %%m%d = mul i32 %%v%d, %%a' % (i, i))
+        lines.append('  %%v%d = xor i32 %%m%d, %d' % (i + 1, i, i + 7))
+    lines.append('  ret i32 %%v%d' % num_ops)
+    lines.append('}')
+    lines.append('define i32 @"main"(i32 %x) {')
+    lines.append('  %r = call i32 @"f"(i32 %x)')
+    lines.append('  %s = call i32 @"f"(i32 %r)')
+    lines.append('  ret i32 %s')
+    lines.append('}')
+    return '\n'.join(lines)
+
+
+def optimize(text, level):
+    get_target_machine()
+    mod = llvm.parse_assembly(text)
+    optimize_module(mod, *parse_opt_level(level))
+    return mod
+
+
+def test_no_optimizations():
+    text = make_ir(5)
+    assert str(optimize(text, '0')) == str(llvm.parse_assembly(text))
+
+
+@pytest.mark.parametrize('num_ops,inlined', [
+    (5, ['2', '3', 's']),
+    (20, ['2', '3']),
+    (40, ['3']),
+])
+def test_inlining_threshold(num_ops, inlined):
+    for level in LEVELS[1:]:
+        main = str(optimize(make_ir(num_ops), level).get_function('main'))
+        assert ('call' not in main) == (level in inlined), level
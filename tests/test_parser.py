@@ -5,9 +5,12 @@ import re
 import mock
 
 from dumbc import tokenize
+from dumbc import tokenize_to_buffer
 from dumbc import Parser
 from dumbc import DumbSyntaxError
 from dumbc import DumbEOFError
+from dumbc import DumbValueError
+from dumbc.ast.arena import Arena
 from dumbc.utils.diagnostics import DiagnosticsEngine
 
 
@@ -108,14 +111,19 @@ def bad_input(request):
     return load_sample(filename)
 
 
+@pytest.fixture(params=[tokenize, tokenize_to_buffer])
+def lex(request):
+    return request.param
+
+
 @pytest.fixture
 def diag():
     return mock.Mock(spec=DiagnosticsEngine)
 
 
-def test_output_ast(good_input, diag):
+def test_output_ast(good_input, lex, diag):
     code, desc = good_input
-    token_stream = tokenize(code)
+    token_stream = lex(code)
     parser = Parser(token_stream, diag)
     parse_method = getattr(parser, desc['hook'])
 
@@ -129,10 +137,24 @@ def test_output_ast(good_input, diag):
         verify_forest(ast, forest_desc)
 
 
-def test_bad_input(bad_input, diag):
+def test_arena_output_ast(good_input, diag):
+    code, desc = good_input
+    parser = Parser(tokenize_to_buffer(code), diag)
+    ast = getattr(parser, desc['hook'])()
+
+    arena = Arena()
+    if 'root' in desc:
+        node_id = arena.add(ast)
+        verify_tree(arena.to_tree(node_id), desc['root'])
+    else:
+        node_ids = [arena.add(node) for node in ast]
+        verify_forest(map(arena.to_tree, node_ids), desc['forest'])
+
+
+def test_bad_input(bad_input, lex, diag):
     code, desc = bad_input
 
-    token_stream = tokenize(code)
+    token_stream = lex(code)
     parser = Parser(token_stream, diag)
     parse_method = getattr(parser, desc['hook'])
 
@@ -140,12 +162,36 @@ def test_bad_input(bad_input, diag):
         parse_method()
 
 
-def test_eof_handling(diag):
+def test_eof_handling(lex, diag):
     code = ''
-    token_stream = tokenize(code)
+    token_stream = lex(code)
     parser = Parser(token_stream, diag)
 
     # Current token is EOF, so the next advance() method call
     # should cause an error.
     with pytest.raises(DumbEOFError):
         parser.advance()
+
+
+def test_lexer_error(lex, diag):
+    token_stream = lex('func main() { $ }')
+    parser = Parser(token_stream, diag)
+
+    with pytest.raises(DumbValueError):
+        parser.parse_translation_unit()
+
+
+def test_advance(lex, diag):
+    parser = Parser(lex('var x = 1'), diag)
+    assert parser.curr_token.kind == 'VAR'
+    token = parser.advance('VAR')
+    assert token == parser.curr_token
+    assert token.kind == 'IDENT'
+    assert token.value == 'x'
+    assert (token.loc.line, token.loc.column) == (1, 5)
+    assert parser.curr_value == 'x'
+    assert parser.curr_loc == token.loc
+
+    with pytest.raises(DumbSyntaxError):
+        parser.advance('INTEGER')
+    assert parser.curr_kind == 'IDENT'
@@ -0,0 +1,62 @@
+from unittest import mock
+
+from dumbc import tokenize
+from dumbc import Parser
+from dumbc.stdlib.injector import inject_stdlib
+from dumbc.transform import transform_ast
+from dumbc.utils.diagnostics import DiagnosticsEngine
+from dumbc.utils.partition import function_size
+from dumbc.utils.partition import partition_functions
+
+
+def transform(code):
+    diag = mock.Mock(spec=DiagnosticsEngine)
+    root = Parser(tokenize(code), diag).parse_translation_unit()
+    inject_stdlib(root)
+    transform_ast(root)
+    return root
+
+
+CODE = """
+    func f(x: i32): i32 {
+        var s = 0
+        while x > 0 {
+            s += x * x
+            x -= 1
+        }
+        return s
+    }
+    func g(x: i32): i32 { return x }
+    func h(x: i32): i32 { return g(x) + 1 }
+    func main(): i32 {
+        print("main")
+        return f(3) + h(1)
+    }
+"""
+
+
+def names(root, indices):
+    return [root.decls[i].proto.name for i in indices]
+
+
+def test_function_size():
+    root = transform(CODE)
+    sizes = {decl.proto.name: function_size(decl) for decl in root.decls}
+    assert sizes['g'] < sizes['h'] < sizes['f']
+    # Functions of the standard library are external.
+    assert sizes['print'] == 0
+
+
+def test_partitions_are_contiguous():
+    root = transform(CODE)
+    partitions = partition_functions(root, 2)
+    assert len(partitions) == 2
+    assert names(root, partitions[0]) == ['f']
+    assert names(root, partitions[0] + partitions[1]) == ['f', 'g', 'h', 'main']
+
+
+def test_partitions_have_a_function_each():
+    root = transform(CODE)
+    partitions = partition_functions(root, 10)
+    assert [len(part) for part in partitions] == [1, 1, 1, 1]
+    assert partition_functions(root, 1) == [sum(partitions, [])]
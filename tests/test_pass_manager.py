@@ -0,0 +1,119 @@
+import pytest
+
+import dumbc.ast.ast as ast
+
+from dumbc.transform.base_pass import HookPass
+from dumbc.transform.base_pass import Pass
+from dumbc.transform.pass_manager import PassManager
+
+
+class Recorder(HookPass):
+
+    def __init__(self, log):
+        self.log = log
+
+    def enter_Block(self, node):
+        self.log.append((type(self).__name__, 'enter', 'Block'))
+
+    def leave_Block(self, node):
+        self.log.append((type(self).__name__, 'leave', 'Block'))
+
+    def enter_Break(self, node):
+        self.log.append((type(self).__name__, 'enter', 'Break'))
+
+
+class First(Recorder):
+    pass
+
+
+class Second(Recorder):
+    requires = ('First',)
+
+
+class ExprCounter(HookPass):
+
+    def __init__(self):
+        self.count = 0
+
+    def enter_IntegerConstant(self, node):
+        self.count += 1
+
+
+class VisitorPass(Pass):
+
+    def __init__(self, log):
+        self.log = log
+
+    def visit_Block(self, node):
+        self.log.append(('VisitorPass', 'visit', 'Block'))
+
+
+def make_tree():
+    return ast.Block([
+        ast.Expression(ast.BinaryOp(ast.Operator.ADD,
+                                    ast.IntegerConstant(1),
+                                    ast.IntegerConstant(2))),
+        ast.Break()
+    ])
+
+
+def test_fused_walk_order():
+    log = []
+    PassManager([Second(log), First(log)]).run(make_tree())
+    assert log == [
+        ('First', 'enter', 'Block'),
+        ('Second', 'enter', 'Block'),
+        ('First', 'enter', 'Break'),
+        ('Second', 'enter', 'Break'),
+        ('First', 'leave', 'Block'),
+        ('Second', 'leave', 'Block')
+    ]
+
+
+def test_visitor_pass_splits_walk():
+    log = []
+    manager = PassManager([First(log), VisitorPass(log), Second(log)])
+    groups = [[type(p).__name__ for p in group] for group in manager.groups()]
+    assert groups == [['First'], ['VisitorPass'], ['Second']]
+    manager.run(make_tree())
+    assert log.index(('VisitorPass', 'visit', 'Block')) == 3
+
+
+def test_whole_tree_pass_splits_walk():
+
+    class Collector(HookPass):
+        whole_tree = True
+
+    class User(HookPass):
+        requires = ('Collector',)
+
+    log = []
+    manager = PassManager([User(), First(log), Collector(), Second(log)])
+    groups = [[type(p).__name__ for p in group] for group in manager.groups()]
+    assert groups == [['First', 'Collector'], ['User', 'Second']]
+
+
+def test_cyclic_requirements():
+
+    class A(HookPass):
+        requires = ('B',)
+
+    class B(HookPass):
+        requires = ('A',)
+
+    with pytest.raises(ValueError):
+        PassManager([A(), B()])
+
+
+def test_expressions_are_walked_on_demand():
+    counter = ExprCounter()
+    counter.visit(make_tree())
+    assert counter.count == 2
+
+
+def test_timings():
+    log = []
+    timings = {}
+    PassManager([First(log), VisitorPass(log)]).run(make_tree(), timings)
+    assert set(timings) == {'First', 'VisitorPass', 'walk'}
+    assert all(seconds >= 0 for seconds in timings.values())
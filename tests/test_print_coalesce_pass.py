@@ -0,0 +1,140 @@
+from unittest import mock
+
+import pytest
+
+import dumbc.ast.ast as ast
+
+from dumbc import tokenize
+from dumbc import Parser
+from dumbc.stdlib.injector import inject_stdlib
+from dumbc.transform.print_coalesce_pass import PrintCoalescePass
+from dumbc.transform.pass_manager import PassManager
+from dumbc.transform.resolve_pass import ResolvePass
+from dumbc.transform.transform import transform_ast
+from dumbc.transform.type_pass import TypePass
+from dumbc.utils.diagnostics import DiagnosticsEngine
+
+
+def coalesce(body):
+    diag = mock.Mock(spec=DiagnosticsEngine)
+    code = """
+        func f(): i32 { return 1 }
+        func main(): i32 { %s }
+    """ % body
+    root = Parser(tokenize(code), diag).parse_translation_unit()
+    inject_stdlib(root)
+    PassManager([ResolvePass(), TypePass(), PrintCoalescePass()]).run(root)
+    return root.decls[-1].body.stmts
+
+
+def printed(stmt):
+    if (isinstance(stmt, ast.Expression) and
+            isinstance(stmt.expr, ast.FuncCall) and
+            stmt.expr.name == 'print' and
+            isinstance(stmt.expr.args[0], ast.StringConstant)):
+        return stmt.expr.args[0].value
+    return type(stmt).__name__
+
+
+def test_merge_adjacent():
+    stmts = coalesce("""
+        print('a')
+        print('b')
+        f()
+        print('c')
+        print('d')
+        print('e')
+        return 0
+    """)
+    assert list(map(printed, stmts)) == ['ab', 'Expression', 'cde',
+                                         'Return']
+
+
+def test_hoist_from_branches():
+    stmts = coalesce("""
+        var x = f()
+        print('>')
+        if x == 1 {
+            print('[one]')
+        } else {
+            print('[two]')
+        }
+        print('\n')
+        return 0
+    """)
+    assert list(map(printed, stmts)) == ['Var', '>[', 'If', ']\n', 'Return']
+    branches = stmts[2].then.stmts, stmts[2].otherwise.stmts
+    assert [list(map(printed, b)) for b in branches] == [['one'], ['two']]
+
+
+def test_no_hoist_before_side_effects():
+    stmts = coalesce("""
+        if f() == 1 {
+            print('ab')
+        } else {
+            print('ac')
+        }
+        return 0
+    """)
+    assert list(map(printed, stmts)) == ['If', 'Return']
+
+
+@pytest.mark.parametrize('cond', ['10 / x > 1', '10 % x == 1'])
+def test_no_hoist_before_trap(cond):
+    # Printing mustn't happen before a division by zero traps.
+    stmts = coalesce("""
+        var x = f() - 1
+        if %s {
+            print('ab')
+        } else {
+            print('ac')
+        }
+        return 0
+    """ % cond)
+    assert list(map(printed, stmts)) == ['Var', 'If', 'Return']
+
+
+def test_hoist_before_float_division():
+    stmts = coalesce("""
+        var x = f() as f32
+        if 10.0 / x > 1.0 {
+            print('ab')
+        } else {
+            print('ac')
+        }
+        return 0
+    """)
+    assert list(map(printed, stmts)) == ['Var', 'a', 'If', 'Return']
+
+
+def test_no_hoist_without_else():
+    stmts = coalesce("""
+        print('a')
+        if f() == 1 {
+            print('a')
+        }
+        print('a')
+        return 0
+    """)
+    assert list(map(printed, stmts)) == ['a', 'If', 'a', 'Return']
+
+
+def test_merge_around_dead_store():
+    # Dead stores are removed before prints are merged, although both
+    # passes run in the same walk.
+    diag = mock.Mock(spec=DiagnosticsEngine)
+    code = """
+        func f(): i32 { return 1 }
+        func main(): i32 {
+            var x = f()
+            print('a')
+            x = 2
+            print('b')
+            return 0
+        }
+    """
+    root = Parser(tokenize(code), diag).parse_translation_unit()
+    inject_stdlib(root)
+    transform_ast(root)
+    stmts = root.decls[-1].body.stmts
+    assert list(map(printed, stmts)) == ['ab', 'Return']
@@ -0,0 +1,93 @@
+import pytest
+
+import dumbc.ast.ast as ast
+
+from dumbc import BuiltinTypes
+from dumbc import DumbNameError
+from dumbc.transform.resolve_pass import ResolvePass
+from dumbc.transform.type_pass import TypePass
+from dumbc.transform.pass_manager import PassManager
+
+
+def make_function(args, stmts, name='foo'):
+    proto = ast.FunctionProto(name, args, BuiltinTypes.VOID)
+    return ast.Function(proto, ast.Block(stmts))
+
+
+def test_slots():
+    x_use = ast.Identifier('x')
+    y_use = ast.Identifier('y')
+    inner_x = ast.Var('x', ast.Identifier('x'), BuiltinTypes.F32)
+    inner_use = ast.Identifier('x')
+    func = make_function(
+        [ast.Argument('x', BuiltinTypes.I32)],
+        [ast.Var('y', x_use),
+         ast.Block([inner_x, ast.Expression(inner_use)]),
+         ast.Expression(y_use),
+         ast.Expression(ast.Identifier('z'))])
+    ResolvePass().visit(func)
+    assert func.proto.args[0].slot == 0
+    assert func.body.stmts[0].slot == 1
+    assert x_use.slot == 0
+    assert y_use.slot == 1
+    # The initial value refers to the outer variable.
+    assert inner_x.initial_value.slot == 0
+    assert inner_x.slot == 2
+    assert inner_use.slot == 2
+    assert func.body.stmts[3].expr.slot is None
+    assert func.num_slots == 3
+
+
+def test_assigned():
+    func = make_function(
+        [ast.Argument('x', BuiltinTypes.I32),
+         ast.Argument('y', BuiltinTypes.I32)],
+        [ast.Var('z', ast.Identifier('x')),
+         ast.Block([ast.Var('x', ast.IntegerConstant(1)),
+                    ast.Expression(ast.Assignment(ast.Identifier('x'),
+                                                  ast.Identifier('y')))]),
+         ast.Expression(ast.Assignment(ast.Identifier('z'),
+                                       ast.IntegerConstant(2)))])
+    ResolvePass().visit(func)
+    x, y = func.proto.args
+    z, block = func.body.stmts[:2]
+    assert not x.assigned
+    assert not y.assigned
+    assert z.assigned
+    # The assignment refers to the inner variable.
+    assert block.stmts[0].assigned
+
+
+def test_function_slots():
+    call = ast.FuncCall('bar', [])
+    unknown = ast.FuncCall('baz', [])
+    root = ast.TranslationUnit([
+        make_function([], [ast.Expression(call),
+                           ast.Expression(unknown)]),
+        make_function([], [], name='bar')
+    ])
+    ResolvePass().visit(root)
+    assert call.slot == 1
+    assert unknown.slot is None
+
+
+def test_resolved_types():
+    inner_use = ast.Identifier('x')
+    func = make_function(
+        [ast.Argument('x', BuiltinTypes.I32)],
+        [ast.Block([ast.Var('x', ast.FloatConstant(1.0)),
+                    ast.Expression(inner_use)]),
+         ast.Expression(ast.Identifier('x'))])
+    root = ast.TranslationUnit([func])
+    type_pass = TypePass()
+    PassManager([type_pass, ResolvePass()]).run(root)
+    assert type_pass.visit(inner_use) == BuiltinTypes.F32
+    assert type_pass.visit(func.body.stmts[1].expr) == BuiltinTypes.I32
+
+
+def test_unresolved_name():
+    root = ast.TranslationUnit([
+        make_function([], [ast.Expression(ast.Identifier('x'))])
+    ])
+    with pytest.raises(DumbNameError):
+        PassManager([ResolvePass(), TypePass()]).run(root)
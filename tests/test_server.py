@@ -0,0 +1,91 @@
+import os
+import stat
+import threading
+
+import pytest
+
+from dumbc import compiler
+from dumbc.server import CompileServer
+from dumbc.server import build_on_server
+
+
+CODE = """
+func main(): i32 {
+    print("hello")
+    return 0
+}
+"""
+
+
+@pytest.fixture
+def server(tmp_path):
+    socket_path = str(tmp_path / 'dumbc.sock')
+    server = CompileServer(socket_path)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield socket_path
+    server.shutdown()
+    thread.join()
+    server.server_close()
+
+
+def build(tmp_path, socket_path, code, **kwargs):
+    source = tmp_path / 'prog.dumb'
+    source.write_text(code)
+    request = {
+        'file': str(source),
+        'output': str(tmp_path / 'prog'),
+        'stdlib': None,
+        'dump_ir': False,
+        'clean': True,
+        'opt_level': '0',
+        'cache_dir': None,
+        'cache_size': 0
+    }
+    request.update(kwargs)
+    return build_on_server(request, socket_path)
+
+
+def test_not_running(tmp_path):
+    socket_path = str(tmp_path / 'missing.sock')
+    assert build(tmp_path, socket_path, CODE) is None
+
+
+def test_dump_ir(tmp_path, server, capsys):
+    assert build(tmp_path, server, CODE, dump_ir=True) == 0
+    assert 'define i32 @"main"()' in capsys.readouterr().out
+
+
+def test_compile_error(tmp_path, server, capsys):
+    code = 'func main(): i32 { return x }'
+    assert build(tmp_path, server, code) != 0
+    assert "name 'x' is not defined" in capsys.readouterr().out
+
+
+def test_link_error(tmp_path, server, capsys, monkeypatch):
+    # The forked process handling the request runs this linker.
+    linker = tmp_path / 'clang'
+    linker.write_text('#!/bin/sh\necho "cannot find -lstddumb" >&2\nexit 3\n')
+    linker.chmod(linker.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv('PATH', '%s%s%s' % (tmp_path, os.pathsep,
+                                           os.environ.get('PATH', '')))
+
+    assert build(tmp_path, server, CODE, stdlib='/nonexistent') == 3
+    assert 'cannot find -lstddumb' in capsys.readouterr().err
+    assert not os.path.exists(str(tmp_path / 'prog'))
+
+
+def test_missing_file(tmp_path, server, capsys, monkeypatch):
+    missing = str(tmp_path / 'missing.dumb')
+    monkeypatch.setattr('sys.argv', ['dumbc', 'build', '--no-cache', missing])
+    with pytest.raises(SystemExit) as e:
+        compiler.main()
+    expected = capsys.readouterr()
+
+    status = build(tmp_path, server, CODE, file=missing)
+    captured = capsys.readouterr()
+    assert status == e.value.code
+    assert captured.out == expected.out
+    assert captured.err == expected.err
+    assert 'No such file or directory' in captured.out
+    assert 'internal compiler error' not in captured.out
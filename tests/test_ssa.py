@@ -0,0 +1,113 @@
+import ctypes
+
+from unittest import mock
+
+import pytest
+
+from llvmlite import binding as llvm
+
+from dumbc import tokenize
+from dumbc import Parser
+from dumbc.codegen import Codegen
+from dumbc.stdlib.injector import inject_stdlib
+from dumbc.transform import transform_ast
+from dumbc.utils.diagnostics import DiagnosticsEngine
+
+
+def compile_module(code, use_ssa):
+    diag = mock.Mock(spec=DiagnosticsEngine)
+    root = Parser(tokenize(code), diag).parse_translation_unit()
+    inject_stdlib(root)
+    transform_ast(root)
+    return Codegen('test', use_ssa=use_ssa).generate(root)
+
+
+def run_main(module):
+    llvm.initialize()
+    llvm.initialize_native_target()
+    llvm.initialize_native_asmprinter()
+    mod = llvm.parse_assembly(str(module))
+    mod.verify()
+    # An engine owns its target machine.
+    machine = llvm.Target.from_default_triple().create_target_machine()
+    engine = llvm.create_mcjit_compiler(mod, machine)
+    engine.finalize_object()
+    main = ctypes.CFUNCTYPE(ctypes.c_int32)(
+        engine.get_function_address('main'))
+    return main()
+
+
+PROGRAMS = [
+    ("""
+        func gcd(a: i32, b: i32): i32 {
+            while b != 0 {
+                var t = b
+                b = a % b
+                a = t
+            }
+            return a
+        }
+        func main(): i32 {
+            var x = 1070
+            x += 1
+            return gcd(x, 462)
+        }
+    """, 21),
+    ("""
+        func classify(x: i32): i32 {
+            var r = 0
+            if x > 90 {
+                r = 4
+            } else if x > 80 {
+                r = 3
+            } else {
+                if x > 70 {
+                    r = 2
+                }
+            }
+            return r
+        }
+        func main(): i32 {
+            var s = 0
+            var i = 0
+            while true {
+                i += 1
+                if i > 100 {
+                    break
+                }
+                if i % 2 == 0 && i < 95 {
+                    continue
+                }
+                s += classify(i)
+            }
+            return s
+        }
+    """, 57),
+    ("""
+        func main(): i32 {
+            var total = 0
+            var i = 0
+            while i < 10 {
+                var j = 0
+                var seen = false
+                while j < i || !seen {
+                    seen = true
+                    total += j
+                    j += 1
+                }
+                i += 1
+            }
+            return total
+        }
+    """, 120)
+]
+
+
+@pytest.mark.parametrize('code,expected', PROGRAMS)
+def test_ssa_matches_stack_slots(code, expected):
+    module = compile_module(code, use_ssa=True)
+    ir_text = str(module)
+    assert 'alloca' not in ir_text
+    assert 'load' not in ir_text
+    assert run_main(module) == expected
+    assert run_main(compile_module(code, use_ssa=False)) == expected
@@ -6,7 +6,9 @@ from dumbc import BuiltinTypes
 from dumbc import DumbTypeError
 from dumbc import DumbNameError
 from dumbc import Operator
+from dumbc.transform.const_eval import constant_value
 from dumbc.transform.type_pass import TypePass
+from dumbc.transform.type_pass import _int_range
 from dumbc.transform.type_pass import _builtin_type_conversion
 from dumbc.transform.type_pass import _builtin_type_promotion
 
@@ -859,6 +861,21 @@ def test_var_unknown_type():
         tp.visit(root)
 
 
+def test_binop_unknown_type():
+    root = ast.Block([
+        ast.Var('foo', ast.FloatConstant(0.0)),
+        ast.Expression(ast.BinaryOp(Operator.ADD,
+                                    ast.Identifier('foo'),
+                                    ast.Identifier('bar')))
+    ])
+    tp = TypePass()
+    tp.symbol_table.push()
+    tp.symbol_table.set('bar', ast.Type('mytype'))
+
+    with pytest.raises(DumbTypeError):
+        tp.visit(root)
+
+
 def test_func_redeclaration():
     foo_func = ast.Function(ast.FunctionProto('foo', [], BuiltinTypes.VOID))
     foo_func_dup = ast.Function(
@@ -922,3 +939,107 @@ def test_func():
     tp = TypePass()
 
     tp.visit(root)
+
+
+def test_literal_out_of_range():
+    with pytest.raises(DumbTypeError):
+        TypePass().visit(ast.IntegerConstant(256, ty=BuiltinTypes.U8))
+
+
+@pytest.mark.parametrize('left,right_ty', [
+    (ast.IntegerConstant(1), BuiltinTypes.U32),
+    (ast.IntegerConstant(1), BuiltinTypes.I64),
+    (ast.IntegerConstant(1), BuiltinTypes.F64),
+    (ast.FloatConstant(0.1), BuiltinTypes.F64),
+    (ast.UnaryOp(Operator.UNARY_MINUS, ast.IntegerConstant(127)),
+     BuiltinTypes.I64),
+])
+def test_contextual_literal(left, right_ty):
+    node = ast.BinaryOp(Operator.MUL, left, ast.Identifier('x'))
+    tp = TypePass()
+    tp.symbol_table.push()
+    tp.symbol_table.set('x', right_ty)
+
+    assert tp.visit(node) == right_ty
+    assert not isinstance(node.left, ast.Cast)
+    assert node.left.ty == right_ty
+
+
+@pytest.mark.parametrize('left,right_ty', [
+    (ast.IntegerConstant(1), BuiltinTypes.U8),
+    (ast.IntegerConstant(2), BuiltinTypes.I8),
+    (ast.UnaryOp(Operator.UNARY_MINUS, ast.IntegerConstant(127)),
+     BuiltinTypes.I8),
+    (ast.IntegerConstant(256), BuiltinTypes.U8),
+    (ast.UnaryOp(Operator.UNARY_MINUS, ast.IntegerConstant(1)),
+     BuiltinTypes.U32),
+    (ast.IntegerConstant(2 ** 25 + 1), BuiltinTypes.F32),
+])
+def test_contextual_literal_doesnt_fit(left, right_ty):
+    node = ast.BinaryOp(Operator.MUL, left, ast.Identifier('x'))
+    tp = TypePass()
+    tp.symbol_table.push()
+    tp.symbol_table.set('x', right_ty)
+
+    tp.visit(node)
+
+    assert getattr(node.left, 'ty', None) != right_ty
+
+
+def test_contextual_literal_doesnt_narrow_operation():
+    # The product is computed in 'i32' as if the literal was untyped.
+    node = ast.BinaryOp(Operator.MUL,
+                        ast.Identifier('y'),
+                        ast.IntegerConstant(2))
+    tp = TypePass()
+    tp.symbol_table.push()
+    tp.symbol_table.set('y', BuiltinTypes.I8)
+
+    assert tp.visit(node) == BuiltinTypes.I32
+    assert isinstance(node.left, ast.Cast)
+    assert node.right.ty is None
+
+
+@pytest.mark.parametrize('ty', [
+    BuiltinTypes.I8, BuiltinTypes.U8, BuiltinTypes.I32, BuiltinTypes.U32,
+    BuiltinTypes.I64, BuiltinTypes.U64
+])
+@pytest.mark.parametrize('limit', [0, 1])
+def test_var_contextual_literal_limits(ty, limit):
+    value = _int_range(ty)[limit]
+    literal = ast.IntegerConstant(abs(value))
+    if value < 0:
+        literal = ast.UnaryOp(Operator.UNARY_MINUS, literal)
+    var = ast.Var('foo', literal, ty)
+    TypePass().visit(ast.Block([var]))
+
+    assert not isinstance(var.initial_value, ast.Cast)
+    if ty == BuiltinTypes.I32:
+        # Untyped literals are already of the type.
+        return
+    assert var.initial_value.value == value
+    assert constant_value(var.initial_value) == (value, ty)
+
+
+def test_var_contextual_literal():
+    value = ast.BinaryOp(Operator.MUL,
+                         ast.FloatConstant(0.1),
+                         ast.IntegerConstant(3))
+    var = ast.Var('foo', value, BuiltinTypes.F64)
+    TypePass().visit(ast.Block([var]))
+
+    # The product is computed in 'f64' rather than cast from 'f32'.
+    assert var.initial_value is value
+    assert value.ty == BuiltinTypes.F64
+    assert value.left.ty == BuiltinTypes.F64
+    assert value.right.ty == BuiltinTypes.F64
+
+
+def test_var_integer_division_not_retyped():
+    value = ast.BinaryOp(Operator.DIV,
+                         ast.IntegerConstant(7),
+                         ast.IntegerConstant(2))
+    var = ast.Var('foo', value, BuiltinTypes.F64)
+    TypePass().visit(ast.Block([var]))
+
+    assert isinstance(var.initial_value, ast.Cast)
@@ -3,9 +3,14 @@ import mock
 
 import dumbc.ast.ast as ast
 
+from dumbc import BuiltinTypes
+from dumbc import Operator
+from dumbc import Visitor
 from dumbc import ExprVisitor
 from dumbc import StmtVisitor
 from dumbc import DeclVisitor
+from dumbc.transform.base_pass import Pass
+from dumbc.transform.type_pass import TypePass
 
 
 class StubExprVisitor(ExprVisitor):
@@ -125,3 +130,101 @@ def test_decl_visitor(node):
     with mock.patch.object(visitor, method_name):
         visitor.visit(node)
         getattr(visitor, method_name).assert_called_once_with(node)
+
+
+def make_chain(length):
+    node = ast.Identifier('x')
+    for _ in range(length):
+        node = ast.BinaryOp(Operator.ADD, node, ast.IntegerConstant(1))
+    return node
+
+
+class Counter(Pass):
+
+    def __init__(self):
+        self.count = 0
+
+    def visit_IntegerConstant(self, node):
+        self.count += 1
+
+
+def test_deep_tree():
+    visitor = Counter()
+    visitor.visit(ast.Expression(make_chain(10000)))
+    assert visitor.count == 10000
+
+
+def test_deep_tree_types():
+    type_pass = TypePass()
+    type_pass.symbol_table.push()
+    type_pass.symbol_table.set('x', BuiltinTypes.I64)
+    node = make_chain(10000)
+    assert type_pass.visit(node) == BuiltinTypes.I64
+    # Literals take the type of the other operand.
+    assert node.right.ty == BuiltinTypes.I64
+
+
+def test_generator_results():
+
+    class Evaluator(Visitor):
+
+        def visit_BinaryOp(self, node):
+            left = yield node.left
+            right = yield node.right
+            return left + right
+
+        def visit_IntegerConstant(self, node):
+            return node.value
+
+    node = ast.BinaryOp(Operator.ADD,
+                        ast.IntegerConstant(1),
+                        ast.BinaryOp(Operator.ADD,
+                                     ast.IntegerConstant(2),
+                                     ast.IntegerConstant(3)))
+    assert Evaluator().visit(node) == 6
+
+
+def test_error_propagation():
+
+    class Catcher(Visitor):
+
+        def visit_Expression(self, node):
+            try:
+                yield node.expr
+            except ValueError:
+                return 'caught'
+
+        def visit_UnaryOp(self, node):
+            yield node.value
+
+        def visit_IntegerConstant(self, node):
+            raise ValueError(node.value)
+
+        def visit_Block(self, node):
+            results = []
+            for stmt in node.stmts:
+                results.append((yield stmt))
+            return results
+
+    node = ast.Expression(ast.UnaryOp(Operator.UNARY_MINUS,
+                                      ast.IntegerConstant(1)))
+    assert Catcher().visit(node) == 'caught'
+    # A handled error doesn't reach the parent of the handler.
+    assert Catcher().visit(ast.Block([node, node])) == ['caught', 'caught']
+    with pytest.raises(ValueError):
+        Catcher().visit(node.expr)
+
+
+def test_subclass_dispatch():
+
+    class Special(ast.IntegerConstant):
+        pass
+
+    visitor = Counter()
+    visitor.visit(ast.Expression(Special(1)))
+    assert visitor.count == 1
+
+
+def test_missing_method():
+    with pytest.raises(AttributeError):
+        Counter().visit(object())